@@ -20,6 +20,7 @@ def splat_main():
     )
 
     splat.scripts.split.add_subparser(subparsers)
+    splat.scripts.serve.add_subparser(subparsers)
     splat.scripts.create_config.add_subparser(subparsers)
     splat.scripts.capy.add_subparser(subparsers)
 
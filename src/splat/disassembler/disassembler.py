@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Set
+from typing import Optional, Set
 
 
 class Disassembler(ABC):
@@ -14,3 +14,9 @@ class Disassembler(ABC):
     @abstractmethod
     def known_types(self) -> Set[str]:
         raise NotImplementedError("known_types")
+
+    def get_version(self) -> Optional[str]:
+        """
+        Name and version of the disassembler, recorded along with the timings of every run
+        """
+        return None
@@ -6,22 +6,35 @@ from ..util import options
 
 __instance: Disassembler = NullDisassembler()
 __initialized = False
+__configured = False
 
 
 def create_disassembler_instance(skip_version_check: bool, splat_version: str):
     global __instance
     global __initialized
+    global __configured
     if options.opts.platform in ["n64", "psx", "ps2"]:
         __instance = SpimdisasmDisassembler()
         __initialized = True
+        __configured = False
 
         __instance.check_version(skip_version_check, splat_version)
-        __instance.configure()
         return
 
     raise NotImplementedError("No disassembler for requested platform")
 
 
+def configure_instance():
+    """
+    Configures the disassembler the first time something is about to be disassembled. Configuring it imports it, which
+    splits that never disassemble anything don't need
+    """
+    global __configured
+    if __initialized and not __configured:
+        __configured = True
+        __instance.configure()
+
+
 def get_instance() -> Disassembler:
     global __instance
     global __initialized
@@ -1,9 +1,11 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
-import spimdisasm
+from ..util import options, symbols, trace
+from ..util.rom import RomBytes
 
-from ..util import options, symbols
+if TYPE_CHECKING:
+    import spimdisasm
 
 
 class DisassemblerSection(ABC):
@@ -78,12 +80,14 @@ class DisassemblerSection(ABC):
 
 class SpimdisasmDisassemberSection(DisassemblerSection):
     def __init__(self):
-        self.spim_section: Optional[spimdisasm.mips.sections.SectionBase] = None
+        self.spim_section: "Optional[spimdisasm.mips.sections.SectionBase]" = None
 
+    @trace.traced("disassemble")
     def disassemble(self) -> str:
         assert self.spim_section is not None
         return self.spim_section.disassemble()
 
+    @trace.traced("analyze")
     def analyze(self):
         assert self.spim_section is not None
         self.spim_section.analyze()
@@ -102,6 +106,8 @@ class SpimdisasmDisassemberSection(DisassemblerSection):
         segment_rom_start: int,
         exclusive_ram_id,
     ):
+        import spimdisasm
+
         self.spim_section = spimdisasm.mips.sections.SectionBss(
             symbols.spim_context,
             rom_start,
@@ -119,22 +125,25 @@ class SpimdisasmDisassemberSection(DisassemblerSection):
         rom_end: int,
         vram_start: int,
         name: str,
-        rom_bytes: bytes,
+        rom_bytes: RomBytes,
         segment_rom_start: int,
         exclusive_ram_id,
     ):
+        import spimdisasm
+
         self.spim_section = spimdisasm.mips.sections.SectionData(
             symbols.spim_context,
             rom_start,
             rom_end,
             vram_start,
             name,
-            rom_bytes,
+            # spimdisasm only unpacks words out of the buffer, which memoryviews support too
+            rom_bytes,  # type: ignore[arg-type]
             segment_rom_start,
             exclusive_ram_id,
         )
 
-    def get_section(self) -> Optional[spimdisasm.mips.sections.SectionBase]:
+    def get_section(self) -> "Optional[spimdisasm.mips.sections.SectionBase]":
         return self.spim_section
 
     def make_rodata_section(
@@ -143,17 +152,20 @@ class SpimdisasmDisassemberSection(DisassemblerSection):
         rom_end: int,
         vram_start: int,
         name: str,
-        rom_bytes: bytes,
+        rom_bytes: RomBytes,
         segment_rom_start: int,
         exclusive_ram_id,
     ):
+        import spimdisasm
+
         self.spim_section = spimdisasm.mips.sections.SectionRodata(
             symbols.spim_context,
             rom_start,
             rom_end,
             vram_start,
             name,
-            rom_bytes,
+            # spimdisasm only unpacks words out of the buffer, which memoryviews support too
+            rom_bytes,  # type: ignore[arg-type]
             segment_rom_start,
             exclusive_ram_id,
         )
@@ -164,17 +176,20 @@ class SpimdisasmDisassemberSection(DisassemblerSection):
         rom_end: int,
         vram_start: int,
         name: str,
-        rom_bytes: bytes,
+        rom_bytes: RomBytes,
         segment_rom_start: int,
         exclusive_ram_id,
     ):
+        import spimdisasm
+
         self.spim_section = spimdisasm.mips.sections.SectionText(
             symbols.spim_context,
             rom_start,
             rom_end,
             vram_start,
             name,
-            rom_bytes,
+            # spimdisasm only unpacks words out of the buffer, which memoryviews support too
+            rom_bytes,  # type: ignore[arg-type]
             segment_rom_start,
             exclusive_ram_id,
         )
@@ -193,7 +208,7 @@ def make_text_section(
     rom_end: int,
     vram_start: int,
     name: str,
-    rom_bytes: bytes,
+    rom_bytes: RomBytes,
     segment_rom_start: int,
     exclusive_ram_id,
 ) -> DisassemblerSection:
@@ -216,7 +231,7 @@ def make_data_section(
     rom_end: int,
     vram_start: int,
     name: str,
-    rom_bytes: bytes,
+    rom_bytes: RomBytes,
     segment_rom_start: int,
     exclusive_ram_id,
 ) -> DisassemblerSection:
@@ -239,7 +254,7 @@ def make_rodata_section(
     rom_end: int,
     vram_start: int,
     name: str,
-    rom_bytes: bytes,
+    rom_bytes: RomBytes,
     segment_rom_start: int,
     exclusive_ram_id,
 ) -> DisassemblerSection:
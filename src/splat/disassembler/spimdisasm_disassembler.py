@@ -1,8 +1,8 @@
+import importlib.metadata
+
 from . import disassembler
-import spimdisasm
-import rabbitizer
 from ..util import log, compiler, options
-from typing import Set
+from typing import Optional, Set, Tuple
 
 
 class SpimdisasmDisassembler(disassembler.Disassembler):
@@ -10,6 +10,9 @@ class SpimdisasmDisassembler(disassembler.Disassembler):
     SPIMDISASM_MIN = (1, 23, 0)
 
     def configure(self):
+        import spimdisasm
+        import rabbitizer
+
         # Configure spimdisasm
         spimdisasm.common.GlobalConfig.PRODUCE_SYMBOLS_PLUS_OFFSET = True
         spimdisasm.common.GlobalConfig.TRUST_USER_FUNCTIONS = True
@@ -110,15 +113,36 @@ class SpimdisasmDisassembler(disassembler.Disassembler):
             options.opts.disasm_unknown
         )
 
+    @staticmethod
+    def get_spimdisasm_version() -> Tuple[str, Tuple[int, ...]]:
+        """
+        Returns the installed version of spimdisasm as a string and as a tuple. The package metadata is read so
+        spimdisasm itself is only imported once something gets disassembled
+        """
+        try:
+            version = importlib.metadata.version("spimdisasm")
+            version_info = tuple(int(part) for part in version.split(".")[:3])
+        except (importlib.metadata.PackageNotFoundError, ValueError):
+            import spimdisasm
+
+            return spimdisasm.__version__, spimdisasm.__version_info__
+        return version, version_info
+
     def check_version(self, skip_version_check: bool, splat_version: str):
-        if not skip_version_check and spimdisasm.__version_info__ < self.SPIMDISASM_MIN:
+        version, version_info = self.get_spimdisasm_version()
+
+        if not skip_version_check and version_info < self.SPIMDISASM_MIN:
             log.error(
-                f"splat {splat_version} requires as minimum spimdisasm {self.SPIMDISASM_MIN}, but the installed version is {spimdisasm.__version_info__}"
+                f"splat {splat_version} requires as minimum spimdisasm {self.SPIMDISASM_MIN}, but the installed version is {version_info}"
             )
 
-        log.write(
-            f"splat {splat_version} (powered by spimdisasm {spimdisasm.__version__})"
-        )
+        log.write(f"splat {splat_version} (powered by spimdisasm {version})")
 
     def known_types(self) -> Set[str]:
+        import spimdisasm
+
         return spimdisasm.common.gKnownTypes
+
+    def get_version(self) -> Optional[str]:
+        version, _ = self.get_spimdisasm_version()
+        return f"spimdisasm {version}"
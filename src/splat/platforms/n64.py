@@ -1,12 +1,22 @@
-from ..util import options, symbols
+from typing import TYPE_CHECKING
 
+from ..util import options
+from ..util.rom import RomBytes
 
-def init(target_bytes: bytes):
-    symbols.spim_context.fillDefaultBannedSymbols()
+if TYPE_CHECKING:
+    import spimdisasm
+
+
+def init(target_bytes: RomBytes):
+    pass
+
+
+def init_spim_context(context: "spimdisasm.common.Context"):
+    context.fillDefaultBannedSymbols()
 
     if options.opts.libultra_symbols:
-        symbols.spim_context.globalSegment.fillLibultraSymbols()
+        context.globalSegment.fillLibultraSymbols()
     if options.opts.ique_symbols:
-        symbols.spim_context.globalSegment.fillIQueSymbols()
+        context.globalSegment.fillIQueSymbols()
     if options.opts.hardware_regs:
-        symbols.spim_context.globalSegment.fillHardwareRegs(True)
+        context.globalSegment.fillHardwareRegs(True)
@@ -1,10 +1,20 @@
-import spimdisasm
-import rabbitizer
+from typing import TYPE_CHECKING
 
 from ..util import compiler, options
+from ..util.rom import RomBytes
 
+if TYPE_CHECKING:
+    import spimdisasm
+
+
+def init(target_bytes: RomBytes):
+    pass
+
+
+def init_spim_context(context: "spimdisasm.common.Context"):
+    import spimdisasm
+    import rabbitizer
 
-def init(target_bytes: bytes):
     rabbitizer.config.toolchainTweaks_treatJAsUnconditionalBranch = False
 
     spimdisasm.common.GlobalConfig.ABI = spimdisasm.common.Abi.EABI64
@@ -1,2 +1,5 @@
-def init(target_bytes: bytes):
+from ..util.rom import RomBytes
+
+
+def init(target_bytes: RomBytes):
     pass
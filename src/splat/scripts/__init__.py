@@ -1,3 +1,4 @@
 from . import capy as capy
 from . import create_config as create_config
 from . import split as split
+from . import serve as serve
@@ -0,0 +1,308 @@
+#! /usr/bin/env python3
+
+import argparse
+import json
+import socket
+import socketserver
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..segtypes.segment import Segment
+from ..util import log, symbols, watcher
+from . import split
+
+Request = Dict[str, Any]
+Response = Dict[str, Any]
+
+
+class SplitServer:
+    """
+    Stays running between requests, so build systems can ask for splits, linker scripts and symbol lookups without
+    paying for starting splat and importing the disassembler every time.
+
+    The split pipeline itself doesn't stay loaded: every split reads the config, loads the symbols and builds the
+    segments again, since scanning adds symbols to them and a second scan has to start from the same state as the
+    first one. That is cheap when the compiled config and symbol databases in .splat are up to date, and the cache
+    skips the segments which didn't change. Linker scripts and symbol lookups are answered from the segments and
+    symbols of the last run, which are only loaded again when one of the inputs changed.
+    """
+
+    def __init__(
+        self,
+        config_path: List[str],
+        verbose: bool,
+        skip_version_check: bool,
+        disassemble_all: bool,
+        jobs: int,
+        write_jobs: int,
+        pipeline: bool,
+    ):
+        self.config_path = config_path
+        self.verbose = verbose
+        self.skip_version_check = skip_version_check
+        self.disassemble_all = disassemble_all
+        self.jobs = jobs
+        self.write_jobs = write_jobs
+        self.pipeline = pipeline
+
+        self.all_segments: Optional[List[Segment]] = None
+        self.input_states: watcher.FileStates = {}
+        self.stopping = False
+
+    def remember(self, all_segments: List[Segment]):
+        self.all_segments = all_segments
+        self.input_states = watcher.get_file_states(
+            split.get_watched_files(self.config_path, all_segments)
+        )
+
+    def get_segments(self) -> List[Segment]:
+        if (
+            self.all_segments is None
+            or watcher.get_file_states(self.input_states.keys()) != self.input_states
+        ):
+            _, all_segments = split.initialize_pipeline(
+                self.config_path,
+                None,
+                self.verbose,
+                self.skip_version_check,
+                self.disassemble_all,
+            )
+            self.remember(all_segments)
+
+        assert self.all_segments is not None
+        return self.all_segments
+
+    def do_split(self, request: Request) -> Response:
+        segments = request.get("segments")
+        all_segments = split.split(
+            self.config_path,
+            request.get("modes"),
+            self.verbose,
+            True,
+            self.skip_version_check,
+            self.disassemble_all,
+            self.jobs,
+            self.write_jobs,
+            self.pipeline,
+            set(segments) if segments is not None else None,
+        )
+        self.remember(all_segments)
+
+        return {
+            "ok": True,
+            "scanned": [seg.name for seg in all_segments if seg.did_run],
+        }
+
+    def do_linker_script(self, request: Request) -> Response:
+        split.write_linker_files(self.get_segments())
+        return {"ok": True}
+
+    def do_symbol(self, request: Request) -> Response:
+        vram = request["vram"]
+        if isinstance(vram, str):
+            vram = int(vram, 0)
+
+        self.get_segments()
+
+        found: List[symbols.Symbol] = sorted(
+            symbols.all_symbols_ranges.at(vram), key=lambda sym: sym.vram_start
+        )
+        # Small symbols aren't in the range index
+        for address in range(vram - 4, vram + 1):
+            for sym in symbols.all_symbols_dict.get(address, []):
+                if sym not in found and sym.contains_vram(vram):
+                    found.append(sym)
+
+        return {
+            "ok": True,
+            "symbols": [
+                {
+                    "name": sym.name,
+                    "vram": sym.vram_start,
+                    "size": sym.size,
+                    "type": sym.type,
+                    "segment": sym.segment.name if sym.segment is not None else None,
+                }
+                for sym in found
+            ],
+        }
+
+    def do_shutdown(self, request: Request) -> Response:
+        self.stopping = True
+        return {"ok": True}
+
+    def handle(self, request: Request) -> Response:
+        handlers = {
+            "split": self.do_split,
+            "linker_script": self.do_linker_script,
+            "symbol": self.do_symbol,
+            "shutdown": self.do_shutdown,
+        }
+
+        command = request.get("command")
+        if command not in handlers:
+            return {"ok": False, "error": f"Unknown command {command}"}
+
+        log.last_error = None
+        try:
+            return handlers[command](request)
+        except SystemExit:
+            # log.error already reported the problem, the next request loads everything again
+            self.all_segments = None
+            return {"ok": False, "error": log.last_error}
+        except (KeyError, ValueError, TypeError) as e:
+            return {"ok": False, "error": f"Malformed request: {e!r}"}
+
+    def serve(self, socket_path: Path):
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                # One JSON request per line, each answered with one JSON line
+                for line in self.rfile:
+                    try:
+                        request = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        response: Response = {"ok": False, "error": str(e)}
+                    else:
+                        response = server.handle(request)
+                    self.wfile.write(json.dumps(response).encode() + b"\n")
+                    self.wfile.flush()
+                    if server.stopping:
+                        break
+
+        claim_socket(socket_path)
+
+        with socketserver.UnixStreamServer(str(socket_path), Handler) as unix_server:
+            log.write(f"Listening on {socket_path}")
+            try:
+                while not self.stopping:
+                    unix_server.handle_request()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                socket_path.unlink()
+
+
+def claim_socket(socket_path: Path):
+    """
+    Removes the socket left behind by a server which didn't exit cleanly, and exits if a server is still listening
+    on it
+    """
+    if not socket_path.is_socket():
+        return
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(socket_path))
+        except ConnectionRefusedError:
+            socket_path.unlink()
+            return
+
+    log.error(f"A server is already listening on {socket_path}")
+
+
+def request(socket_path: Path, payload: Request) -> Response:
+    """
+    Sends a single request to a running server and returns its response
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(str(socket_path))
+        with sock.makefile("rwb") as f:
+            f.write(json.dumps(payload).encode() + b"\n")
+            f.flush()
+            return json.loads(f.readline())
+
+
+def main(
+    config_path: List[str],
+    socket_path: Path,
+    verbose: bool,
+    skip_version_check: bool = False,
+    disassemble_all: bool = False,
+    jobs: int = 1,
+    write_jobs: int = 4,
+    pipeline: bool = False,
+):
+    SplitServer(
+        config_path,
+        verbose,
+        skip_version_check,
+        disassemble_all,
+        jobs,
+        write_jobs,
+        pipeline,
+    ).serve(socket_path)
+
+
+def add_arguments_to_parser(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "config", help="path to a compatible config .yaml file", nargs="+"
+    )
+    parser.add_argument(
+        "--socket",
+        type=Path,
+        default=Path("splat.sock"),
+        help="Path of the Unix socket to listen on",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Enable debug logging")
+    parser.add_argument(
+        "--skip-version-check",
+        action="store_true",
+        help="Skips the disassembler's version check",
+    )
+    parser.add_argument(
+        "--disassemble-all",
+        help="Disasemble matched functions and migrated data",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes used to split code segments",
+    )
+    parser.add_argument(
+        "--write-jobs",
+        type=int,
+        default=4,
+        help="Number of threads writing the split files. 1 writes them as they are produced",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Split each segment as soon as the segments whose symbols it can see have been scanned",
+    )
+
+
+def process_arguments(args: argparse.Namespace):
+    main(
+        args.config,
+        args.socket,
+        args.verbose,
+        args.skip_version_check,
+        args.disassemble_all,
+        args.jobs,
+        args.write_jobs,
+        args.pipeline,
+    )
+
+
+script_description = "Serve split requests from build systems over a Unix socket"
+
+
+def add_subparser(subparser: argparse._SubParsersAction):
+    parser = subparser.add_parser(
+        "serve", help=script_description, description=script_description
+    )
+    add_arguments_to_parser(parser)
+    parser.set_defaults(func=process_arguments)
+
+
+parser = argparse.ArgumentParser(description=script_description)
+add_arguments_to_parser(parser)
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    process_arguments(args)
@@ -1,22 +1,38 @@
 #! /usr/bin/env python3
 
 import argparse
-import hashlib
 import importlib
 import pickle
+import time
 from typing import Any, Dict, List, Optional, Set, Tuple, Union
 from pathlib import Path
 
 from .. import __package_name__, __version__
 from ..disassembler import disassembler_instance
-from ..util import cache_handler, progress_bar, vram_classes, statistics
+from ..util import (
+    cache_handler,
+    config_cache,
+    file_writer,
+    history,
+    memory,
+    plan,
+    progress_bar,
+    vram_classes,
+    statistics,
+    scan_products,
+    scheduler,
+    selection,
+    split_pool,
+    timings,
+    trace,
+    watcher,
+)
 
 # This unused import makes the yaml library faster. don't remove
 import pylibyaml  # pyright: ignore
 import yaml
 
 from colorama import Fore, Style
-from intervaltree import Interval, IntervalTree
 import sys
 
 from ..segtypes.linker_entry import (
@@ -24,21 +40,27 @@ from ..segtypes.linker_entry import (
     get_segment_vram_end_symbol_name,
 )
 from ..segtypes.segment import Segment
-from ..util import log, options, palettes, symbols, relocs
+from ..segtypes.common.code import CommonSegCode
+from ..segtypes.common.codesubsegment import CommonSegCodeSubsegment
+from ..segtypes.common.c import CommonSegC
+from ..segtypes.common.group import CommonSegGroup
+from ..util import log, options, palettes, symbols, relocs, rom
+from ..util.range_index import RangeIndex
+from ..util.rom import RomBytes
 
 linker_writer: LinkerWriter
 config: Dict[str, Any]
 
-segment_roms: IntervalTree = IntervalTree()
-segment_rams: IntervalTree = IntervalTree()
+segment_roms: RangeIndex[Segment] = RangeIndex()
+segment_rams: RangeIndex[Segment] = RangeIndex()
 
 
 def initialize_segments(config_segments: Union[dict, list]) -> List[Segment]:
     global segment_roms
     global segment_rams
 
-    segment_roms = IntervalTree()
-    segment_rams = IntervalTree()
+    segment_roms = RangeIndex()
+    segment_rams = RangeIndex()
 
     segments_by_name: Dict[str, Segment] = {}
     ret = []
@@ -89,13 +111,13 @@ def initialize_segments(config_segments: Union[dict, list]) -> List[Segment]:
             and isinstance(segment.rom_end, int)
             and segment.rom_start != segment.rom_end
         ):
-            segment_roms.addi(segment.rom_start, segment.rom_end, segment)
+            segment_roms.add(segment.rom_start, segment.rom_end, segment)
         if (
             isinstance(segment.vram_start, int)
             and isinstance(segment.vram_end, int)
             and segment.vram_start != segment.vram_end
         ):
-            segment_rams.addi(segment.vram_start, segment.vram_end, segment)
+            segment_rams.add(segment.vram_start, segment.vram_end, segment)
 
         if next_start is not None:
             last_rom_end = next_start
@@ -119,19 +141,15 @@ def assign_symbols_to_segments():
             continue
 
         if symbol.rom:
-            cands: Set[Interval] = segment_roms[symbol.rom]
+            cands = segment_roms.at(symbol.rom)
             if len(cands) > 1:
                 log.error("multiple segments rom overlap symbol", symbol)
             elif len(cands) == 0:
                 log.error("no segment rom overlaps symbol", symbol)
             else:
-                cand: Interval = cands.pop()
-                seg: Segment = cand.data
-                seg.add_symbol(symbol)
+                cands[0].add_symbol(symbol)
         else:
-            cands = segment_rams[symbol.vram_start]
-            segs: List[Segment] = [cand.data for cand in cands]
-            for seg in segs:
+            for seg in segment_rams.at(symbol.vram_start):
                 if not seg.get_exclusive_ram_id():
                     seg.add_symbol(symbol)
 
@@ -203,11 +221,16 @@ def initialize_config(
     verbose: bool,
     disassemble_all: bool = False,
 ) -> Dict[str, Any]:
-    config: Dict[str, Any] = {}
-    for entry in config_path:
-        with open(entry) as f:
-            additional_config = yaml.load(f.read(), Loader=yaml.SafeLoader)
-        config = merge_configs(config, additional_config)
+    cached_config = config_cache.load(config_path)
+    if cached_config is not None:
+        config = cached_config
+    else:
+        config = {}
+        for entry in config_path:
+            with open(entry) as f:
+                additional_config = yaml.load(f.read(), Loader=yaml.SafeLoader)
+            config = merge_configs(config, additional_config)
+        config_cache.save(config_path, config)
 
     vram_classes.initialize(config.get("vram_classes"))
 
@@ -216,27 +239,34 @@ def initialize_config(
     return config
 
 
-def read_target_binary() -> bytes:
-    rom_bytes = options.opts.target_path.read_bytes()
+def read_target_binary() -> RomBytes:
+    rom_bytes = rom.map_file(options.opts.target_path)
 
-    if "sha1" in config:
-        sha1 = hashlib.sha1(rom_bytes).hexdigest()
-        e_sha1 = config["sha1"].lower()
-        if e_sha1 != sha1:
-            log.error(f"sha1 mismatch: expected {e_sha1}, was {sha1}")
+    # sha1 takes priority, the faster checksums are only used when it isn't given
+    algorithm = next((alg for alg in rom.CHECKSUMS if alg in config), None)
+    if algorithm is not None:
+        checksum = rom.get_checksum(options.opts.target_path, rom_bytes, algorithm)
+        expected = rom.normalize_checksum(config[algorithm])
+        if expected != checksum:
+            log.error(f"{algorithm} mismatch: expected {expected}, was {checksum}")
     else:
         log.write("Warning: no sha1 in config")
 
     return rom_bytes
 
 
-def initialize_platform(rom_bytes: bytes):
+def initialize_platform(rom_bytes: RomBytes):
     platform_module = importlib.import_module(
         f"{__package_name__}.platforms.{options.opts.platform}"
     )
     platform_init = getattr(platform_module, "init")
     platform_init(rom_bytes)
 
+    # Platforms may add to the spimdisasm context, which is only created once something gets disassembled
+    symbols.spim_context_initializer = getattr(
+        platform_module, "init_spim_context", None
+    )
+
     return platform_module
 
 
@@ -249,13 +279,66 @@ def initialize_all_symbols(all_segments: List[Segment]):
     assign_symbols_to_segments()
 
     if options.opts.is_mode_active("code"):
-        symbols.initialize_spim_context(all_segments)
-        relocs.initialize_spim_context()
+        with trace.span("initialize_spim_context"):
+            symbols.initialize_spim_context(all_segments)
+            relocs.initialize_spim_context()
+
+
+def get_parallel_split_candidates(
+    all_segments: List[Segment],
+    cache: cache_handler.Cache,
+    selected: Optional[selection.Selection] = None,
+) -> List[Segment]:
+    # Only code segments are worth the overhead of being split in a worker
+    return [
+        segment
+        for segment in all_segments
+        if isinstance(segment, CommonSegCode)
+        and segment.should_split()
+        and not cache.check_cache_hit(segment, False)
+        # Splitting part of a segment happens in this process
+        and (
+            selected is None
+            or (
+                selected.is_selected(segment)
+                and selected.get_subsegment_names(segment) is None
+            )
+        )
+    ]
+
+
+def scan_top_level_segment(
+    segment: Segment,
+    rom_bytes: RomBytes,
+    stats: statistics.Statistics,
+    cache: cache_handler.Cache,
+) -> bool:
+    typ = segment.type
+    if segment.type == "bin" and segment.is_name_default():
+        typ = "unk"
+
+    stats.add_size(typ, segment.size)
+
+    if not segment.should_scan():
+        return False
+
+    # Check cache but don't write anything
+    if cache.check_cache_hit(segment, False):
+        # Bring back the symbols the segment's scan found when it was cached
+        cache.replay(segment, "scan")
+        return False
+
+    with timings.segment(segment, "scan"), memory.segment(segment, "scan"):
+        segment.did_run = True
+        cache.record(segment, "scan", lambda: segment.scan(rom_bytes))
+
+    stats.count_split(typ)
+    return True
 
 
 def do_scan(
     all_segments: List[Segment],
-    rom_bytes: bytes,
+    rom_bytes: RomBytes,
     stats: statistics.Statistics,
     cache: cache_handler.Cache,
 ):
@@ -265,49 +348,135 @@ def do_scan(
     for segment in scan_bar:
         assert isinstance(segment, Segment)
         scan_bar.set_description(f"Scanning {brief_seg_name(segment, 20)}")
-        typ = segment.type
-        if segment.type == "bin" and segment.is_name_default():
-            typ = "unk"
 
-        stats.add_size(typ, segment.size)
+        if scan_top_level_segment(segment, rom_bytes, stats, cache):
+            processed_segments.append(segment)
 
-        if segment.should_scan():
-            # Check cache but don't write anything
-            if cache.check_cache_hit(segment, False):
-                continue
+    symbols.mark_c_funcs_as_defined()
+    return processed_segments
 
-            segment.did_run = True
-            segment.scan(rom_bytes)
 
-            processed_segments.append(segment)
+def split_segment(segment: Segment, rom_bytes: RomBytes):
+    segment_bytes = rom_bytes
+    if segment.file_path:
+        segment_bytes = rom.map_file(segment.file_path)
+    segment.split(segment_bytes)
 
-            stats.count_split(typ)
 
-    symbols.mark_c_funcs_as_defined()
-    return processed_segments
+def split_subsegments(segment: Segment, names: Set[str], rom_bytes: RomBytes):
+    assert isinstance(segment, CommonSegGroup)
+    segment_bytes = rom_bytes
+    if segment.file_path:
+        segment_bytes = rom.map_file(segment.file_path)
+    for sub in segment.subsegments:
+        if sub.name in names and sub.should_split():
+            with timings.segment(sub, "split"):
+                sub.split(segment_bytes)
+
+
+def split_top_level_segment(
+    segment: Segment,
+    rom_bytes: RomBytes,
+    stats: statistics.Statistics,
+    cache: cache_handler.Cache,
+    pool: Optional[split_pool.SplitPool] = None,
+    selected: Optional[selection.Selection] = None,
+):
+    if selected is not None and not selected.is_selected(segment):
+        # Only scanned so the selected segments can see its symbols
+        return
+
+    subsegment_names = (
+        None if selected is None else selected.get_subsegment_names(segment)
+    )
+    if subsegment_names is not None:
+        # Only part of the segment gets split, so it can't be cached as a whole
+        if cache.check_cache_hit(segment, False):
+            stats.count_cached(segment.type)
+            cache.replay(segment, "split")
+        elif segment.should_split():
+            with timings.segment(segment, "split"), memory.segment(segment, "split"):
+                split_subsegments(segment, subsegment_names, rom_bytes)
+        return
+
+    if cache.check_cache_hit(segment, True):
+        stats.count_cached(segment.type)
+        cache.replay(segment, "split")
+        return
+
+    if segment.should_split():
+        if pool is not None and pool.owns(segment):
+            pool.split(segment)
+        else:
+            with timings.segment(segment, "split"), memory.segment(segment, "split"):
+                cache.record(
+                    segment, "split", lambda: split_segment(segment, rom_bytes)
+                )
 
 
 def do_split(
     all_segments: List[Segment],
-    rom_bytes: bytes,
+    rom_bytes: RomBytes,
     stats: statistics.Statistics,
     cache: cache_handler.Cache,
+    pool: Optional[split_pool.SplitPool] = None,
+    selected: Optional[selection.Selection] = None,
 ):
     split_bar = progress_bar.get_progress_bar(all_segments)
     for segment in split_bar:
         assert isinstance(segment, Segment)
         split_bar.set_description(f"Splitting {brief_seg_name(segment, 20)}")
 
-        if cache.check_cache_hit(segment, True):
-            stats.count_cached(segment.type)
-            continue
+        split_top_level_segment(segment, rom_bytes, stats, cache, pool, selected)
+
+    if pool is not None:
+        for products in pool.finish_split():
+            cache.store_products("split", products)
+
+    file_writer.flush()
+
+
+def release_disassembly(segment: Segment):
+    # The spimdisasm sections are only needed to split a segment, let them go once it has been written
+    if isinstance(segment, CommonSegCodeSubsegment):
+        segment.spim_section = None
+    if isinstance(segment, CommonSegGroup):
+        for subsegment in segment.subsegments:
+            release_disassembly(subsegment)
+
+
+def do_pipelined_scan_and_split(
+    all_segments: List[Segment],
+    rom_bytes: RomBytes,
+    stats: statistics.Statistics,
+    cache: cache_handler.Cache,
+    selected: Optional[selection.Selection] = None,
+):
+    # Cached segments count as scanned once the products of their scan have been replayed
+    to_scan = [segment for segment in all_segments if segment.should_scan()]
+    split_scheduler = scheduler.SplitScheduler(all_segments, to_scan)
+
+    def split_ready_segments():
+        for segment in split_scheduler.pop_ready():
+            split_top_level_segment(segment, rom_bytes, stats, cache, None, selected)
+            release_disassembly(segment)
+
+    split_ready_segments()
+
+    scan_bar = progress_bar.get_progress_bar(all_segments)
+    for segment in scan_bar:
+        assert isinstance(segment, Segment)
+        scan_bar.set_description(f"Scanning {brief_seg_name(segment, 20)}")
+
+        scan_top_level_segment(segment, rom_bytes, stats, cache)
+        split_scheduler.mark_scanned(segment)
+        # Like in a serial run, the segments split once everything has been scanned see the C functions as defined
+        if not split_scheduler.all_scanned():
+            split_ready_segments()
 
-        if segment.should_split():
-            segment_bytes = rom_bytes
-            if segment.file_path:
-                with open(segment.file_path, "rb") as segment_input_file:
-                    segment_bytes = segment_input_file.read()
-            segment.split(segment_bytes)
+    symbols.mark_c_funcs_as_defined()
+    split_ready_segments()
+    file_writer.flush()
 
 
 def write_linker_script(all_segments: List[Segment]) -> LinkerWriter:
@@ -389,6 +558,13 @@ def write_linker_script(all_segments: List[Segment]) -> LinkerWriter:
     return linker_writer
 
 
+def write_linker_files(all_segments: List[Segment]):
+    global linker_writer
+    linker_writer = write_linker_script(all_segments)
+    write_ld_dependencies(linker_writer)
+    write_elf_sections_file(all_segments)
+
+
 def write_ld_dependencies(linker_writer: LinkerWriter):
     if options.opts.ld_dependencies:
         elf_path = options.opts.elf_path
@@ -401,6 +577,7 @@ def write_ld_dependencies(linker_writer: LinkerWriter):
         )
 
 
+@trace.traced("write_elf_sections_file")
 def write_elf_sections_file(all_segments: List[Segment]):
     # write elf_sections.txt - this only lists the generated sections in the elf, not subsections
     # that the elf combines into one section
@@ -463,7 +640,7 @@ def dump_symbols() -> None:
     if not options.opts.dump_symbols:
         return
 
-    splat_hidden_folder = options.opts.base_path / ".splat"
+    splat_hidden_folder = options.opts.get_splat_hidden_path()
     splat_hidden_folder.mkdir(parents=True, exist_ok=True)
 
     with open(splat_hidden_folder / "splat_symbols.csv", "w") as f:
@@ -486,6 +663,76 @@ def dump_symbols() -> None:
     symbols.spim_context.saveContextToFile(splat_hidden_folder / "spim_context.csv")
 
 
+def get_watched_files(config_path: List[str], all_segments: List[Segment]) -> Set[Path]:
+    ret = {Path(path) for path in config_path}
+    ret.add(options.opts.target_path)
+    ret.update(options.opts.symbol_addrs_paths)
+    ret.update(options.opts.reloc_addrs_paths)
+
+    # The C files decide which functions are already matched
+    def add_c_files(segments: List[Segment]):
+        for segment in segments:
+            if isinstance(segment, CommonSegC):
+                path = segment.out_path()
+                if path is not None:
+                    ret.add(path)
+            if isinstance(segment, CommonSegGroup):
+                add_c_files(segment.subsegments)
+
+    add_c_files(all_segments)
+    return ret
+
+
+def watch(
+    config_path: List[str],
+    modes: Optional[List[str]],
+    verbose: bool,
+    skip_version_check: bool,
+    disassemble_all: bool,
+    jobs: int,
+    write_jobs: int,
+    pipeline: bool,
+    timings_top: Optional[int] = None,
+    trace_path: Optional[Path] = None,
+    memory_report: Optional[str] = None,
+    selected: Optional[Set[str]] = None,
+):
+    """
+    Splits again every time one of the inputs changes, without paying for starting splat each time. Only the
+    segments affected by the change are split again, through the cache
+    """
+    watched = {Path(path) for path in config_path}
+
+    try:
+        while True:
+            try:
+                all_segments = split(
+                    config_path,
+                    modes,
+                    verbose,
+                    True,
+                    skip_version_check,
+                    disassemble_all,
+                    jobs,
+                    write_jobs,
+                    pipeline,
+                    selected,
+                    timings_top=timings_top,
+                    trace_path=trace_path,
+                    memory_report=memory_report,
+                )
+                watched = get_watched_files(config_path, all_segments)
+            except SystemExit:
+                # log.error already reported the problem, wait for it to be fixed
+                pass
+
+            log.write("Watching for changes, press Ctrl+C to stop")
+            changed = watcher.wait_for_changes(watched)
+            log.write(f"{', '.join(str(path) for path in changed)} changed")
+    except KeyboardInterrupt:
+        pass
+
+
 def main(
     config_path: List[str],
     modes: Optional[List[str]],
@@ -494,55 +741,293 @@ def main(
     skip_version_check: bool = False,
     stdout_only: bool = False,
     disassemble_all: bool = False,
+    jobs: int = 1,
+    write_jobs: int = 4,
+    pipeline: bool = False,
+    watch_inputs: bool = False,
+    timings_top: Optional[int] = None,
+    trace_path: Optional[Path] = None,
+    memory_report: Optional[str] = None,
+    selected: Optional[Set[str]] = None,
+    plan_only: bool = False,
 ):
     if stdout_only:
         progress_bar.out_file = sys.stdout
 
+    if plan_only:
+        planned = make_plan(
+            config_path,
+            modes,
+            verbose,
+            use_cache,
+            skip_version_check,
+            disassemble_all,
+            selected,
+        )
+        # Lets scripts skip the split when there's nothing to do
+        sys.exit(1 if planned else 0)
+    elif watch_inputs:
+        watch(
+            config_path,
+            modes,
+            verbose,
+            skip_version_check,
+            disassemble_all,
+            jobs,
+            write_jobs,
+            pipeline,
+            timings_top,
+            trace_path,
+            memory_report,
+            selected,
+        )
+    else:
+        split(
+            config_path,
+            modes,
+            verbose,
+            use_cache,
+            skip_version_check,
+            disassemble_all,
+            jobs,
+            write_jobs,
+            pipeline,
+            selected,
+            timings_top=timings_top,
+            trace_path=trace_path,
+            memory_report=memory_report,
+        )
+
+
+def initialize_pipeline(
+    config_path: List[str],
+    modes: Optional[List[str]],
+    verbose: bool,
+    skip_version_check: bool,
+    disassemble_all: bool,
+) -> Tuple[RomBytes, List[Segment]]:
+    """
+    Loads the config, the target, the segments and the symbols, starting from a clean state so a process can do it
+    more than once
+    """
+    symbols.reset_symbols()
+    symbols.reset_spim_context()
+
     # Load config
     global config
-    config = initialize_config(config_path, modes, verbose, disassemble_all)
+    with timings.phase("initialize_config"):
+        config = initialize_config(config_path, modes, verbose, disassemble_all)
 
     disassembler_instance.create_disassembler_instance(skip_version_check, __version__)
 
-    rom_bytes = read_target_binary()
+    with timings.phase("read_target_binary"):
+        rom_bytes = read_target_binary()
 
     # Create main output dir
     options.opts.base_path.mkdir(parents=True, exist_ok=True)
 
-    stats = statistics.Statistics()
-
-    cache = cache_handler.Cache(config, use_cache, verbose)
-
-    initialize_platform(rom_bytes)
+    with timings.phase("initialize_platform"):
+        initialize_platform(rom_bytes)
 
     # Initialize segments
-    all_segments = initialize_segments(config["segments"])
+    with timings.phase("initialize_segments"):
+        all_segments = initialize_segments(config["segments"])
 
-    initialize_all_symbols(all_segments)
+    with timings.phase("initialize_all_symbols"):
+        initialize_all_symbols(all_segments)
 
     # Resolve raster/palette siblings
     if options.opts.is_mode_active("img"):
-        palettes.initialize(all_segments)
+        with timings.phase("palettes.initialize"):
+            palettes.initialize(all_segments)
+
+    return rom_bytes, all_segments
+
+
+def record_history(
+    config_path: List[str],
+    modes: Optional[List[str]],
+    selected: Optional[Set[str]],
+    stats: statistics.Statistics,
+    rom_size: int,
+    segment_count: int,
+    total: float,
+):
+    run = history.Run(
+        key=history.get_key(config_path, modes, selected),
+        kind=history.get_kind(
+            sum(stats.seg_split.values()), sum(stats.seg_cached.values())
+        ),
+        splat_version=__version__,
+        disassembler_version=disassembler_instance.get_instance().get_version(),
+        config_digest=history.get_config_digest(config_path),
+        rom_size=rom_size,
+        segments=segment_count,
+        symbols=len(symbols.all_symbols),
+        total=total,
+        phases=timings.get_phase_walls(),
+    )
+    history.record(
+        options.opts.get_splat_hidden_path() / history.HISTORY_FILENAME,
+        run,
+        options.opts.perf_regression_threshold,
+    )
+
+
+def get_segments_to_process(
+    all_segments: List[Segment], selected: Optional[Set[str]]
+) -> Tuple[List[Segment], Optional[selection.Selection]]:
+    """
+    Returns the segments which are scanned and split during this run, along with the selection they come from
+    """
+    if selected is None:
+        return all_segments, None
+
+    segment_selection = selection.Selection(all_segments, selected)
+    for pattern in segment_selection.unmatched:
+        log.error(f"No segment matches {pattern}")
+    return segment_selection.get_closure(all_segments), segment_selection
+
+
+def make_plan(
+    config_path: List[str],
+    modes: Optional[List[str]],
+    verbose: bool,
+    use_cache: bool,
+    skip_version_check: bool,
+    disassemble_all: bool,
+    selected: Optional[Set[str]] = None,
+) -> List[plan.PlannedSegment]:
+    """
+    Reports which segments a split with the same arguments would scan or split again and why, without scanning or
+    splitting anything
+    """
+    timings.initialize(False)
+    trace.initialize(False)
+    memory.initialize(None)
+
+    rom_bytes, all_segments = initialize_pipeline(
+        config_path, modes, verbose, skip_version_check, disassemble_all
+    )
+    segments, segment_selection = get_segments_to_process(all_segments, selected)
+
+    cache = cache_handler.Cache(use_cache, verbose)
+    cache.set_rom_bytes(rom_bytes)
+    cache.index_symbols(symbols.all_symbols, relocs.all_relocs)
+    try:
+        planned = plan.get_plan(segments, cache, segment_selection)
+    finally:
+        cache.close()
+
+    estimated = None
+    if planned:
+        estimated = plan.estimate(
+            history.load(
+                options.opts.get_splat_hidden_path() / history.HISTORY_FILENAME
+            ),
+            history.get_key(config_path, modes, selected),
+            planned,
+        )
+    plan.print_plan(planned, estimated)
+    return planned
+
+
+def split(
+    config_path: List[str],
+    modes: Optional[List[str]],
+    verbose: bool,
+    use_cache: bool,
+    skip_version_check: bool,
+    disassemble_all: bool,
+    jobs: int,
+    write_jobs: int,
+    pipeline: bool,
+    selected: Optional[Set[str]] = None,
+    timings_top: Optional[int] = None,
+    trace_path: Optional[Path] = None,
+    memory_report: Optional[str] = None,
+) -> List[Segment]:
+    """
+    Runs a whole split. When `selected` is given, only the segments matching those names or glob patterns are split,
+    only the segments they could see symbols of are scanned, and the files describing the whole rom (linker script,
+    undefined symbols, symbol dumps) aren't written.
+    When `timings_top` is given, the time taken by each phase and segment is reported, `trace_path` receives
+    a trace of the whole run and `memory_report` ("rss" or "tracemalloc") reports the memory used along the way
+    """
+    start = time.perf_counter()
+    timings.initialize(timings_top is not None)
+    trace.initialize(trace_path is not None)
+    memory.initialize(memory_report)
+
+    rom_bytes, all_segments = initialize_pipeline(
+        config_path, modes, verbose, skip_version_check, disassemble_all
+    )
+
+    segments, segment_selection = get_segments_to_process(all_segments, selected)
 
-    # Scan
-    do_scan(all_segments, rom_bytes, stats, cache)
+    stats = statistics.Statistics()
+
+    cache = cache_handler.Cache(use_cache, verbose)
+
+    cache.set_rom_bytes(rom_bytes)
 
-    # Split
-    do_split(all_segments, rom_bytes, stats, cache)
+    with timings.phase("cache.index_symbols"):
+        recorder = scan_products.ProductRecorder(all_segments)
+        cache.set_recorder(recorder)
+        cache.index_symbols(symbols.all_symbols, relocs.all_relocs)
 
-    if options.opts.is_mode_active(
-        "ld"
-    ):  # TODO move this to platform initialization when it gets implemented
-        global linker_writer
-        linker_writer = write_linker_script(all_segments)
-        write_ld_dependencies(linker_writer)
-        write_elf_sections_file(all_segments)
+    file_writer.initialize(write_jobs)
+
+    if pipeline and jobs > 1:
+        log.write(
+            "Warning: --pipeline can't be used together with --jobs, scanning everything before splitting",
+            status="warn",
+        )
 
-    # Write undefined_funcs_auto.txt
-    write_undefined_funcs_auto()
+    pool: Optional[split_pool.SplitPool] = None
+    try:
+        if pipeline and jobs <= 1:
+            # Split every segment as soon as the segments it depends on are scanned
+            with timings.phase("do_pipelined_scan_and_split"):
+                do_pipelined_scan_and_split(
+                    segments, rom_bytes, stats, cache, segment_selection
+                )
+        else:
+            # Scan
+            with timings.phase("do_scan"):
+                do_scan(segments, rom_bytes, stats, cache)
+
+            # The workers are forked now so they start from every symbol the scans found
+            pool = split_pool.create_split_pool(
+                recorder,
+                get_parallel_split_candidates(segments, cache, segment_selection),
+                jobs,
+                rom_bytes,
+                split_segment,
+            )
 
-    # write undefined_syms_auto.txt
-    write_undefined_syms_auto()
+            # Split
+            with timings.phase("do_split"):
+                do_split(segments, rom_bytes, stats, cache, pool, segment_selection)
+    finally:
+        if pool is not None:
+            pool.close()
+        with timings.phase("file_writer.shutdown"):
+            file_writer.shutdown()
+
+    if selected is None:
+        if options.opts.is_mode_active(
+            "ld"
+        ):  # TODO move this to platform initialization when it gets implemented
+            with timings.phase("write_linker_script"):
+                write_linker_files(all_segments)
+
+        with timings.phase("write_undefined_auto"):
+            # Write undefined_funcs_auto.txt
+            write_undefined_funcs_auto()
+
+            # write undefined_syms_auto.txt
+            write_undefined_syms_auto()
 
     # print warnings during split
     print_segment_warnings(all_segments)
@@ -551,10 +1036,40 @@ def main(
     stats.print_statistics(len(rom_bytes))
 
     # Save cache
-    cache.save(verbose)
+    with timings.phase("cache.save"):
+        cache.save(verbose)
+
+    if selected is None and options.opts.is_mode_active("code"):
+        with timings.phase("dump_symbols"):
+            dump_symbols()
+
+    if options.opts.perf_history:
+        record_history(
+            config_path,
+            modes,
+            selected,
+            stats,
+            len(rom_bytes),
+            len(all_segments),
+            time.perf_counter() - start,
+        )
 
-    if options.opts.is_mode_active("code"):
-        dump_symbols()
+    if timings_top is not None:
+        timings.print_report(timings_top)
+        timings.write_report(
+            options.opts.get_splat_hidden_path() / timings.TIMINGS_FILENAME
+        )
+
+    if trace_path is not None:
+        trace.write(trace_path)
+
+    if memory_report is not None:
+        memory.print_report()
+        memory.write_report(
+            options.opts.get_splat_hidden_path() / memory.MEMORY_FILENAME
+        )
+
+    return all_segments
 
 
 def add_arguments_to_parser(parser: argparse.ArgumentParser):
@@ -579,6 +1094,67 @@ def add_arguments_to_parser(parser: argparse.ArgumentParser):
         help="Disasemble matched functions and migrated data",
         action="store_true",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes used to split code segments",
+    )
+    parser.add_argument(
+        "--write-jobs",
+        type=int,
+        default=4,
+        help="Number of threads writing the split files. 1 writes them as they are produced",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Split each segment as soon as the segments whose symbols it can see have been scanned",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and split again whenever the config, the symbol and reloc files, the target or a C file changes. Implies --use-cache",
+    )
+    parser.add_argument(
+        "--timings",
+        type=int,
+        nargs="?",
+        const=10,
+        metavar="N",
+        help="Report the time taken by each phase and segment type, and the N slowest segments (10 by default). The full report is written to .splat/timings.json",
+    )
+    parser.add_argument(
+        "--trace",
+        type=Path,
+        metavar="PATH",
+        help="Write a trace of the run in the Chrome trace event format, viewable in chrome://tracing or Perfetto",
+    )
+    parser.add_argument(
+        "--memory-report",
+        nargs="?",
+        const="rss",
+        choices=["rss", "tracemalloc"],
+        help="Report the memory used after each phase and by each segment type. 'tracemalloc' also finds the biggest allocation sites, but is much slower. The full report is written to .splat/memory.json",
+    )
+    parser.add_argument(
+        "--segments",
+        nargs="+",
+        metavar="NAME",
+        help="Only split the segments with these names or glob patterns (comma separated or not), scanning just the segments whose symbols they can see. A subsegment name splits every subsegment of that file",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Only list the segments a split would scan or split again, why, and how long it should take. Exits with 1 if there is anything to do",
+    )
+
+
+def get_selected_segments(names: Optional[List[str]]) -> Optional[Set[str]]:
+    if names is None:
+        return None
+    return {name for arg in names for name in arg.split(",") if name}
 
 
 def process_arguments(args: argparse.Namespace):
@@ -590,6 +1166,15 @@ def process_arguments(args: argparse.Namespace):
         args.skip_version_check,
         args.stdout_only,
         args.disassemble_all,
+        args.jobs,
+        args.write_jobs,
+        args.pipeline,
+        args.watch,
+        args.timings,
+        args.trace,
+        args.memory_report,
+        get_selected_segments(args.segments),
+        args.plan,
     )
 
 
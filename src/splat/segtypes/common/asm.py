@@ -1,7 +1,8 @@
 from pathlib import Path
 from typing import Optional
 
-from ...util import options
+from ...util import file_writer, options
+from ...util.rom import RomBytes
 
 from .codesubsegment import CommonSegCodeSubsegment
 
@@ -17,7 +18,7 @@ class CommonSegAsm(CommonSegCodeSubsegment):
     def out_path(self) -> Optional[Path]:
         return options.opts.asm_path / self.dir / f"{self.name}.s"
 
-    def scan(self, rom_bytes: bytes):
+    def scan(self, rom_bytes: RomBytes):
         if (
             self.rom_start is not None
             and self.rom_end is not None
@@ -28,15 +29,12 @@ class CommonSegAsm(CommonSegCodeSubsegment):
     def get_file_header(self):
         return []
 
-    def split(self, rom_bytes: bytes):
+    def split(self, rom_bytes: RomBytes):
         if not self.rom_start == self.rom_end and self.spim_section is not None:
             out_path = self.out_path()
             if out_path:
-                out_path.parent.mkdir(parents=True, exist_ok=True)
-
                 self.print_file_boundaries()
 
-                with open(out_path, "w", newline="\n") as f:
-                    for line in self.get_file_header():
-                        f.write(line + "\n")
-                    f.write(self.spim_section.disassemble())
+                content = "".join(line + "\n" for line in self.get_file_header())
+                content += self.spim_section.disassemble()
+                file_writer.write_text(out_path, content)
@@ -1,7 +1,7 @@
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Set
 
-from ...util import log, options
+from ...util import file_writer, log, options
 
 from .segment import CommonSegment
 
@@ -11,22 +11,23 @@ class CommonSegBin(CommonSegment):
     def is_data() -> bool:
         return True
 
+    def cache_options(self) -> Optional[Set[str]]:
+        return {"asset_path"}
+
     def out_path(self) -> Optional[Path]:
         return options.opts.asset_path / self.dir / f"{self.name}.bin"
 
     def split(self, rom_bytes):
         path = self.out_path()
         assert path is not None
-        path.parent.mkdir(parents=True, exist_ok=True)
 
         if self.rom_end is None:
             log.error(
                 f"segment {self.name} needs to know where it ends; add a position marker [0xDEADBEEF] after it"
             )
 
-        with open(path, "wb") as f:
-            assert isinstance(self.rom_start, int)
-            assert isinstance(self.rom_end, int)
+        assert isinstance(self.rom_start, int)
+        assert isinstance(self.rom_end, int)
 
-            f.write(rom_bytes[self.rom_start : self.rom_end])
+        file_writer.write_bytes(path, rom_bytes[self.rom_start : self.rom_end])
         self.log(f"Wrote {self.name} to {path}")
@@ -1,4 +1,5 @@
-from ...util import options, symbols, log
+from ...util import options, symbols, log, trace
+from ...util.rom import RomBytes
 
 from .data import CommonSegData
 
@@ -30,7 +31,8 @@ class CommonSegBss(CommonSegData):
 
         pass
 
-    def disassemble_data(self, rom_bytes: bytes):
+    @trace.traced("disassemble_data")
+    def disassemble_data(self, rom_bytes: RomBytes):
         if not options.opts.ld_bss_is_noload:
             super().disassemble_data(rom_bytes)
             return
@@ -1,18 +1,19 @@
+import io
 import os
 import re
 from pathlib import Path
-from typing import Optional, Set, List
+from typing import Optional, Set, List, TYPE_CHECKING
 
-import rabbitizer
-import spimdisasm
-
-from ...util import log, options, symbols
+from ...util import file_writer, log, options, rom, symbols
 from ...util.compiler import GCC, SN64, IDO
+from ...util.rom import RomBytes
 from ...util.symbols import Symbol
 
 from .codesubsegment import CommonSegCodeSubsegment
 from .rodata import CommonSegRodata
 
+if TYPE_CHECKING:
+    import spimdisasm
 
 STRIP_C_COMMENTS_RE = re.compile(
     r'//.*?$|/\*.*?\*/|\'(?:\\.|[^\\\'])*\'|"(?:\\.|[^\\"])*"',
@@ -129,7 +130,15 @@ class CommonSegC(CommonSegCodeSubsegment):
     def out_path(self) -> Optional[Path]:
         return options.opts.src_path / self.dir / f"{self.name}.{self.file_extension}"
 
-    def scan(self, rom_bytes: bytes):
+    def cache(self):
+        # The functions which are already written in C change what this segment produces
+        path = self.out_path()
+        source = None
+        if path is not None and path.exists():
+            source = rom.get_file_identity(path)
+        return (super().cache(), source)
+
+    def scan(self, rom_bytes: RomBytes):
         if (
             self.rom_start is not None
             and self.rom_end is not None
@@ -148,7 +157,9 @@ class CommonSegC(CommonSegCodeSubsegment):
 
             self.scan_code(rom_bytes)
 
-    def split(self, rom_bytes: bytes):
+    def split(self, rom_bytes: RomBytes):
+        import spimdisasm
+
         if self.rom_start != self.rom_end:
             asm_out_dir = options.opts.nonmatchings_path / self.dir
             asm_out_dir.mkdir(parents=True, exist_ok=True)
@@ -254,8 +265,8 @@ class CommonSegC(CommonSegCodeSubsegment):
 
     def check_gaps_in_migrated_rodata(
         self,
-        func: spimdisasm.mips.symbols.SymbolFunction,
-        rodata_list: List[spimdisasm.mips.symbols.SymbolBase],
+        func: "spimdisasm.mips.symbols.SymbolFunction",
+        rodata_list: "List[spimdisasm.mips.symbols.SymbolBase]",
     ):
         for index in range(len(rodata_list) - 1):
             rodata_sym = rodata_list[index]
@@ -277,45 +288,45 @@ class CommonSegC(CommonSegCodeSubsegment):
 
     def create_c_asm_file(
         self,
-        func_rodata_entry: spimdisasm.mips.FunctionRodataEntry,
+        func_rodata_entry: "spimdisasm.mips.FunctionRodataEntry",
         out_dir: Path,
         func_sym: Symbol,
     ):
+        import rabbitizer
+
         outpath = out_dir / self.name / f"{func_sym.filename}.s"
 
         # Skip extraction if the file exists and the symbol is marked as extract=false
         if outpath.exists() and not func_sym.extract:
             return
 
-        outpath.parent.mkdir(parents=True, exist_ok=True)
+        f = io.StringIO()
+        if options.opts.asm_inc_header:
+            f.write(
+                options.opts.c_newline.join(options.opts.asm_inc_header.split("\n"))
+            )
 
-        with outpath.open("w", newline="\n") as f:
-            if options.opts.asm_inc_header:
-                f.write(
-                    options.opts.c_newline.join(options.opts.asm_inc_header.split("\n"))
-                )
+        named_registers_opt = rabbitizer.config.regNames_namedRegisters
 
-            named_registers_opt = rabbitizer.config.regNames_namedRegisters
+        rabbitizer.config.regNames_namedRegisters = options.opts.named_regs_for_c_funcs
+        func_rodata_entry.writeToFile(f)
+        rabbitizer.config.regNames_namedRegisters = named_registers_opt
 
-            rabbitizer.config.regNames_namedRegisters = (
-                options.opts.named_regs_for_c_funcs
+        if func_rodata_entry.function is not None:
+            self.check_gaps_in_migrated_rodata(
+                func_rodata_entry.function, func_rodata_entry.rodataSyms
+            )
+            self.check_gaps_in_migrated_rodata(
+                func_rodata_entry.function, func_rodata_entry.lateRodataSyms
             )
-            func_rodata_entry.writeToFile(f)
-            rabbitizer.config.regNames_namedRegisters = named_registers_opt
 
-            if func_rodata_entry.function is not None:
-                self.check_gaps_in_migrated_rodata(
-                    func_rodata_entry.function, func_rodata_entry.rodataSyms
-                )
-                self.check_gaps_in_migrated_rodata(
-                    func_rodata_entry.function, func_rodata_entry.lateRodataSyms
-                )
+        file_writer.write_text(outpath, f.getvalue())
 
         self.log(f"Disassembled {func_sym.filename} to {outpath}")
 
     def create_unmigrated_rodata_file(
         self,
-        spim_rodata_sym: spimdisasm.mips.symbols.SymbolBase,
+        spim_rodata_sym: "spimdisasm.mips.symbols.SymbolBase",
         out_dir: Path,
         rodata_sym: Symbol,
     ):
@@ -325,17 +336,17 @@ class CommonSegC(CommonSegCodeSubsegment):
         if outpath.exists() and not rodata_sym.extract:
             return
 
-        outpath.parent.mkdir(parents=True, exist_ok=True)
+        content = ""
+        if options.opts.include_macro_inc:
+            content += '.include "macro.inc"\n\n'
+        preamble = options.opts.generated_s_preamble
+        if preamble:
+            content += preamble + "\n"
+        assert rodata_sym.linker_section is not None, rodata_sym.name
+        content += f".section {rodata_sym.linker_section}\n\n"
+        content += spim_rodata_sym.disassemble()
 
-        with outpath.open("w", newline="\n") as f:
-            if options.opts.include_macro_inc:
-                f.write('.include "macro.inc"\n\n')
-            preamble = options.opts.generated_s_preamble
-            if preamble:
-                f.write(preamble + "\n")
-            assert rodata_sym.linker_section is not None, rodata_sym.name
-            f.write(f".section {rodata_sym.linker_section}\n\n")
-            f.write(spim_rodata_sym.disassemble())
+        file_writer.write_text(outpath, content)
 
         self.log(f"Disassembled {rodata_sym.filename} to {outpath}")
 
@@ -360,7 +371,7 @@ class CommonSegC(CommonSegCodeSubsegment):
     def get_c_lines_for_function(
         self,
         sym: Symbol,
-        spim_sym: spimdisasm.mips.symbols.SymbolFunction,
+        spim_sym: "spimdisasm.mips.symbols.SymbolFunction",
         asm_out_dir: Path,
     ) -> List[str]:
         c_lines = []
@@ -390,7 +401,7 @@ class CommonSegC(CommonSegCodeSubsegment):
         self,
         asm_out_dir: Path,
         c_path: Path,
-        symbols_entries: List[spimdisasm.mips.FunctionRodataEntry],
+        symbols_entries: "List[spimdisasm.mips.FunctionRodataEntry]",
     ):
         c_lines = self.get_c_preamble()
 
@@ -426,7 +437,7 @@ class CommonSegC(CommonSegCodeSubsegment):
         c_path: Path,
         asm_out_dir: Path,
         is_new_c_file: bool,
-        symbols_entries: List[spimdisasm.mips.FunctionRodataEntry],
+        symbols_entries: "List[spimdisasm.mips.FunctionRodataEntry]",
     ):
         if not options.opts.create_asm_dependencies:
             return
@@ -1,7 +1,7 @@
 from collections import OrderedDict
 from typing import OrderedDict, List, Optional, Type
 
-from ...util import log, options
+from ...util import log, options, timings
 
 from .group import CommonSegGroup
 from ..segment import Segment, parse_segment_align
@@ -238,9 +238,11 @@ class CommonSegCode(CommonSegGroup):
         # Always scan code first
         for sub in self.subsegments:
             if sub.is_text() and sub.should_scan():
-                sub.scan(rom_bytes)
+                with timings.segment(sub, "scan"):
+                    sub.scan(rom_bytes)
 
         # Scan everyone else
         for sub in self.subsegments:
             if not sub.is_text() and sub.should_scan():
-                sub.scan(rom_bytes)
+                with timings.segment(sub, "scan"):
+                    sub.scan(rom_bytes)
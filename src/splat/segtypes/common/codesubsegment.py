@@ -1,9 +1,6 @@
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
-import spimdisasm
-import rabbitizer
-
-from ...util import options, symbols, log
+from ...util import options, symbols, log, trace
 
 from .code import CommonSegCode
 
@@ -11,6 +8,10 @@ from ..segment import Segment, parse_segment_vram
 
 from ...disassembler.disassembler_section import DisassemblerSection, make_text_section
 
+if TYPE_CHECKING:
+    import rabbitizer
+    import spimdisasm
+
 
 # abstract class for c, asm, data, etc
 class CommonSegCodeSubsegment(Segment):
@@ -26,11 +27,8 @@ class CommonSegCodeSubsegment(Segment):
         )
 
         self.spim_section: Optional[DisassemblerSection] = None
-        self.instr_category = rabbitizer.InstrCategory.CPU
-        if options.opts.platform == "ps2":
-            self.instr_category = rabbitizer.InstrCategory.R5900
-        elif options.opts.platform == "psx":
-            self.instr_category = rabbitizer.InstrCategory.R3000GTE
+        # Picked when the section is disassembled, so segments can be created without importing rabbitizer
+        self._instr_category: "Optional[rabbitizer.Enum]" = None
 
         self.detect_redundant_function_end: Optional[bool] = (
             self.yaml.get("detect_redundant_function_end", None)
@@ -40,6 +38,25 @@ class CommonSegCodeSubsegment(Segment):
 
         self.is_hasm = False
 
+    @property
+    def instr_category(self) -> "rabbitizer.Enum":
+        if self._instr_category is None:
+            self._instr_category = self.get_default_instr_category()
+        return self._instr_category
+
+    @instr_category.setter
+    def instr_category(self, value: "rabbitizer.Enum") -> None:
+        self._instr_category = value
+
+    def get_default_instr_category(self) -> "rabbitizer.Enum":
+        import rabbitizer
+
+        if options.opts.platform == "ps2":
+            return rabbitizer.InstrCategory.R5900
+        elif options.opts.platform == "psx":
+            return rabbitizer.InstrCategory.R3000GTE
+        return rabbitizer.InstrCategory.CPU
+
     @property
     def needs_symbols(self) -> bool:
         return True
@@ -58,7 +75,10 @@ class CommonSegCodeSubsegment(Segment):
         section.instrCat = self.instr_category
         section.detectRedundantFunctionEnd = self.detect_redundant_function_end
 
+    @trace.traced("scan_code")
     def scan_code(self, rom_bytes, is_hasm=False):
+        import spimdisasm
+
         self.is_hasm = is_hasm
 
         if not isinstance(self.rom_start, int):
@@ -102,7 +122,7 @@ class CommonSegCodeSubsegment(Segment):
 
     def process_insns(
         self,
-        func_spim: spimdisasm.mips.symbols.SymbolFunction,
+        func_spim: "spimdisasm.mips.symbols.SymbolFunction",
     ):
         assert isinstance(self.parent, CommonSegCode)
         assert func_spim.vram is not None
@@ -1,6 +1,7 @@
 from pathlib import Path
 from typing import Optional
-from ...util import options, symbols, log
+from ...util import file_writer, options, symbols, log, trace
+from ...util.rom import RomBytes
 
 from .codesubsegment import CommonSegCodeSubsegment
 from .group import CommonSegGroup
@@ -32,13 +33,13 @@ class CommonSegData(CommonSegCodeSubsegment, CommonSegGroup):
             # ASM
             return self.asm_out_path()
 
-    def scan(self, rom_bytes: bytes):
+    def scan(self, rom_bytes: RomBytes):
         CommonSegGroup.scan(self, rom_bytes)
 
         if self.rom_start is not None and self.rom_end is not None:
             self.disassemble_data(rom_bytes)
 
-    def split(self, rom_bytes: bytes):
+    def split(self, rom_bytes: RomBytes):
         super().split(rom_bytes)
 
         if self.type.startswith(".") and not options.opts.disassemble_all:
@@ -49,19 +50,17 @@ class CommonSegData(CommonSegCodeSubsegment, CommonSegGroup):
 
         path = self.asm_out_path()
 
-        path.parent.mkdir(parents=True, exist_ok=True)
-
         self.print_file_boundaries()
 
-        with path.open("w", newline="\n") as f:
-            f.write('.include "macro.inc"\n\n')
-            preamble = options.opts.generated_s_preamble
-            if preamble:
-                f.write(preamble + "\n")
+        content = '.include "macro.inc"\n\n'
+        preamble = options.opts.generated_s_preamble
+        if preamble:
+            content += preamble + "\n"
 
-            f.write(f"{self.get_section_asm_line()}\n\n")
+        content += f"{self.get_section_asm_line()}\n\n"
 
-            f.write(self.spim_section.disassemble())
+        content += self.spim_section.disassemble()
+        file_writer.write_text(path, content)
 
     def should_self_split(self) -> bool:
         return options.opts.is_mode_active("data")
@@ -97,6 +96,7 @@ class CommonSegData(CommonSegCodeSubsegment, CommonSegGroup):
         if self.str_encoding is not None:
             section.stringEncoding = self.str_encoding
 
+    @trace.traced("disassemble_data")
     def disassemble_data(self, rom_bytes):
         if not isinstance(self.rom_start, int):
             log.error(
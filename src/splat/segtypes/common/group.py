@@ -1,6 +1,6 @@
-from typing import List, Optional
+from typing import List, Optional, Set
 
-from ...util import log
+from ...util import log, timings
 
 from .segment import CommonSegment
 from ..segment import Segment
@@ -128,12 +128,14 @@ class CommonSegGroup(CommonSegment):
     def scan(self, rom_bytes):
         for sub in self.subsegments:
             if sub.should_scan():
-                sub.scan(rom_bytes)
+                with timings.segment(sub, "scan"):
+                    sub.scan(rom_bytes)
 
     def split(self, rom_bytes):
         for sub in self.subsegments:
             if sub.should_split():
-                sub.split(rom_bytes)
+                with timings.segment(sub, "split"):
+                    sub.split(rom_bytes)
 
     def should_split(self) -> bool:
         return self.extract
@@ -149,6 +151,17 @@ class CommonSegGroup(CommonSegment):
 
         return c
 
+    def cache_options(self) -> Optional[Set[str]]:
+        ret: Set[str] = set()
+
+        for sub in self.subsegments:
+            sub_options = sub.cache_options()
+            if sub_options is None:
+                return None
+            ret |= sub_options
+
+        return ret
+
     def get_subsegment_for_ram(self, addr: int) -> Optional[Segment]:
         for sub in self.subsegments:
             if sub.contains_vram(addr):
@@ -3,7 +3,8 @@ from typing import Optional
 
 from .asm import CommonSegAsm
 
-from ...util import options
+from ...util import file_writer, options
+from ...util.rom import RomBytes
 
 
 class CommonSegHasm(CommonSegAsm):
@@ -13,7 +14,7 @@ class CommonSegHasm(CommonSegAsm):
 
         return super().out_path()
 
-    def scan(self, rom_bytes: bytes):
+    def scan(self, rom_bytes: RomBytes):
         if (
             self.rom_start is not None
             and self.rom_end is not None
@@ -21,15 +22,12 @@ class CommonSegHasm(CommonSegAsm):
         ):
             self.scan_code(rom_bytes, is_hasm=True)
 
-    def split(self, rom_bytes: bytes):
+    def split(self, rom_bytes: RomBytes):
         if not self.rom_start == self.rom_end and self.spim_section is not None:
             out_path = self.out_path()
             if out_path and not out_path.exists():
-                out_path.parent.mkdir(parents=True, exist_ok=True)
-
                 self.print_file_boundaries()
 
-                with open(out_path, "w", newline="\n") as f:
-                    for line in self.get_file_header():
-                        f.write(line + "\n")
-                    f.write(self.spim_section.disassemble())
+                content = "".join(line + "\n" for line in self.get_file_header())
+                content += self.spim_section.disassemble()
+                file_writer.write_text(out_path, content)
@@ -1,7 +1,6 @@
-from typing import Optional, Set, Tuple, List
-import spimdisasm
+from typing import Optional, Set, Tuple, List, TYPE_CHECKING
 from ..segment import Segment
-from ...util import log, options, symbols
+from ...util import log, options, symbols, trace
 
 from .data import CommonSegData
 
@@ -10,6 +9,9 @@ from ...disassembler.disassembler_section import (
     make_rodata_section,
 )
 
+if TYPE_CHECKING:
+    import spimdisasm
+
 
 class CommonSegRodata(CommonSegData):
     def get_linker_section(self) -> str:
@@ -24,8 +26,8 @@ class CommonSegRodata(CommonSegData):
         return True
 
     def get_possible_text_subsegment_for_symbol(
-        self, rodata_sym: spimdisasm.mips.symbols.SymbolBase
-    ) -> Optional[Tuple[Segment, spimdisasm.common.ContextSymbol]]:
+        self, rodata_sym: "spimdisasm.mips.symbols.SymbolBase"
+    ) -> "Optional[Tuple[Segment, spimdisasm.common.ContextSymbol]]":
         # Check if this rodata segment does not have a corresponding code file, try to look for one
 
         if self.sibling is not None or not options.opts.pair_rodata_to_text:
@@ -60,6 +62,7 @@ class CommonSegRodata(CommonSegData):
         if self.str_encoding is not None:
             section.stringEncoding = self.str_encoding
 
+    @trace.traced("disassemble_data")
     def disassemble_data(self, rom_bytes):
         if not isinstance(self.rom_start, int):
             log.error(
@@ -4,7 +4,7 @@ from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, OrderedDict, Set, Tuple, Union, Optional
 
-from ..util import options, log
+from ..util import options, log, trace
 
 from .segment import Segment
 from ..util.symbols import to_cname
@@ -457,6 +457,7 @@ class LinkerWriter:
 
             self._end_partial_segment(section_name)
 
+    @trace.traced("save_linker_script")
     def save_linker_script(self, output_path: Path):
         if len(self.sections_allowlist) > 0:
             address = " 0"
@@ -485,6 +486,7 @@ class LinkerWriter:
 
         write_file_if_different(output_path, "\n".join(self.buffer) + "\n")
 
+    @trace.traced("save_symbol_header")
     def save_symbol_header(self):
         path = options.opts.ld_symbol_header_path
 
@@ -503,6 +505,7 @@ class LinkerWriter:
                 "#endif\n",
             )
 
+    @trace.traced("save_dependencies_file")
     def save_dependencies_file(self, output_path: Path, target_elf_path: Path):
         output = f"{target_elf_path}:"
 
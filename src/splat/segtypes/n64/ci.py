@@ -1,7 +1,8 @@
 from pathlib import Path
 from typing import List, TYPE_CHECKING
 
-from ...util import log, options
+from ...util import file_writer, log, options
+from ...util.rom import RomBytes
 
 from .img import N64SegImg
 
@@ -29,7 +30,7 @@ class N64SegCi(N64SegImg):
         self.palettes: "List[N64SegPalette]" = []
         self.palette_names = self.parse_palette_names(self.yaml, self.args)
 
-    def scan(self, rom_bytes: bytes) -> None:
+    def scan(self, rom_bytes: RomBytes) -> None:
         self.n64img.data = rom_bytes[self.rom_start : self.rom_end]
 
     def out_path_pal(self, pal_name) -> Path:
@@ -61,9 +62,8 @@ class N64SegCi(N64SegImg):
 
         for palette in self.palettes:
             path = self.out_path_pal(palette.name)
-            path.parent.mkdir(parents=True, exist_ok=True)
 
             self.n64img.palette = palette.parse_palette(rom_bytes)
-            self.n64img.write(path)
+            file_writer.write_image(path, self.n64img)
 
             self.log(f"Wrote {path.name} to {path}")
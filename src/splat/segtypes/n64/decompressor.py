@@ -1,9 +1,14 @@
+from typing import Optional, Set
+
 from ...util import log, options
 
 from .segment import N64Segment
 
 
 class CommonSegDecompressor(N64Segment):
+    def cache_options(self) -> Optional[Set[str]]:
+        return {"asset_path"}
+
     def split(self, rom_bytes):
         out_dir = options.opts.asset_path / self.dir
         out_dir.mkdir(parents=True, exist_ok=True)
@@ -19,7 +24,8 @@ class CommonSegDecompressor(N64Segment):
             assert isinstance(self.rom_end, int)
 
             self.log(f"Decompressing {self.name}")
-            compressed_bytes = rom_bytes[self.rom_start : self.rom_end]
+            # Decompressors expect their own copy of the data
+            compressed_bytes = bytes(rom_bytes[self.rom_start : self.rom_end])
             decompressed_bytes = self.decompress(compressed_bytes)
             f.write(decompressed_bytes)
         self.log(f"Wrote {self.name} to {out_path}")
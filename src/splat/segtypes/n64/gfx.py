@@ -8,38 +8,11 @@ from typing import Dict, List, Optional, Union
 
 from pathlib import Path
 
-from pygfxd import (
-    gfxd_buffer_to_string,
-    gfxd_cimg_callback,
-    gfxd_dl_callback,
-    gfxd_endian,
-    gfxd_execute,
-    gfxd_input_buffer,
-    gfxd_light_callback,
-    gfxd_lookat_callback,
-    gfxd_macro_dflt,
-    gfxd_macro_fn,
-    gfxd_mtx_callback,
-    gfxd_output_buffer,
-    gfxd_printf,
-    gfxd_puts,
-    gfxd_target,
-    gfxd_timg_callback,
-    gfxd_tlut_callback,
-    gfxd_vp_callback,
-    gfxd_vtx_callback,
-    gfxd_zimg_callback,
-    GfxdEndian,
-    gfxd_f3d,
-    gfxd_f3db,
-    gfxd_f3dex,
-    gfxd_f3dexb,
-    gfxd_f3dex2,
-)
 from ..segment import Segment
 
-from ...util import log, options
+from ...util import log, options, trace
 from ...util.log import error
+from ...util.rom import RomBytes
 
 from ..common.codesubsegment import CommonSegCodeSubsegment
 
@@ -81,10 +54,18 @@ class N64SegGfx(CommonSegCodeSubsegment):
     def out_path(self) -> Path:
         return options.opts.asset_path / self.dir / f"{self.name}.gfx.inc.c"
 
-    def scan(self, rom_bytes: bytes):
+    def scan(self, rom_bytes: RomBytes):
         self.file_text = self.disassemble_data(rom_bytes)
 
     def get_gfxd_target(self):
+        from pygfxd import (
+            gfxd_f3d,
+            gfxd_f3db,
+            gfxd_f3dex,
+            gfxd_f3dex2,
+            gfxd_f3dexb,
+        )
+
         opt = options.opts.gfx_ucode
 
         if opt == "f3d":
@@ -101,6 +82,8 @@ class N64SegGfx(CommonSegCodeSubsegment):
             log.error(f"Unknown target {opt}")
 
     def tlut_handler(self, addr, idx, count):
+        from pygfxd import gfxd_printf
+
         sym = self.create_symbol(
             addr=addr, in_segment=self.in_segment, type="data", reference=True
         )
@@ -108,6 +91,8 @@ class N64SegGfx(CommonSegCodeSubsegment):
         return 1
 
     def timg_handler(self, addr, fmt, size, width, height, pal):
+        from pygfxd import gfxd_printf
+
         sym = self.create_symbol(
             addr=addr, in_segment=self.in_segment, type="data", reference=True
         )
@@ -115,6 +100,8 @@ class N64SegGfx(CommonSegCodeSubsegment):
         return 1
 
     def cimg_handler(self, addr, fmt, size, width):
+        from pygfxd import gfxd_printf
+
         sym = self.create_symbol(
             addr=addr, in_segment=self.in_segment, type="data", reference=True
         )
@@ -122,6 +109,8 @@ class N64SegGfx(CommonSegCodeSubsegment):
         return 1
 
     def zimg_handler(self, addr):
+        from pygfxd import gfxd_printf
+
         sym = self.create_symbol(
             addr=addr, in_segment=self.in_segment, type="data", reference=True
         )
@@ -129,6 +118,8 @@ class N64SegGfx(CommonSegCodeSubsegment):
         return 1
 
     def dl_handler(self, addr):
+        from pygfxd import gfxd_printf
+
         # Look for 'Gfx'-typed symbols first
         sym = self.retrieve_sym_type(symbols.all_symbols_dict, addr, "Gfx")
 
@@ -140,6 +131,8 @@ class N64SegGfx(CommonSegCodeSubsegment):
         return 1
 
     def mtx_handler(self, addr):
+        from pygfxd import gfxd_printf
+
         sym = self.create_symbol(
             addr=addr, in_segment=self.in_segment, type="data", reference=True
         )
@@ -147,6 +140,8 @@ class N64SegGfx(CommonSegCodeSubsegment):
         return 1
 
     def lookat_handler(self, addr, count):
+        from pygfxd import gfxd_printf
+
         sym = self.create_symbol(
             addr=addr, in_segment=self.in_segment, type="data", reference=True
         )
@@ -154,6 +149,8 @@ class N64SegGfx(CommonSegCodeSubsegment):
         return 1
 
     def light_handler(self, addr, count):
+        from pygfxd import gfxd_printf
+
         sym = self.create_symbol(
             addr=addr, in_segment=self.in_segment, type="data", reference=True
         )
@@ -161,6 +158,8 @@ class N64SegGfx(CommonSegCodeSubsegment):
         return 1
 
     def vtx_handler(self, addr, count):
+        from pygfxd import gfxd_printf
+
         # Look for 'Vtx'-typed symbols first
         sym = self.retrieve_sym_type(symbols.all_symbols_dict, addr, "Vtx")
 
@@ -178,6 +177,8 @@ class N64SegGfx(CommonSegCodeSubsegment):
         return 1
 
     def vp_handler(self, addr):
+        from pygfxd import gfxd_printf
+
         sym = self.create_symbol(
             addr=addr, in_segment=self.in_segment, type="data", reference=True
         )
@@ -185,17 +186,45 @@ class N64SegGfx(CommonSegCodeSubsegment):
         return 1
 
     def macro_fn(self):
+        from pygfxd import (
+            gfxd_macro_dflt,
+            gfxd_puts,
+        )
+
         gfxd_puts("    ")
         gfxd_macro_dflt()
         gfxd_puts(",\n")
         return 0
 
+    @trace.traced("disassemble_data")
     def disassemble_data(self, rom_bytes):
+        from pygfxd import (
+            GfxdEndian,
+            gfxd_buffer_to_string,
+            gfxd_cimg_callback,
+            gfxd_dl_callback,
+            gfxd_endian,
+            gfxd_execute,
+            gfxd_input_buffer,
+            gfxd_light_callback,
+            gfxd_lookat_callback,
+            gfxd_macro_fn,
+            gfxd_mtx_callback,
+            gfxd_output_buffer,
+            gfxd_target,
+            gfxd_timg_callback,
+            gfxd_tlut_callback,
+            gfxd_vp_callback,
+            gfxd_vtx_callback,
+            gfxd_zimg_callback,
+        )
+
         assert isinstance(self.rom_start, int)
         assert isinstance(self.rom_end, int)
         assert isinstance(self.vram_start, int)
 
-        gfx_data = rom_bytes[self.rom_start : self.rom_end]
+        # gfxd needs a buffer it can hold on to
+        gfx_data = bytes(rom_bytes[self.rom_start : self.rom_end])
         segment_length = len(gfx_data)
         if (segment_length) % 8 != 0:
             error(
@@ -259,7 +288,7 @@ class N64SegGfx(CommonSegCodeSubsegment):
 
         return out_str
 
-    def split(self, rom_bytes: bytes):
+    def split(self, rom_bytes: RomBytes):
         if self.file_text and self.out_path():
             self.out_path().parent.mkdir(parents=True, exist_ok=True)
 
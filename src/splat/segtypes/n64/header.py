@@ -27,7 +27,7 @@ class N64SegHeader(CommonSegHeader):
         if encoding != "word":
             header_lines.append(
                 '.ascii "'
-                + rom_bytes[0x20:0x34].decode(encoding).strip().ljust(20)
+                + bytes(rom_bytes[0x20:0x34]).decode(encoding).strip().ljust(20)
                 + '" /* Internal name */'
             )
         else:
@@ -1,9 +1,7 @@
-import n64img.image
-
 from .img import N64SegImg
 
 
 class N64SegIa4(N64SegImg):
     def __init__(self, *args, **kwargs):
-        kwargs["img_cls"] = n64img.image.IA4
+        kwargs["img_cls"] = "IA4"
         super().__init__(*args, **kwargs)
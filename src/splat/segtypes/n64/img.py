@@ -1,11 +1,28 @@
+from math import ceil
 from pathlib import Path
-from typing import Dict, List, Tuple, Type, Optional, Union
+from typing import Dict, List, Tuple, Type, Optional, Set, TYPE_CHECKING, Union
 
-from n64img.image import Image
-from ...util import log, options
+from ...util import file_writer, log, options
 
 from .segment import N64Segment
 
+if TYPE_CHECKING:
+    from n64img.image import Image
+
+# Bytes per pixel of the n64img.image classes, so the length of a segment can be checked without importing n64img
+IMG_DEPTHS = {
+    "CI4": 0.5,
+    "CI8": 1,
+    "I1": 0.125,
+    "I4": 0.5,
+    "I8": 1,
+    "IA4": 0.5,
+    "IA8": 1,
+    "IA16": 2,
+    "RGBA16": 2,
+    "RGBA32": 4,
+}
+
 
 class N64SegImg(N64Segment):
     @staticmethod
@@ -26,7 +43,7 @@ class N64SegImg(N64Segment):
         vram_start: Optional[int],
         args: list,
         yaml,
-        img_cls: Type[Image],
+        img_cls: "Union[Type[Image], str]",
     ):
         super().__init__(
             rom_start,
@@ -41,23 +58,42 @@ class N64SegImg(N64Segment):
         if rom_start is None:
             log.error(f"Error: {type} segment {name} rom start could not be determined")
 
-        self.n64img: Image = img_cls(b"", 0, 0)
+        # Either an image class or the name of one from n64img.image, which is only imported once the image is
+        # needed so that splitting other modes doesn't pay for it
+        self.img_cls = img_cls
+        self._n64img: "Optional[Image]" = None
 
+        self.flip_h = False
+        self.flip_v = False
         if isinstance(yaml, dict):
-            self.n64img.flip_h = bool(yaml.get("flip_x", False))
-            self.n64img.flip_v = bool(yaml.get("flip_y", False))
+            self.flip_h = bool(yaml.get("flip_x", False))
+            self.flip_v = bool(yaml.get("flip_y", False))
 
         self.width, self.height = self.parse_dimensions(yaml)
 
-        self.n64img.width = self.width
-        self.n64img.height = self.height
-
         self.check_len()
 
         self.image_type_in_extension = options.opts.image_type_in_extension
 
+    @property
+    def n64img(self) -> "Image":
+        if self._n64img is None:
+            img_cls = self.img_cls
+            if isinstance(img_cls, str):
+                import n64img.image
+
+                img_cls = getattr(n64img.image, img_cls)
+
+            self._n64img = img_cls(b"", self.width, self.height)
+            self._n64img.flip_h = self.flip_h
+            self._n64img.flip_v = self.flip_v
+        return self._n64img
+
     def check_len(self) -> None:
-        expected_len = int(self.n64img.size())
+        if isinstance(self.img_cls, str):
+            expected_len = ceil(self.width * self.height * IMG_DEPTHS[self.img_cls])
+        else:
+            expected_len = int(self.n64img.size())
         assert isinstance(self.rom_start, int)
         assert isinstance(self.rom_end, int)
         assert isinstance(self.subalign, int)
@@ -67,6 +103,9 @@ class N64SegImg(N64Segment):
                 f"Error: {self.name} should end at 0x{self.rom_start + expected_len:X}, but it ends at 0x{self.rom_end:X}\n(hint: add a 'bin' segment after it)"
             )
 
+    def cache_options(self) -> Optional[Set[str]]:
+        return {"asset_path", "image_type_in_extension"}
+
     def out_path(self) -> Path:
         type_extension = f".{self.type}" if self.image_type_in_extension else ""
 
@@ -77,14 +116,13 @@ class N64SegImg(N64Segment):
 
     def split(self, rom_bytes):
         path = self.out_path()
-        path.parent.mkdir(parents=True, exist_ok=True)
 
         assert isinstance(self.rom_start, int)
         assert isinstance(self.rom_end, int)
 
         if self.n64img.data == b"":
             self.n64img.data = rom_bytes[self.rom_start : self.rom_end]
-        self.n64img.write(path)
+        file_writer.write_image(path, self.n64img)
 
         self.log(f"Wrote {self.name} to {path}")
 
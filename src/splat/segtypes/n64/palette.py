@@ -1,6 +1,6 @@
 from itertools import zip_longest
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Dict, List, Optional, Set, Tuple, Union
 
 from ...util import log, options
 from ...util.color import unpack_color
@@ -68,6 +68,9 @@ class N64SegPalette(N64Segment):
     def should_split(self) -> bool:
         return self.extract and options.opts.is_mode_active("img")
 
+    def cache_options(self) -> Optional[Set[str]]:
+        return {"asset_path"}
+
     def out_path(self) -> Path:
         return options.opts.asset_path / self.dir / f"{self.name}.png"
 
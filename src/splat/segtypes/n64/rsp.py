@@ -1,10 +1,13 @@
-import rabbitizer
+from typing import TYPE_CHECKING
 
 from ..common.hasm import CommonSegHasm
 
+if TYPE_CHECKING:
+    import rabbitizer
+
 
 class N64SegRsp(CommonSegHasm):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    def get_default_instr_category(self) -> "rabbitizer.Enum":
+        import rabbitizer
 
-        self.instr_category = rabbitizer.InstrCategory.RSP
+        return rabbitizer.InstrCategory.RSP
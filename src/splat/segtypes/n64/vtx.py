@@ -9,7 +9,8 @@ import struct
 from pathlib import Path
 from typing import Dict, List, Optional, Union
 
-from ...util import options, log
+from ...util import options, log, trace
+from ...util.rom import RomBytes
 
 from ..common.codesubsegment import CommonSegCodeSubsegment
 
@@ -46,9 +47,10 @@ class N64SegVtx(CommonSegCodeSubsegment):
     def out_path(self) -> Path:
         return options.opts.asset_path / self.dir / f"{self.name}.vtx.inc.c"
 
-    def scan(self, rom_bytes: bytes):
+    def scan(self, rom_bytes: RomBytes):
         self.file_text = self.disassemble_data(rom_bytes)
 
+    @trace.traced("disassemble_data")
     def disassemble_data(self, rom_bytes) -> str:
         assert isinstance(self.rom_start, int)
         assert isinstance(self.rom_end, int)
@@ -88,7 +90,7 @@ class N64SegVtx(CommonSegCodeSubsegment):
         lines.append("")
         return "\n".join(lines)
 
-    def split(self, rom_bytes: bytes):
+    def split(self, rom_bytes: RomBytes):
         if self.file_text and self.out_path():
             self.out_path().parent.mkdir(parents=True, exist_ok=True)
 
@@ -1,5 +1,3 @@
-import crunch64
-
 from .decompressor import CommonSegDecompressor
 
 
@@ -12,4 +10,6 @@ class N64SegYay0(CommonSegDecompressor):
         return "Yay0"
 
     def decompress(self, compressed_bytes: bytes) -> bytes:
+        import crunch64
+
         return crunch64.yay0.decompress(compressed_bytes)
@@ -4,11 +4,12 @@ from pathlib import Path
 
 from typing import Dict, List, Optional, Set, Type, TYPE_CHECKING, Union
 
-from intervaltree import Interval, IntervalTree
 from ..util import vram_classes
 
 from ..util.vram_classes import VramClass
 from ..util import log, options, symbols
+from ..util.range_index import RangeIndex
+from ..util.rom import RomBytes
 from ..util.symbols import Symbol, to_cname
 
 from .. import __package_name__
@@ -242,8 +243,8 @@ class Segment:
         self.given_seg_symbols: Dict[int, List[Symbol]] = {}
 
         # Ranges for faster symbol lookup
-        self.symbol_ranges_ram: IntervalTree = IntervalTree()
-        self.symbol_ranges_rom: IntervalTree = IntervalTree()
+        self.symbol_ranges_ram: RangeIndex[Symbol] = RangeIndex()
+        self.symbol_ranges_rom: RangeIndex[Symbol] = RangeIndex()
 
         self.given_section_order: List[str] = options.opts.section_order
 
@@ -257,6 +258,8 @@ class Segment:
         )
 
         self.parent: Optional[Segment] = None
+        # Top-level segment, as last found by get_most_parent
+        self.cached_most_parent: Optional[Segment] = None
         self.sibling: Optional[Segment] = None
         self.siblings: Dict[str, Segment] = {}
         self.file_path: Optional[Path] = None
@@ -438,20 +441,18 @@ class Segment:
             return None
 
     def get_exclusive_ram_id(self) -> Optional[str]:
-        if self.parent:
-            return self.parent.get_exclusive_ram_id()
-        return self.exclusive_ram_id
+        return self.get_most_parent().exclusive_ram_id
 
     def add_symbol(self, symbol: Symbol):
         if symbol.vram_start not in self.given_seg_symbols:
             self.given_seg_symbols[symbol.vram_start] = []
         self.given_seg_symbols[symbol.vram_start].append(symbol)
 
-        # For larger symbols, add their ranges to interval trees for faster lookup
+        # For larger symbols, add their ranges to range indices for faster lookup
         if symbol.size > 4:
-            self.symbol_ranges_ram.addi(symbol.vram_start, symbol.vram_end, symbol)
+            self.symbol_ranges_ram.add(symbol.vram_start, symbol.vram_end, symbol)
             if symbol.rom is not None:
-                self.symbol_ranges_rom.addi(symbol.rom, symbol.rom_end, symbol)
+                self.symbol_ranges_rom.add(symbol.rom, symbol.rom_end, symbol)
 
     @property
     def seg_symbols(self) -> Dict[int, List[Symbol]]:
@@ -526,15 +527,21 @@ class Segment:
     def should_split(self) -> bool:
         return self.extract and options.opts.is_mode_active(self.type)
 
-    def scan(self, rom_bytes: bytes):
+    def scan(self, rom_bytes: RomBytes):
         pass
 
-    def split(self, rom_bytes: bytes):
+    def split(self, rom_bytes: RomBytes):
         pass
 
     def cache(self):
         return (self.yaml, self.rom_end)
 
+    def cache_options(self) -> Optional[Set[str]]:
+        """
+        Names of the options the output of this segment depends on, or None if it may depend on any option
+        """
+        return None
+
     def get_linker_section(self) -> str:
         return ".data"
 
@@ -585,10 +592,16 @@ class Segment:
         return None
 
     def get_most_parent(self) -> "Segment":
-        seg = self
+        # Parents are only given to segments which didn't have one yet, so the cached segment is still the top-level
+        # one unless it got a parent since
+        seg = self.cached_most_parent
+        if seg is None or seg.parent is not None:
+            seg = self
 
-        while seg.parent:
-            seg = seg.parent
+            while seg.parent:
+                seg = seg.parent
+
+            self.cached_most_parent = seg
 
         return seg
 
@@ -638,54 +651,49 @@ class Segment:
 
     @staticmethod
     def visible_ram(seg1: "Segment", seg2: "Segment") -> bool:
-        if seg1.get_most_parent() == seg2.get_most_parent():
+        most_parent1 = seg1.get_most_parent()
+        most_parent2 = seg2.get_most_parent()
+        if most_parent1 is most_parent2:
             return True
-        if seg1.get_exclusive_ram_id() is None or seg2.get_exclusive_ram_id() is None:
+        if most_parent1.exclusive_ram_id is None:
             return True
-        return seg1.get_exclusive_ram_id() != seg2.get_exclusive_ram_id()
+        return most_parent1.exclusive_ram_id != most_parent2.exclusive_ram_id
 
     def retrieve_symbol(
         self, syms: Dict[int, List[Symbol]], addr: int
     ) -> Optional[Symbol]:
-        if addr not in syms:
+        items = syms.get(addr)
+        if not items:
             return None
 
-        items = syms[addr]
-
-        # Filter out symbols that are in different top-level segments with the same unique_ram_id
-        items = [
-            i
-            for i in items
-            if i.segment is None or Segment.visible_ram(self, i.segment)
-        ]
-
-        if len(items) > 1:
-            # print(f"Trying to retrieve {addr:X} from symbol dict but there are {len(items)} entries to pick from - picking the first")
-            pass
-        if len(items) == 0:
-            return None
-        return items[0]
+        most_parent = self.get_most_parent()
+        ram_id = most_parent.exclusive_ram_id
+        # Every symbol is visible from segments without an exclusive_ram_id
+        if ram_id is None:
+            return items[0]
+
+        # Skip symbols that are in different top-level segments with the same exclusive_ram_id
+        for sym in items:
+            if sym.segment is None:
+                return sym
+            other = sym.segment.get_most_parent()
+            if other is most_parent or other.exclusive_ram_id != ram_id:
+                return sym
+        return None
 
     def retrieve_sym_type(
         self, syms: Dict[int, List[Symbol]], addr: int, type: str
     ) -> Optional[symbols.Symbol]:
-        if addr not in syms:
-            return None
-
-        items = syms[addr]
-
-        items = [
-            i
-            for i in items
-            if i.segment is None
-            or Segment.visible_ram(self, i.segment)
-            and (type == i.type)
-        ]
-
-        if len(items) == 0:
+        items = syms.get(addr)
+        if not items:
             return None
 
-        return items[0]
+        for sym in items:
+            if sym.segment is None or (
+                type == sym.type and Segment.visible_ram(self, sym.segment)
+            ):
+                return sym
+        return None
 
     def get_symbol(
         self,
@@ -711,21 +719,15 @@ class Segment:
             if not ret and search_ranges:
                 # Search ranges first, starting with rom
                 if rom is not None:
-                    cands: Set[Interval] = most_parent.symbol_ranges_rom[rom]
-                    if cands:
-                        ret = cands.pop().data
+                    ret = most_parent.symbol_ranges_rom.find(rom)
                 # and then vram if we can't find a rom match
                 if not ret:
-                    cands = most_parent.symbol_ranges_ram[addr]
-                    if cands:
-                        ret = cands.pop().data
+                    ret = most_parent.symbol_ranges_ram.find(addr)
         elif not local_only:
             ret = most_parent.retrieve_symbol(symbols.all_symbols_dict, addr)
 
             if not ret and search_ranges:
-                cands = symbols.all_symbols_ranges[addr]
-                if cands:
-                    ret = cands.pop().data
+                ret = symbols.all_symbols_ranges.find(addr)
 
         # Create the symbol if it doesn't exist
         if not ret and create:
@@ -751,6 +753,8 @@ class Segment:
                 if ret.segment is None:
                     ret.segment = most_parent
 
+            symbols.mark_touched(ret)
+
         return ret
 
     def create_symbol(
@@ -1,13 +1,28 @@
 from . import cache_handler as cache_handler
 from . import color as color
 from . import compiler as compiler
+from . import config_cache as config_cache
+from . import file_writer as file_writer
+from . import history as history
 from . import log as log
+from . import memory as memory
 from . import n64 as n64
 from . import options as options
 from . import palettes as palettes
+from . import plan as plan
 from . import progress_bar as progress_bar
 from . import psx as psx
+from . import range_index as range_index
 from . import relocs as relocs
+from . import rom as rom
+from . import scan_products as scan_products
+from . import scheduler as scheduler
+from . import selection as selection
+from . import split_pool as split_pool
 from . import statistics as statistics
+from . import symbol_db as symbol_db
 from . import symbols as symbols
+from . import timings as timings
+from . import trace as trace
 from . import vram_classes as vram_classes
+from . import watcher as watcher
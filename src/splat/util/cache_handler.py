@@ -1,56 +1,472 @@
+import dataclasses
+import hashlib
 import pickle
-from typing import Any, Dict
+import sqlite3
+import zlib
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
-from . import options, log
+from . import options, log, rom
+from .relocs import Reloc
+from .scan_products import ProductRecorder, ScanProducts
+from .rom import RomBytes
+from .symbols import Symbol
 from ..segtypes.common.segment import Segment
 
+# Bump whenever the layout of the database or of the pickled values changes
+CACHE_FORMAT_VERSION = 5
+
+# Options every segment depends on, on top of the ones given by Segment.cache_options()
+COMMON_CACHE_OPTIONS = {
+    "modes",
+    "platform",
+    "endianness",
+    "target_path",
+    "extensions_path",
+}
+
+# Options which only affect files generated after splitting, like the linker script. Segments depending on every
+# option don't depend on these
+NON_SEGMENT_OPTIONS = {
+    "verbose",
+    "dump_symbols",
+    "perf_history",
+    "perf_regression_threshold",
+    "cache_path",
+    "elf_path",
+    "elf_section_list_path",
+    "create_undefined_funcs_auto",
+    "undefined_funcs_auto_path",
+    "create_undefined_syms_auto",
+    "undefined_syms_auto_path",
+    "segment_end_before_align",
+    "segment_symbols_style",
+    "check_consecutive_segment_types",
+}
+
+
+def get_segment_options() -> List[str]:
+    return sorted(
+        f.name
+        for f in dataclasses.fields(options.SplatOpts)
+        if not f.name.startswith("ld_") and f.name not in NON_SEGMENT_OPTIONS
+    )
+
+
+def _symbol_digest(sym: Symbol) -> bytes:
+    values = [
+        getattr(sym, f.name)
+        for f in dataclasses.fields(Symbol)
+        if f.name != "segment" and not f.name.startswith("_")
+    ]
+    values.append(None if sym.segment is None else sym.segment.unique_id())
+    return hashlib.sha1(repr(values).encode()).digest()
+
+
+def _reloc_digest(reloc: Reloc) -> bytes:
+    return hashlib.sha1(repr(dataclasses.astuple(reloc)).encode()).digest()
+
+
+class SymbolDigests:
+    """
+    Digests of the symbols and relocs given by the user, taken before anything gets scanned, so segments can be
+    keyed on the ones they define and reference
+    """
+
+    def __init__(self, all_symbols: List[Symbol], all_relocs: Dict[int, Reloc]):
+        self.by_segment: Dict[str, List[bytes]] = {}
+        self.by_address: Dict[int, List[bytes]] = {}
+
+        # Symbols not assigned to any segment, sorted by address
+        unassigned: List[Tuple[int, Optional[int], bytes]] = []
+
+        for sym in all_symbols:
+            digest = _symbol_digest(sym)
+            self.by_address.setdefault(sym.vram_start, []).append(digest)
+            if sym.segment is not None:
+                self.by_segment.setdefault(sym.segment.unique_id(), []).append(digest)
+            else:
+                unassigned.append((sym.vram_start, sym.rom, digest))
+
+        unassigned.sort(key=lambda entry: (entry[0], entry[2]))
+        self.unassigned_vrams = [vram for vram, _, _ in unassigned]
+        self.unassigned = unassigned
+
+        self.reloc_roms = sorted(all_relocs)
+        self.reloc_digests = [_reloc_digest(all_relocs[rom]) for rom in self.reloc_roms]
+
+    def get_segment_digest(self, segment: Segment) -> str:
+        """
+        Digest of the symbols and relocs within the segment
+        """
+        h = hashlib.sha1()
+
+        for digest in sorted(self.by_segment.get(segment.unique_id(), [])):
+            h.update(digest)
+
+        if isinstance(segment.vram_start, int) and isinstance(segment.vram_end, int):
+            start = bisect_left(self.unassigned_vrams, segment.vram_start)
+            end = bisect_left(self.unassigned_vrams, segment.vram_end)
+            for _, rom, digest in self.unassigned[start:end]:
+                if rom is None or segment.contains_rom(rom):
+                    h.update(digest)
+
+        if isinstance(segment.rom_start, int) and isinstance(segment.rom_end, int):
+            start = bisect_left(self.reloc_roms, segment.rom_start)
+            end = bisect_left(self.reloc_roms, segment.rom_end)
+            for digest in self.reloc_digests[start:end]:
+                h.update(digest)
+
+        return h.hexdigest()
+
+    def get_address_digest(self, address: int) -> str:
+        h = hashlib.sha1()
+        for digest in sorted(self.by_address.get(address, [])):
+            h.update(digest)
+        return h.hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    # What Cache.get_key() returned when the segment was last split
+    segment: Any
+    # Digest of the user's symbols at each address the segment referenced. None until the segment has been processed
+    references: Optional[Dict[int, str]] = None
+    # What scanning and splitting the segment did to the shared symbol state, by phase. None until loaded
+    products: Optional[Dict[str, ScanProducts]] = None
+
+
+class CacheDatabase:
+    """
+    SQLite database holding one row per cached segment, keyed by its unique_id().
+
+    The cached `segment.cache()` value and the segment's products are stored separately, so checking whether a
+    segment changed doesn't require loading what its scan produced.
+    """
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    @staticmethod
+    def open(verbose: bool) -> "CacheDatabase":
+        path = options.opts.cache_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        database = CacheDatabase(sqlite3.connect(path))
+        try:
+            database.check_format(verbose)
+            return database
+        except sqlite3.DatabaseError:
+            # i.e. a cache written by an older version of splat
+            log.write(
+                "Not able to load cache file. Discarding old cache", status="warn"
+            )
+            database.close()
+
+        path.unlink()
+        database = CacheDatabase(sqlite3.connect(path))
+        database.check_format(verbose)
+        return database
+
+    def check_format(self, verbose: bool):
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version == CACHE_FORMAT_VERSION:
+            return
+
+        if version != 0 and verbose:
+            log.write("Cache format changed, discarding old cache")
+
+        with self.connection:
+            self.connection.execute("DROP TABLE IF EXISTS meta")
+            self.connection.execute("DROP TABLE IF EXISTS segments")
+            self.connection.execute(
+                "CREATE TABLE segments (unique_id TEXT PRIMARY KEY, segment BLOB NOT NULL, products BLOB NOT NULL)"
+            )
+            self.connection.execute(f"PRAGMA user_version = {CACHE_FORMAT_VERSION}")
+
+    def count(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+
+    def get_segment(self, segment_id: str) -> Optional[bytes]:
+        row = self.connection.execute(
+            "SELECT segment FROM segments WHERE unique_id = ?", (segment_id,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def get_products(self, segment_id: str) -> Optional[bytes]:
+        row = self.connection.execute(
+            "SELECT products FROM segments WHERE unique_id = ?", (segment_id,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def write(self, entries: List[Tuple[str, bytes, bytes]]):
+        # Everything is written in a single transaction, so an interrupted run leaves the previous cache intact
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO segments (unique_id, segment, products) VALUES (?, ?, ?)",
+                entries,
+            )
+
+    def close(self):
+        self.connection.close()
+
+
+def _unpickle(data: Optional[bytes]) -> Any:
+    if data is None:
+        return None
+    try:
+        return pickle.loads(data)
+    except Exception:
+        # A single broken entry is just a cache miss
+        return None
+
 
 class Cache:
-    def __init__(self, config: Dict[str, Any], use_cache: bool, verbose: bool):
+    def __init__(self, use_cache: bool, verbose: bool):
         self.use_cache: bool = use_cache
-        self.cache: Dict[str, Any] = {}
+        self.database: Optional[CacheDatabase] = None
+        self.segment_options: List[str] = get_segment_options()
+        self.symbol_digests: Optional[SymbolDigests] = None
+        self.rom_bytes: Optional[RomBytes] = None
+        # Checksum of the bytes of each segment, by unique_id()
+        self.rom_digests: Dict[str, Optional[int]] = {}
+        self.recorder: Optional[ProductRecorder] = None
+
+        # Entries read from the database, or None for segments which aren't cached, by unique_id()
+        self.loaded: Dict[str, Optional[CacheEntry]] = {}
+        # Entries which need to be written by save()
+        self.changed: Dict[str, CacheEntry] = {}
+
+        # Products of the segments processed during this run, by unique_id()
+        self.new_products: Dict[str, Dict[str, ScanProducts]] = {}
+
+        if not use_cache:
+            return
 
         # Load cache
-        if use_cache and options.opts.cache_path.exists():
-            try:
-                with options.opts.cache_path.open("rb") as f3:
-                    self.cache = pickle.load(f3)
-
-                if verbose:
-                    log.write(f"Loaded cache ({len(self.cache.keys())} items)")
-            except Exception:
-                log.write(
-                    f"Not able to load cache file. Discarding old cache", status="warn"
-                )
+        self.database = CacheDatabase.open(verbose)
+        if verbose:
+            log.write(f"Loaded cache ({self.database.count()} items)")
 
-        # invalidate entire cache if options change
-        if use_cache and self.cache.get("__options__") != config.get("options"):
-            if verbose:
-                log.write("Options changed, invalidating cache")
+    def set_recorder(self, recorder: ProductRecorder):
+        self.recorder = recorder
+
+    def set_rom_bytes(self, rom_bytes: RomBytes):
+        self.rom_bytes = rom_bytes
+
+    def index_symbols(self, all_symbols: List[Symbol], all_relocs: Dict[int, Reloc]):
+        """
+        Must be called once the user's symbols and relocs are loaded, before anything gets scanned
+        """
+        self.symbol_digests = SymbolDigests(all_symbols, all_relocs)
+
+    def get_references(self, products: Dict[str, ScanProducts]) -> Dict[int, str]:
+        # Every address the segment touched or looked up, whoever created the symbol there. Addresses without a
+        # user symbol get the digest of no symbols, so giving one a name later counts as a change too
+        addresses: Set[int] = set()
+        for phase_products in products.values():
+            for record in phase_products.symbols:
+                addresses.add(record.vram_start)
+                if record.context_sym is not None:
+                    addresses.add(record.context_sym.address)
+            addresses.update(
+                context_record.address
+                for context_record in phase_products.context_symbols
+            )
+            addresses.update(
+                pointer for _, pointer in phase_products.added_pointers_in_data
+            )
+
+        if self.symbol_digests is None:
+            return {}
+        return {
+            address: self.symbol_digests.get_address_digest(address)
+            for address in sorted(addresses)
+        }
 
-            self.cache = {
-                "__options__": config.get("options"),
-            }
+    def references_changed(self, references: Optional[Dict[int, str]]) -> bool:
+        if references is None:
+            return True
+        if self.symbol_digests is None:
+            return False
+        return any(
+            self.symbol_digests.get_address_digest(address) != digest
+            for address, digest in references.items()
+        )
 
     def save(self, verbose: bool):
-        if self.cache != {} and self.use_cache:
+        if self.database is None:
+            return
+
+        if self.changed:
             if verbose:
                 log.write("Writing cache")
-            options.opts.cache_path.parent.mkdir(parents=True, exist_ok=True)
-            with options.opts.cache_path.open("wb") as f4:
-                pickle.dump(self.cache, f4)
+            self.database.write(
+                [
+                    (
+                        segment_id,
+                        pickle.dumps(
+                            (
+                                entry.segment,
+                                self.get_references(entry.products or {}),
+                            )
+                        ),
+                        pickle.dumps(entry.products or {}),
+                    )
+                    for segment_id, entry in self.changed.items()
+                ]
+            )
+            self.changed = {}
+
+        self.close()
+
+    def close(self):
+        if self.database is not None:
+            self.database.close()
+            self.database = None
+
+    def get_entry(self, segment_id: str) -> Optional[CacheEntry]:
+        if segment_id in self.changed:
+            return self.changed[segment_id]
+        if self.database is None:
+            return None
+
+        if segment_id not in self.loaded:
+            cached = _unpickle(self.database.get_segment(segment_id))
+            if cached is None:
+                self.loaded[segment_id] = None
+            else:
+                key, references = cached
+                self.loaded[segment_id] = CacheEntry(key, references)
+        return self.loaded[segment_id]
+
+    def get_products(self, segment_id: str) -> Dict[str, ScanProducts]:
+        entry = self.get_entry(segment_id)
+        if entry is None:
+            return {}
+
+        # Loaded the first time they are needed
+        if entry.products is None:
+            assert self.database is not None
+            entry.products = _unpickle(self.database.get_products(segment_id)) or {}
+        return entry.products
+
+    def get_rom_digest(self, segment: Segment) -> Optional[int]:
+        segment_id = segment.unique_id()
+        if segment_id not in self.rom_digests:
+            data: Optional[RomBytes] = None
+            if segment.file_path is not None:
+                if segment.file_path.exists():
+                    data = rom.map_file(segment.file_path)
+            elif (
+                self.rom_bytes is not None
+                and isinstance(segment.rom_start, int)
+                and isinstance(segment.rom_end, int)
+            ):
+                data = self.rom_bytes[segment.rom_start : segment.rom_end]
+            self.rom_digests[segment_id] = None if data is None else zlib.crc32(data)
+        return self.rom_digests[segment_id]
+
+    def get_key(self, segment: Segment) -> Any:
+        """
+        The segment's cache() along with the value of every option its output depends on, the digest of the
+        user's symbols and relocs within it and the checksum of its bytes
+        """
+        names = segment.cache_options()
+        if names is None:
+            option_names = self.segment_options
+        else:
+            option_names = sorted(names | COMMON_CACHE_OPTIONS)
+
+        return (
+            segment.cache(),
+            [(name, getattr(options.opts, name)) for name in option_names],
+            (
+                None
+                if self.symbol_digests is None
+                else self.symbol_digests.get_segment_digest(segment)
+            ),
+            self.get_rom_digest(segment),
+        )
+
+    def get_miss_reason(self, segment: Segment) -> Optional[str]:
+        """
+        Returns why the segment has to be processed again, or None if it can be taken from the cache
+        """
+        segment_id = segment.unique_id()
+        entry = self.get_entry(segment_id)
+        if entry is None:
+            return "not cached"
+
+        key = self.get_key(segment)
+        if key != entry.segment:
+            definition, option_values, symbols_digest, rom_digest = key
+            (
+                cached_definition,
+                cached_option_values,
+                cached_symbols_digest,
+                cached_rom_digest,
+            ) = entry.segment
+            if definition != cached_definition:
+                return "segment changed (config entry, size or C file)"
+            if option_values != cached_option_values:
+                cached_options = dict(cached_option_values)
+                changed = [
+                    name
+                    for name, value in option_values
+                    if name not in cached_options or cached_options[name] != value
+                ]
+                return f"options changed ({', '.join(changed)})"
+            if symbols_digest != cached_symbols_digest:
+                return "symbols changed"
+            if rom_digest != cached_rom_digest:
+                return "rom bytes changed"
+
+        if segment_id not in self.changed and self.references_changed(entry.references):
+            return "referenced symbols changed"
+
+        if segment.should_scan() and "scan" not in self.get_products(segment_id):
+            return "not cached"
+
+        return None
 
     def check_cache_hit(self, segment: Segment, update_on_miss: bool) -> bool:
         if self.use_cache:
-            cached = segment.cache()
-            segment_id = segment.unique_id()
-
-            if cached == self.cache.get(segment_id):
+            if self.get_miss_reason(segment) is None:
                 # Cache hit
                 return True
 
             # Cache miss
             if update_on_miss:
-                self.cache[segment_id] = cached
+                # The products get filled in as the segment is scanned and split
+                segment_id = segment.unique_id()
+                self.changed[segment_id] = CacheEntry(
+                    self.get_key(segment),
+                    products=self.new_products.setdefault(segment_id, {}),
+                )
 
         return False
+
+    def record(self, segment: Segment, phase: str, action: Callable[[], None]):
+        """
+        Runs the given scan or split of a segment, keeping what it produced so a later run can replay it
+        """
+        if not self.use_cache or self.recorder is None:
+            action()
+            return
+
+        self.store_products(phase, self.recorder.record(segment, phase, action))
+
+    def store_products(self, phase: str, products: ScanProducts):
+        if self.use_cache:
+            self.new_products.setdefault(products.segment, {})[phase] = products
+
+    def replay(self, segment: Segment, phase: str) -> Optional[ScanProducts]:
+        """
+        Applies the products a cached segment's scan or split produced in the run that cached it
+        """
+        products = self.get_products(segment.unique_id()).get(phase)
+        if products is not None and self.recorder is not None:
+            self.recorder.apply(products)
+        return products
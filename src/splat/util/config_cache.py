@@ -0,0 +1,68 @@
+import pickle
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from . import log, rom
+from .. import __version__
+
+CONFIG_CACHE_FILENAME = "compiled_config.pickle"
+
+# Bump whenever the layout of the cached file changes
+CONFIG_CACHE_FORMAT_VERSION = 1
+
+
+def get_cache_path(config_path: List[str]) -> Path:
+    # The base path comes from the config itself, so the cache lives next to the first config file instead
+    return Path(config_path[0]).parent / ".splat" / CONFIG_CACHE_FILENAME
+
+
+def get_inputs(config_path: List[str]) -> List[Dict[str, Any]]:
+    return [
+        {"path": str(Path(entry).resolve()), **rom.get_file_identity(Path(entry))}
+        for entry in config_path
+    ]
+
+
+def load(config_path: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Returns the merged config stored by a previous run, if none of the config files changed since
+    """
+    cache_path = get_cache_path(config_path)
+    if not cache_path.exists():
+        return None
+
+    try:
+        with cache_path.open("rb") as f:
+            cached = pickle.load(f)
+    except Exception:
+        log.write(f"Not able to load {cache_path}. Discarding it", status="warn")
+        return None
+
+    if (
+        not isinstance(cached, dict)
+        or cached.get("format_version") != CONFIG_CACHE_FORMAT_VERSION
+        or cached.get("splat_version") != __version__
+        or cached.get("inputs") != get_inputs(config_path)
+    ):
+        return None
+    return cached["config"]
+
+
+def save(config_path: List[str], config: Dict[str, Any]):
+    cache_path = get_cache_path(config_path)
+    cached = {
+        "format_version": CONFIG_CACHE_FORMAT_VERSION,
+        "splat_version": __version__,
+        "inputs": get_inputs(config_path),
+        "config": config,
+    }
+
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = cache_path.with_suffix(".tmp")
+        with temp_path.open("wb") as f:
+            pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+        temp_path.replace(cache_path)
+    except OSError:
+        # The cache only saves time, so a read-only checkout just parses the config every time
+        pass
@@ -0,0 +1,109 @@
+import copy
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Deque, Dict, Optional, TYPE_CHECKING
+
+from . import trace
+
+if TYPE_CHECKING:
+    from n64img.image import Image
+
+# Output files are rendered by the caller and written by a bounded pool of threads, so slow filesystems don't
+# make splitting wait on one small write at a time
+
+# How many rendered files may be waiting to be written per thread before the caller has to wait
+QUEUED_WRITES_PER_JOB = 16
+
+jobs: int = 1
+executor: Optional[ThreadPoolExecutor] = None
+queue: Deque["Future[None]"] = deque()
+latest_by_path: Dict[Path, "Future[None]"] = {}
+
+
+def initialize(write_jobs: int):
+    global jobs
+
+    shutdown()
+    jobs = write_jobs
+
+
+def _reset_after_fork():
+    # Threads don't survive a fork, so the child process starts its own pool when it needs one
+    global executor
+
+    executor = None
+    queue.clear()
+    latest_by_path.clear()
+
+
+# Windows has no fork, so there is nothing to reset there
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def submit(path: Path, write: Callable[[Path], None]):
+    global executor
+
+    def job():
+        with trace.span("write", path=str(path)):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            write(path)
+
+    if jobs <= 1:
+        job()
+        return
+
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="writer")
+
+    # Writes to the same file must happen in the order they were requested
+    previous = latest_by_path.get(path)
+    if previous is not None:
+        previous.result()
+
+    future = executor.submit(job)
+    queue.append(future)
+    latest_by_path[path] = future
+
+    while len(queue) > jobs * QUEUED_WRITES_PER_JOB:
+        queue.popleft().result()
+
+
+def write_text(path: Path, content: str):
+    def write(path: Path):
+        with path.open("w", newline="\n") as f:
+            f.write(content)
+
+    submit(path, write)
+
+
+def write_bytes(path: Path, content: bytes):
+    def write(path: Path):
+        path.write_bytes(content)
+
+    submit(path, write)
+
+
+def write_image(path: Path, image: "Image"):
+    # The segment may keep modifying its image (i.e. its palette) after this call
+    submit(path, copy.copy(image).write)
+
+
+def flush():
+    """
+    Waits for every queued write, raising the first error that happened while writing
+    """
+    latest_by_path.clear()
+    while queue:
+        queue.popleft().result()
+
+
+def shutdown():
+    global executor
+
+    flush()
+    if executor is not None:
+        executor.shutdown()
+        executor = None
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import statistics
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from . import log
+
+HISTORY_FILENAME = "history.jsonl"
+
+# How many previous runs of the same kind the median is taken over
+WINDOW = 10
+# Regressions are only reported once there are this many previous runs to compare against
+MIN_RUNS = 3
+# Phases which got slower by less than this many seconds aren't reported, short phases are mostly noise
+MIN_DELTA = 0.05
+# Older runs are dropped from the file once it has this many
+MAX_RUNS = 1000
+
+
+@dataclass
+class Run:
+    # Runs are only compared against runs with the same key (config, modes and selected segments) and kind
+    key: str
+    # "cold" when every segment was split, "warm" when every segment came from the cache, "partial" otherwise
+    kind: str
+    splat_version: str
+    disassembler_version: Optional[str]
+    # Digest of the config files, to tell apart slowdowns caused by editing them
+    config_digest: str
+    rom_size: int
+    segments: int
+    symbols: int
+    total: float
+    # Wall time of every phase, in seconds
+    phases: Dict[str, float] = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+
+
+@dataclass
+class Regression:
+    phase: str
+    median: float
+    wall: float
+
+    @property
+    def change(self) -> float:
+        return (self.wall - self.median) / self.median * 100
+
+
+def get_key(
+    config_path: List[str], modes: Optional[List[str]], selected: Optional[Set[str]]
+) -> str:
+    key = {
+        "config": [str(Path(path).resolve()) for path in config_path],
+        "modes": sorted(modes or ["all"]),
+        "selected": None if selected is None else sorted(selected),
+    }
+    return hashlib.sha1(json.dumps(key).encode()).hexdigest()
+
+
+def get_config_digest(config_path: List[str]) -> str:
+    digest = hashlib.sha1()
+    for path in config_path:
+        digest.update(Path(path).read_bytes())
+    return digest.hexdigest()
+
+
+def get_kind(split: int, cached: int) -> str:
+    if cached == 0:
+        return "cold"
+    if split == 0:
+        return "warm"
+    return "partial"
+
+
+def load(path: Path) -> List[Run]:
+    if not path.exists():
+        return []
+
+    ret: List[Run] = []
+    with path.open() as f:
+        for line in f:
+            try:
+                ret.append(Run(**json.loads(line)))
+            except (TypeError, ValueError):
+                # Lines written by a different version of splat, or by a run which got interrupted
+                continue
+    return ret
+
+
+def find_regressions(
+    history: List[Run], run: Run, threshold: float
+) -> List[Regression]:
+    """
+    Returns the phases of `run` which took more than `threshold` percent longer than the median of the same phase
+    in the last runs of the same key and kind
+    """
+    if run.kind == "partial":
+        # How long these take depends on how many segments changed
+        return []
+
+    previous = [r for r in history if r.key == run.key and r.kind == run.kind]
+    previous = previous[-WINDOW:]
+    if len(previous) < MIN_RUNS:
+        return []
+
+    walls = dict(run.phases)
+    walls["total"] = run.total
+
+    ret: List[Regression] = []
+    for phase, wall in walls.items():
+        past = [
+            r.total if phase == "total" else r.phases[phase]
+            for r in previous
+            if phase == "total" or phase in r.phases
+        ]
+        if len(past) < MIN_RUNS:
+            continue
+
+        median = statistics.median(past)
+        if wall - median < MIN_DELTA or median <= 0:
+            continue
+        if (wall - median) / median * 100 > threshold:
+            ret.append(Regression(phase, median, wall))
+    return ret
+
+
+def get_changes(previous: Run, run: Run) -> List[str]:
+    ret: List[str] = []
+    if previous.splat_version != run.splat_version:
+        ret.append(f"splat {previous.splat_version} -> {run.splat_version}")
+    if previous.disassembler_version != run.disassembler_version:
+        ret.append(f"{previous.disassembler_version} -> {run.disassembler_version}")
+    if previous.config_digest != run.config_digest:
+        ret.append("the config was edited")
+    if previous.symbols != run.symbols:
+        ret.append(f"{previous.symbols} -> {run.symbols} symbols")
+    return ret
+
+
+def record(path: Path, run: Run, threshold: float) -> List[Regression]:
+    """
+    Appends the run to the history file and warns about the phases that got slower than the previous runs
+    """
+    history = load(path)
+    regressions = find_regressions(history, run, threshold)
+
+    if regressions:
+        log.write(
+            f"This run was slower than the median of the previous {run.kind} runs:",
+            status="warn",
+        )
+        for regression in regressions:
+            log.write(
+                f"{regression.phase:>30}: {regression.median:9.3f}s -> {regression.wall:9.3f}s ({regression.change:+.0f}%)",
+                status="warn",
+            )
+
+        same = [r for r in history if r.key == run.key and r.kind == run.kind]
+        changes = get_changes(same[-1], run)
+        if changes:
+            log.write(
+                f"Changed since the previous run: {', '.join(changes)}", status="warn"
+            )
+
+    history.append(run)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if len(history) > MAX_RUNS:
+        temp_path = path.with_suffix(".tmp")
+        with temp_path.open("w") as f:
+            for r in history[-MAX_RUNS:]:
+                f.write(json.dumps(asdict(r)) + "\n")
+        temp_path.replace(path)
+    else:
+        with path.open("a") as f:
+            f.write(json.dumps(asdict(run)) + "\n")
+
+    return regressions
@@ -10,6 +10,9 @@ newline = True
 
 Status = Optional[str]
 
+# Message of the last error, for callers which catch the exit it causes
+last_error: Optional[str] = None
+
 
 def write(*args, status=None, **kwargs):
     global newline
@@ -22,6 +25,9 @@ def write(*args, status=None, **kwargs):
 
 
 def error(*args, **kwargs) -> NoReturn:
+    global last_error
+
+    last_error = str(args[0])
     write(*args, **kwargs, status="error")
     sys.exit(2)
 
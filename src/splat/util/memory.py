@@ -0,0 +1,202 @@
+import json
+import os
+import sys
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+
+from . import log
+from .statistics import fmt_size
+
+# circular import
+if TYPE_CHECKING:
+    from ..segtypes.segment import Segment
+
+MEMORY_FILENAME = "memory.json"
+
+# How many allocation sites are kept for each tracemalloc sample
+TOP_ALLOCATORS = 10
+
+
+@dataclass
+class Allocator:
+    location: str
+    size: int
+    count: int
+
+
+@dataclass
+class Sample:
+    label: str
+    rss: Optional[int]
+    peak_rss: Optional[int]
+    # Only filled when tracemalloc is used
+    traced: Optional[int] = None
+    top_allocators: List[Allocator] = field(default_factory=list)
+
+
+@dataclass
+class SegmentMemory:
+    segment: str
+    name: str
+    type: str
+    action: str
+    # Growth of the measured memory while the segment ran, negative if it freed more than it kept
+    growth: int
+    rss: Optional[int]
+
+
+@dataclass
+class _State:
+    samples: List[Sample] = field(default_factory=list)
+    segments: List[SegmentMemory] = field(default_factory=list)
+
+
+enabled = False
+use_tracemalloc = False
+_state = _State()
+
+
+def initialize(mode: Optional[str]):
+    """
+    Starts recording memory usage. `mode` is either None (disabled), "rss" or "tracemalloc", which also traces
+    every python allocation to find the biggest allocation sites, at the cost of a much slower run
+    """
+    global enabled
+    global use_tracemalloc
+    global _state
+
+    enabled = mode is not None
+    use_tracemalloc = mode == "tracemalloc"
+    _state = _State()
+
+    if use_tracemalloc and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not use_tracemalloc and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def get_rss() -> Optional[int]:
+    # Only available on Linux, there's no portable way to get the current RSS without extra dependencies
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def get_peak_rss() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports it in KiB, macOS in bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def get_current() -> Optional[int]:
+    if use_tracemalloc:
+        return tracemalloc.get_traced_memory()[0]
+    return get_rss()
+
+
+def sample(label: str):
+    """
+    Records the memory usage at a phase boundary
+    """
+    if not enabled:
+        return
+
+    ret = Sample(label, get_rss(), get_peak_rss())
+
+    if use_tracemalloc:
+        ret.traced = tracemalloc.get_traced_memory()[0]
+        stats = tracemalloc.take_snapshot().statistics("lineno")
+        for stat in stats[:TOP_ALLOCATORS]:
+            frame = stat.traceback[0]
+            ret.top_allocators.append(
+                Allocator(f"{frame.filename}:{frame.lineno}", stat.size, stat.count)
+            )
+
+    _state.samples.append(ret)
+
+
+@contextmanager
+def segment(seg: "Segment", action: str) -> Iterator[None]:
+    """
+    Charges the memory a top-level segment's scan or split kept around to its type, and records the RSS afterwards
+    """
+    if not enabled:
+        yield
+        return
+
+    before = get_current()
+    try:
+        yield
+    finally:
+        after = get_current()
+        if before is not None and after is not None:
+            _state.segments.append(
+                SegmentMemory(
+                    seg.unique_id(),
+                    seg.name,
+                    seg.type,
+                    action,
+                    after - before,
+                    get_rss(),
+                )
+            )
+
+
+def get_type_totals() -> Dict[str, int]:
+    ret: Dict[str, int] = {}
+    for seg in _state.segments:
+        ret[seg.type] = ret.get(seg.type, 0) + seg.growth
+    return ret
+
+
+def _fmt(size: Optional[int]) -> str:
+    if size is None:
+        return "unknown"
+    if size < 0:
+        return "-" + fmt_size(-size)
+    return fmt_size(size)
+
+
+def print_report():
+    measured = "traced python memory" if use_tracemalloc else "RSS"
+
+    log.write("Memory (RSS / peak RSS):")
+    for s in _state.samples:
+        log.write(f"{s.label:>30}: {_fmt(s.rss):>8} / {_fmt(s.peak_rss):>8}")
+
+    log.write(f"Growth of the {measured} by segment type:")
+    for typ, growth in sorted(get_type_totals().items(), key=lambda t: -t[1]):
+        log.write(f"{typ:>30}: {_fmt(growth):>8}")
+
+    if use_tracemalloc and _state.samples:
+        biggest = max(_state.samples, key=lambda s: s.traced or 0)
+        log.write(f"Top allocation sites after {biggest.label}:")
+        for allocator in biggest.top_allocators:
+            log.write(
+                f"{_fmt(allocator.size):>8} in {allocator.count} blocks: {allocator.location}"
+            )
+
+
+def write_report(path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w") as f:
+        json.dump(
+            {
+                "measured": "tracemalloc" if use_tracemalloc else "rss",
+                "samples": [asdict(s) for s in _state.samples],
+                "types": get_type_totals(),
+                "segments": [asdict(s) for s in _state.segments],
+            },
+            f,
+            indent=2,
+        )
@@ -2,9 +2,6 @@
 
 import argparse
 
-import rabbitizer
-import spimdisasm
-
 
 def int_any_base(x):
     return int(x, 0)
@@ -25,6 +22,9 @@ parser.add_argument(
 
 
 def run(rom_bytes, start_offset, vram, end_offset=None):
+    import rabbitizer
+    import spimdisasm
+
     rom_addr = start_offset
     last_return = rom_addr
 
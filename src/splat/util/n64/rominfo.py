@@ -13,9 +13,6 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
-import rabbitizer
-import spimdisasm
-
 parser = argparse.ArgumentParser(description="Gives information on N64 roms")
 parser.add_argument("rom", help="path to an N64 rom")
 parser.add_argument(
@@ -81,6 +78,9 @@ class N64EntrypointInfo:
     def parse_rom_bytes(
         rom_bytes, offset: int = 0x1000, size: int = 0x60
     ) -> "N64EntrypointInfo":
+        import rabbitizer
+        import spimdisasm
+
         word_list = spimdisasm.common.Utils.bytesToWords(
             rom_bytes, offset, offset + size
         )
@@ -276,6 +276,9 @@ def get_info_bytes(rom_bytes: bytes, header_encoding: str) -> N64Rom:
 
 
 def get_compiler_info(rom_bytes, entry_point, print_result=True):
+    import rabbitizer
+    import spimdisasm
+
     jumps = 0
     branches = 0
 
@@ -300,6 +303,8 @@ def get_compiler_info(rom_bytes, entry_point, print_result=True):
 
 
 def main():
+    import rabbitizer
+
     rabbitizer.config.pseudos_pseudoB = True
 
     args = parser.parse_args()
@@ -13,6 +13,10 @@ class SplatOpts:
     verbose: bool
     dump_symbols: bool
     modes: List[str]
+    # Determines whether the timings of every run are kept in the .splat folder, to warn when a run gets slower
+    perf_history: bool
+    # Percentage above the median of the previous runs from which a phase is reported as slower
+    perf_regression_threshold: float
 
     # Project configuration
 
@@ -245,6 +249,10 @@ class SplatOpts:
     def is_mode_active(self, mode: str) -> bool:
         return mode in self.modes or "all" in self.modes
 
+    # Returns the folder where splat keeps the files it generates for itself
+    def get_splat_hidden_path(self) -> Path:
+        return self.base_path / ".splat"
+
 
 opts: SplatOpts
 
@@ -370,6 +378,8 @@ def _parse_yaml(
         verbose=verbose,
         dump_symbols=p.parse_opt("dump_symbols", bool, False),
         modes=modes,
+        perf_history=p.parse_opt("perf_history", bool, True),
+        perf_regression_threshold=p.parse_opt("perf_regression_threshold", float, 25.0),
         base_path=base_path,
         target_path=p.parse_path(base_path, "target_path"),
         elf_path=p.parse_optional_path(base_path, "elf_path"),
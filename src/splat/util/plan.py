@@ -0,0 +1,93 @@
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from . import history, log
+from .cache_handler import Cache
+from .selection import Selection
+from ..segtypes.segment import Segment
+
+# Phases whose duration depends on how much of the rom gets scanned and split
+SEGMENT_PHASES = ["do_scan", "do_split", "do_pipelined_scan_and_split"]
+
+
+@dataclass
+class PlannedSegment:
+    name: str
+    type: str
+    size: int
+    # "scan", "split" or both
+    actions: List[str]
+    reason: str
+
+
+def get_plan(
+    segments: List[Segment], cache: Cache, selected: Optional[Selection] = None
+) -> List[PlannedSegment]:
+    """
+    Returns the top-level segments a split would scan or split again, and why
+    """
+    ret: List[PlannedSegment] = []
+    for segment in segments:
+        actions: List[str] = []
+        if segment.should_scan():
+            actions.append("scan")
+        if segment.should_split() and (
+            selected is None or selected.is_selected(segment)
+        ):
+            actions.append("split")
+        if not actions:
+            continue
+
+        if cache.use_cache:
+            reason = cache.get_miss_reason(segment)
+            if reason is None:
+                continue
+        else:
+            reason = "the cache isn't used"
+
+        ret.append(
+            PlannedSegment(
+                segment.name, segment.type, segment.size or 0, actions, reason
+            )
+        )
+    return ret
+
+
+def estimate(
+    runs: List[history.Run], key: str, planned: List[PlannedSegment]
+) -> Optional[Tuple[float, history.Run]]:
+    """
+    Estimates how long the split would take from the last run which split everything, preferably with the same
+    config, modes and segments, assuming scanning and splitting take time in proportion to the size of the segments.
+    Returns the estimate and the run it is based on
+    """
+    cold = [run for run in runs if run.kind == "cold"]
+    cold = [run for run in cold if run.key == key] or cold
+    if not cold or cold[-1].rom_size == 0:
+        return None
+
+    run = cold[-1]
+    variable = sum(run.phases.get(phase, 0.0) for phase in SEGMENT_PHASES)
+    fraction = min(1.0, sum(p.size for p in planned) / run.rom_size)
+    return run.total - variable + variable * fraction, run
+
+
+def print_plan(
+    planned: List[PlannedSegment], estimated: Optional[Tuple[float, history.Run]]
+):
+    if not planned:
+        log.write("Every segment is up to date")
+        return
+
+    log.write(f"{len(planned)} segments would be processed:")
+    for p in planned:
+        description = f"{p.type} {p.name}"
+        log.write(f"{description:>30}: {' and '.join(p.actions)}, {p.reason}")
+
+    if estimated is None:
+        log.write("There is no previous full split to estimate the time from")
+    else:
+        seconds, run = estimated
+        log.write(
+            f"Estimated time: {seconds:.1f}s (based on a full split which took {run.total:.1f}s)"
+        )
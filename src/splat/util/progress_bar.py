@@ -1,8 +1,13 @@
-import tqdm
 import sys
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import tqdm
 
 out_file = sys.stderr
 
 
-def get_progress_bar(elements: list) -> tqdm.tqdm:
+def get_progress_bar(elements: list) -> "tqdm.tqdm":
+    import tqdm
+
     return tqdm.tqdm(elements, total=len(elements), file=out_file)
@@ -11,9 +11,6 @@ import dataclasses
 
 from pathlib import Path
 
-import rabbitizer
-import spimdisasm
-
 # PSX EXE has the following layout
 # header   ; 0x80 bytes
 # padding  ; 0x780 bytes
@@ -90,6 +87,8 @@ def is_valid(insn) -> bool:
 def try_find_text(
     rom_bytes, start_offset=PAYLOAD_OFFSET, valid_threshold=32
 ) -> tuple[int, int]:
+    import rabbitizer
+
     start = end = 0
     good_count = valid_count = 0
 
@@ -128,6 +127,8 @@ def try_get_gp(rom_bytes, start_offset, max_instructions=50) -> int:
     # $gp is set like this:
     # /* A7738 800B7138 0E801C3C */  lui        $gp, (0x800E0000 >> 16)
     # /* A773C 800B713C 90409C27 */  addiu      $gp, $gp, 0x4090
+    import rabbitizer
+
     gp = 0
     words = struct.iter_unpack("<I", rom_bytes[start_offset:])
     for i, (word,) in enumerate(words):
@@ -0,0 +1,220 @@
+from bisect import bisect_right
+from itertools import count
+from typing import (
+    Any,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+# (size, begin, order of addition, end, data). Sorting entries puts the smallest ranges first, and the order of
+# addition breaks every tie so the data itself is never compared
+Entry = Tuple[int, int, int, int, Any]
+
+# Placeholder for the layout of NestedRanges before it's filled
+EMPTY_ENTRY: Entry = (0, 0, 0, 0, None)
+
+# Ranges added after a lookup are kept in a plain list until there are this many of them
+PENDING_LIMIT = 64
+
+
+class NestedRanges:
+    """
+    Ranges stored as a nested containment list: the ranges which no other range contains form the top list, the
+    ranges directly contained by each range form a list of their own, and so on. No range of a list contains another
+    one from the same list, so each list is sorted by both begin and end, and the ranges of a list containing an
+    address are a contiguous run found with two bisections. Building it takes a sort, and every range is stored once
+    however deeply they are nested
+    """
+
+    def __init__(self, entries: List[Entry]):
+        self.entries = entries
+
+        # By begin and then widest first, so every range comes right after the ones containing it. Identical ranges
+        # are nested in each other with the one added first innermost, so the innermost matches are always the
+        # smallest ones
+        ordered = sorted(entries, key=lambda e: (e[1], -e[3], -e[2]))
+
+        # The list each range belongs to, with 0 being the top one, and the list of the ranges it contains
+        parent_lists: List[int] = []
+        child_lists = [-1] * len(ordered)
+        list_count = 1
+        # Positions in `ordered` of the ranges containing the current one, innermost last
+        containing: List[int] = []
+        for i, entry in enumerate(ordered):
+            while containing and ordered[containing[-1]][3] < entry[3]:
+                containing.pop()
+            if containing:
+                parent = containing[-1]
+                if child_lists[parent] < 0:
+                    child_lists[parent] = list_count
+                    list_count += 1
+                parent_lists.append(child_lists[parent])
+            else:
+                parent_lists.append(0)
+            containing.append(i)
+
+        # Every list is laid out contiguously, in the order of `ordered`
+        sizes = [0] * list_count
+        for parent_list in parent_lists:
+            sizes[parent_list] += 1
+        self.list_starts: List[int] = []
+        position = 0
+        for size in sizes:
+            self.list_starts.append(position)
+            position += size
+        self.list_ends = [start + size for start, size in zip(self.list_starts, sizes)]
+
+        positions = list(self.list_starts)
+        self.begins = [0] * len(ordered)
+        self.ends = [0] * len(ordered)
+        self.laid_out: List[Entry] = [EMPTY_ENTRY] * len(ordered)
+        self.child_lists = [-1] * len(ordered)
+        for i, entry in enumerate(ordered):
+            position = positions[parent_lists[i]]
+            positions[parent_lists[i]] += 1
+            self.begins[position] = entry[1]
+            self.ends[position] = entry[3]
+            self.laid_out[position] = entry
+            self.child_lists[position] = child_lists[i]
+
+    def at(self, point: int) -> List[Entry]:
+        """
+        Returns the ranges containing the address, in no particular order
+        """
+        begins = self.begins
+        found: List[Entry] = []
+        lists = [0]
+        while lists:
+            current = lists.pop()
+            end = self.list_ends[current]
+            # The ranges containing the address go from the first one ending after it up to the first one beginning
+            # after it, which is usually the next one
+            for i in range(
+                bisect_right(self.ends, point, self.list_starts[current], end), end
+            ):
+                if begins[i] > point:
+                    break
+                found.append(self.laid_out[i])
+                if self.child_lists[i] >= 0:
+                    lists.append(self.child_lists[i])
+        return found
+
+    def find(self, point: int) -> Optional[Entry]:
+        """
+        Returns the smallest range containing the address. Only the matches without any match inside them are
+        compared, since the ranges containing them can't be smaller
+        """
+        begins = self.begins
+        laid_out = self.laid_out
+        child_lists = self.child_lists
+        best: Optional[Entry] = None
+        # Lists to look into, with the position of the range containing them
+        lists = [(0, -1)]
+        while lists:
+            current, parent = lists.pop()
+            end = self.list_ends[current]
+            matched = False
+            for i in range(
+                bisect_right(self.ends, point, self.list_starts[current], end), end
+            ):
+                if begins[i] > point:
+                    break
+                matched = True
+                if child_lists[i] >= 0:
+                    lists.append((child_lists[i], i))
+                elif best is None or laid_out[i] < best:
+                    best = laid_out[i]
+            if not matched and parent >= 0:
+                if best is None or laid_out[parent] < best:
+                    best = laid_out[parent]
+        return best
+
+
+class RangeIndex(Generic[T]):
+    """
+    Half-open [begin, end) ranges of addresses, each with some data, looked up by the addresses they contain.
+    Overlapping matches are returned smallest first, with ties going to the lowest begin and then to the range added
+    first.
+
+    Nothing is indexed until the first lookup, so adding lots of ranges in a row is cheap. Ranges added after that
+    are indexed in batches of increasing size, which get merged together as they grow so there are only a few of
+    them to look into
+    """
+
+    def __init__(self, ranges: Iterable[Tuple[int, int, T]] = ()):
+        self.levels: List[NestedRanges] = []
+        self.pending: List[Entry] = []
+        self.order = count()
+        self.extend(ranges)
+
+    def add(self, begin: int, end: int, data: T):
+        # Empty ranges don't contain any address
+        if begin < end:
+            self.pending.append((end - begin, begin, next(self.order), end, data))
+
+    def extend(self, ranges: Iterable[Tuple[int, int, T]]):
+        for begin, end, data in ranges:
+            self.add(begin, end, data)
+
+    def update(self):
+        # Lookups go through the pending ranges one by one, so there can't be many of them
+        if len(self.pending) >= PENDING_LIMIT or (self.pending and not self.levels):
+            self.index_pending()
+
+    def index_pending(self):
+        entries = self.pending
+        self.pending = []
+        while self.levels and len(self.levels[-1].entries) <= len(entries):
+            entries = self.levels.pop().entries + entries
+        self.levels.append(NestedRanges(entries))
+
+    def get_entries(self, point: int) -> List[Entry]:
+        self.update()
+
+        found = [e for level in self.levels for e in level.at(point)]
+        found.extend(e for e in self.pending if e[1] <= point < e[3])
+        found.sort()
+        return found
+
+    def at(self, point: int) -> List[T]:
+        """
+        Returns the data of every range containing the address, smallest first
+        """
+        return [e[4] for e in self.get_entries(point)]
+
+    def find(self, point: int) -> Optional[T]:
+        """
+        Returns the data of the smallest range containing the address
+        """
+        self.update()
+
+        best: Optional[Entry] = None
+        for level in self.levels:
+            found = level.find(point)
+            if found is not None and (best is None or found < best):
+                best = found
+        for entry in self.pending:
+            if entry[1] <= point < entry[3] and (best is None or entry < best):
+                best = entry
+        return None if best is None else best[4]
+
+    def __len__(self) -> int:
+        return len(self.pending) + sum(len(level.entries) for level in self.levels)
+
+    def __iter__(self) -> Iterator[Tuple[int, int, T]]:
+        """
+        Yields every range as (begin, end, data), in the order they were added
+        """
+        entries = sorted(
+            (e for level in self.levels for e in level.entries), key=lambda e: e[2]
+        )
+        entries.extend(self.pending)
+        for _, begin, _, end, data in entries:
+            yield begin, end, data
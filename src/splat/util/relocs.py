@@ -1,9 +1,7 @@
 from dataclasses import dataclass
 from typing import Dict
 
-import spimdisasm
-
-from . import log, options, symbols, progress_bar
+from . import log, options, symbols, symbol_db, progress_bar
 
 
 @dataclass
@@ -17,6 +15,14 @@ class Reloc:
 
 all_relocs: Dict[int, Reloc] = {}
 
+# Columns of the reloc_addrs database
+RELOC_DB_TYPECODES = {
+    "rom_address": "Q",
+    "reloc_type": "s",
+    "symbol_name": "s",
+    "addend": "q",
+}
+
 
 def add_reloc(reloc: Reloc):
     all_relocs[reloc.rom_address] = reloc
@@ -27,7 +33,20 @@ def initialize():
 
     all_relocs = {}
 
-    for path in options.opts.reloc_addrs_paths:
+    paths = options.opts.reloc_addrs_paths
+    key = symbol_db.get_key(paths)
+    table = symbol_db.load("reloc_addrs", key, RELOC_DB_TYPECODES)
+    if table is not None:
+        strings = table.strings
+        for rom_address, reloc_type, symbol_name, addend in zip(
+            *table.columns.values()
+        ):
+            add_reloc(
+                Reloc(rom_address, strings[reloc_type], strings[symbol_name], addend)
+            )
+        return
+
+    for path in paths:
         if not path.exists():
             continue
 
@@ -115,8 +134,26 @@ def initialize():
                 )
             add_reloc(reloc)
 
+    # Every file was parsed without errors (or splat exited) by now
+    table = symbol_db.Table(RELOC_DB_TYPECODES)
+    try:
+        table.extend(
+            {
+                "rom_address": list(all_relocs),
+                "reloc_type": [reloc.reloc_type for reloc in all_relocs.values()],
+                "symbol_name": [reloc.symbol_name for reloc in all_relocs.values()],
+                "addend": [reloc.addend for reloc in all_relocs.values()],
+            }
+        )
+    except (OverflowError, ValueError):
+        # Values which don't fit in the database, so the files will be parsed every time
+        return
+    symbol_db.save("reloc_addrs", key, table)
+
 
 def initialize_spim_context():
+    import spimdisasm
+
     for rom_address, reloc in all_relocs.items():
         reloc_type = spimdisasm.common.RelocType.fromStr(reloc.reloc_type)
 
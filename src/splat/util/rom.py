@@ -0,0 +1,86 @@
+import hashlib
+import json
+import mmap
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, Union
+
+from . import log, options
+
+# Roms are memory mapped and handed to the segments as memoryviews, so slicing them doesn't copy anything.
+# Segments may still be given regular bytes, i.e. when they are read from their own file
+RomBytes = Union[bytes, memoryview]
+
+# Checksums which can be used to verify the target binary, by the name of their key in the config
+CHECKSUMS: Dict[str, Callable[[RomBytes], str]] = {
+    "sha1": lambda data: hashlib.sha1(data).hexdigest(),
+    # Not cryptographic, but a lot faster to compute on big targets
+    "crc32": lambda data: f"{zlib.crc32(data):08x}",
+}
+
+VERIFIED_TARGETS_FILENAME = "verified_targets.json"
+
+
+def map_file(path: Path) -> memoryview:
+    with path.open("rb") as f:
+        try:
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except ValueError:
+            # Empty files can't be mapped
+            return memoryview(f.read())
+
+
+def get_file_identity(path: Path) -> Dict[str, int]:
+    stat = path.stat()
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "inode": stat.st_ino,
+    }
+
+
+def get_checksum(path: Path, rom_bytes: RomBytes, algorithm: str) -> str:
+    """
+    Returns the checksum of the file, reusing the one computed by a previous run if the file hasn't changed since
+    """
+    records_path = options.opts.get_splat_hidden_path() / VERIFIED_TARGETS_FILENAME
+    key = str(path.resolve())
+    identity = get_file_identity(path)
+
+    records: Dict[str, dict] = {}
+    if records_path.exists():
+        try:
+            with records_path.open() as f:
+                records = json.load(f)
+        except (OSError, ValueError):
+            log.write(f"Not able to load {records_path}. Discarding it", status="warn")
+
+    record = records.get(key)
+    if record is not None and record.get("identity") == identity:
+        checksum = record.get("checksums", {}).get(algorithm)
+        if checksum is not None:
+            return checksum
+    else:
+        record = {"identity": identity, "checksums": {}}
+
+    checksum = CHECKSUMS[algorithm](rom_bytes)
+    record["checksums"][algorithm] = checksum
+    records[key] = record
+
+    records_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = records_path.with_suffix(".tmp")
+    with temp_path.open("w") as f:
+        json.dump(records, f, indent=2)
+    temp_path.replace(records_path)
+
+    return checksum
+
+
+def normalize_checksum(expected: Union[str, int]) -> str:
+    # yaml reads unquoted hexadecimal values, like `crc32: 0x1234ABCD`, as integers
+    if isinstance(expected, int):
+        return f"{expected:08x}"
+    expected = expected.lower()
+    if expected.startswith("0x"):
+        expected = expected[2:]
+    return expected
@@ -0,0 +1,495 @@
+import dataclasses
+import enum
+import functools
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+
+from . import symbols
+from .symbols import Symbol
+
+# circular import
+if TYPE_CHECKING:
+    import spimdisasm
+
+    from ..segtypes.segment import Segment
+
+
+# Identifies a spimdisasm SymbolsSegment: ("global", None, None), ("unknown", None, None) or ("overlay", category, vrom start)
+SpimSegmentKey = Tuple[str, Optional[str], Optional[int]]
+
+# Identifies a splat symbol across processes and runs: ("known", index in all_symbols) for symbols which existed
+# before any recording took place, ("new", segment unique id, phase, ordinal) for symbols created while recording
+# a segment, or ("forked", index in all_symbols) for the other symbols which existed when worker processes were
+# forked. The last ones only mean something within a single run
+SymbolKey = Tuple[Any, ...]
+
+# ContextSymbol fields which reference other objects and can't be moved between processes
+_CONTEXT_SYM_REFERENCE_FIELDS = {
+    "address",
+    "parentFunction",
+    "nameGetCallback",
+    "autoCreatedPadMainSymbol",
+}
+
+
+# Both are only computed when first needed, so importing splat doesn't import spimdisasm
+@functools.lru_cache(maxsize=None)
+def _get_plain_types() -> Tuple[type, ...]:
+    import rabbitizer
+
+    return (bool, int, str, enum.Enum, rabbitizer.Enum)
+
+
+def _is_plain_value(value: Any) -> bool:
+    return value is None or isinstance(value, _get_plain_types())
+
+
+@functools.lru_cache(maxsize=None)
+def _get_context_sym_defaults() -> Dict[str, Any]:
+    import spimdisasm
+
+    return {
+        f.name: f.default
+        for f in dataclasses.fields(spimdisasm.common.ContextSymbol)
+        if f.name not in _CONTEXT_SYM_REFERENCE_FIELDS
+        and f.default is not dataclasses.MISSING
+        and _is_plain_value(f.default)
+    }
+
+
+def _is_default(value: Any, default: Any) -> bool:
+    # rabbitizer enums never compare equal (nor unequal) to None
+    if default is None:
+        return value is None
+    return value == default
+
+
+def _context_sym_values(
+    context_sym: "spimdisasm.common.ContextSymbol",
+) -> Dict[str, Any]:
+    ret = {}
+    for name, default in _get_context_sym_defaults().items():
+        value = getattr(context_sym, name)
+        if not _is_default(value, default) and _is_plain_value(value):
+            ret[name] = value
+    return ret
+
+
+def _context_sym_fingerprint(context_sym: "spimdisasm.common.ContextSymbol") -> tuple:
+    return tuple(getattr(context_sym, name) for name in _get_context_sym_defaults())
+
+
+def _pointer_sort_key(entry: Tuple[SpimSegmentKey, int]) -> Tuple[str, str, int, int]:
+    (kind, category, vrom), pointer = entry
+    return (kind, category or "", vrom or 0, pointer)
+
+
+@dataclass
+class ContextSymbolRecord:
+    segment: SpimSegmentKey
+    address: int
+    values: Dict[str, Any]
+
+
+@dataclass
+class SymbolRecord:
+    key: SymbolKey
+    vram_start: int
+    # unique_id() of the symbol's top-level segment
+    segment: Optional[str]
+    # Whether the symbol is listed in its segment's seg_symbols
+    in_segment_symbols: bool
+
+    given_name: Optional[str]
+    rom: Optional[int]
+    type: Optional[str]
+    given_size: Optional[int]
+    linker_section: Optional[str]
+    defined: bool
+    referenced: bool
+
+    context_sym: Optional[ContextSymbolRecord] = None
+
+
+@dataclass
+class ScanProducts:
+    """
+    Everything a segment's scan (or split) did to the shared symbol state, in a form that can be sent to other
+    processes (or stored in the cache) and applied there
+    """
+
+    segment: str
+    # "scan" or "split"
+    phase: str
+    symbols: List[SymbolRecord] = field(default_factory=list)
+    # Context symbols in the segment's own range which have no splat counterpart, like branch labels
+    context_symbols: List[ContextSymbolRecord] = field(default_factory=list)
+    # Pointers found in data which spimdisasm hasn't turned into symbols yet
+    added_pointers_in_data: List[Tuple[SpimSegmentKey, int]] = field(
+        default_factory=list
+    )
+    popped_pointers_in_data: List[Tuple[SpimSegmentKey, int]] = field(
+        default_factory=list
+    )
+    to_mark_as_defined: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+
+class ProductRecorder:
+    def __init__(self, all_segments: "List[Segment]"):
+        self.all_segments = all_segments
+        self.segment_indexes: Dict[int, int] = {
+            id(seg): i for i, seg in enumerate(all_segments)
+        }
+        self.segments_by_id: "Dict[str, Segment]" = {
+            seg.unique_id(): seg for seg in all_segments
+        }
+
+        # Symbols which exist at this point are identical in every process sharing this recorder's starting state
+        self.known_symbols: Dict[int, int] = {
+            id(sym): i for i, sym in enumerate(symbols.all_symbols)
+        }
+
+        self.keys_by_symbol: Dict[int, SymbolKey] = {}
+        self.symbols_by_key: Dict[SymbolKey, Symbol] = {}
+        self.new_symbols_count: Dict[Tuple[str, str], int] = {}
+
+    def get_spim_segment(
+        self, key: SpimSegmentKey
+    ) -> "spimdisasm.common.SymbolsSegment":
+        kind, category, vrom = key
+        if kind == "global":
+            return symbols.spim_context.globalSegment
+        if kind == "unknown":
+            return symbols.spim_context.unknownSegment
+        assert category is not None and vrom is not None
+        return symbols.spim_context.overlaySegments[category][vrom]
+
+    def get_all_spim_segments(
+        self,
+    ) -> "List[Tuple[SpimSegmentKey, spimdisasm.common.SymbolsSegment]]":
+        context = symbols.spim_context
+        ret: List[Tuple[SpimSegmentKey, spimdisasm.common.SymbolsSegment]] = [
+            (("global", None, None), context.globalSegment),
+            (("unknown", None, None), context.unknownSegment),
+        ]
+        for category, segments in context.overlaySegments.items():
+            for vrom, spim_segment in segments.items():
+                ret.append((("overlay", category, vrom), spim_segment))
+        return ret
+
+    def snapshot_pointers_in_data(self) -> Set[Tuple[SpimSegmentKey, int]]:
+        return {
+            (key, pointer)
+            for key, spim_segment in self.get_all_spim_segments()
+            for pointer in spim_segment.newPointersInData
+        }
+
+    def get_spim_segment_key(
+        self, context_sym: "spimdisasm.common.ContextSymbol"
+    ) -> Optional[SpimSegmentKey]:
+        address = context_sym.address
+        context = symbols.spim_context
+
+        if context.globalSegment.symbols.get(address) is context_sym:
+            return ("global", None, None)
+        if context.unknownSegment.symbols.get(address) is context_sym:
+            return ("unknown", None, None)
+
+        categories = list(context.overlaySegments.keys())
+        if context_sym.overlayCategory in context.overlaySegments:
+            categories.remove(context_sym.overlayCategory)
+            categories.insert(0, context_sym.overlayCategory)
+
+        for category in categories:
+            for vrom, spim_segment in context.overlaySegments[category].items():
+                if spim_segment.symbols.get(address) is context_sym:
+                    return ("overlay", category, vrom)
+        return None
+
+    def get_own_spim_segment_key(self, segment: "Segment") -> SpimSegmentKey:
+        ram_id = segment.get_exclusive_ram_id()
+        if ram_id is None:
+            return ("global", None, None)
+        return ("overlay", ram_id, segment.rom_start)
+
+    def snapshot_own_range(self, segment: "Segment") -> Optional[Dict[int, tuple]]:
+        if not isinstance(segment.vram_start, int) or not isinstance(
+            segment.vram_end, int
+        ):
+            return None
+
+        try:
+            spim_segment = self.get_spim_segment(self.get_own_spim_segment_key(segment))
+        except KeyError:
+            return None
+
+        return {
+            address: _context_sym_fingerprint(context_sym)
+            for address, context_sym in spim_segment.getSymbolsRange(
+                segment.vram_start, segment.vram_end
+            )
+        }
+
+    def record(self, segment: "Segment", phase: str, action: Callable[[], None]):
+        segment_id = segment.unique_id()
+        products = ScanProducts(segment_id, phase)
+
+        snapshot = self.snapshot_own_range(segment)
+        pointers_before = self.snapshot_pointers_in_data()
+        marked_before = set(symbols.to_mark_as_defined)
+        warnings_before = len(segment.warnings)
+
+        symbols.start_recording()
+        try:
+            action()
+        finally:
+            recorded = symbols.stop_recording()
+
+        recorded_context: Dict[Tuple[SpimSegmentKey, int], bool] = {}
+
+        for entry in recorded:
+            record = self.make_symbol_record(entry.symbol, segment_id, phase)
+            if entry.context_sym is not None:
+                spim_segment_key = self.get_spim_segment_key(entry.context_sym)
+                if spim_segment_key is not None:
+                    record.context_sym = ContextSymbolRecord(
+                        spim_segment_key,
+                        entry.context_sym.address,
+                        _context_sym_values(entry.context_sym),
+                    )
+                    recorded_context[(spim_segment_key, entry.context_sym.address)] = (
+                        True
+                    )
+            products.symbols.append(record)
+
+        if snapshot is not None:
+            own_key = self.get_own_spim_segment_key(segment)
+            spim_segment = self.get_spim_segment(own_key)
+            assert isinstance(segment.vram_start, int)
+            assert isinstance(segment.vram_end, int)
+            for address, context_sym in spim_segment.getSymbolsRange(
+                segment.vram_start, segment.vram_end
+            ):
+                if (own_key, address) in recorded_context:
+                    continue
+                if snapshot.get(address) == _context_sym_fingerprint(context_sym):
+                    continue
+                products.context_symbols.append(
+                    ContextSymbolRecord(
+                        own_key, address, _context_sym_values(context_sym)
+                    )
+                )
+
+        pointers_after = self.snapshot_pointers_in_data()
+        products.added_pointers_in_data = sorted(
+            pointers_after - pointers_before, key=_pointer_sort_key
+        )
+        products.popped_pointers_in_data = sorted(
+            pointers_before - pointers_after, key=_pointer_sort_key
+        )
+
+        products.to_mark_as_defined = sorted(symbols.to_mark_as_defined - marked_before)
+        products.warnings = segment.warnings[warnings_before:]
+
+        return products
+
+    def make_symbol_record(
+        self, sym: Symbol, segment_id: str, phase: str
+    ) -> SymbolRecord:
+        key: Optional[SymbolKey] = None
+        if id(sym) in self.known_symbols:
+            key = ("known", self.known_symbols[id(sym)])
+        else:
+            key = self.keys_by_symbol.get(id(sym))
+        if key is None:
+            ordinal = self.new_symbols_count.get((segment_id, phase), 0)
+            self.new_symbols_count[(segment_id, phase)] = ordinal + 1
+            key = ("new", segment_id, phase, ordinal)
+            self.register_symbol(key, sym)
+
+        sym_segment: Optional[str] = None
+        in_segment_symbols = False
+        if sym.segment is not None and id(sym.segment) in self.segment_indexes:
+            sym_segment = sym.segment.unique_id()
+            in_segment_symbols = any(
+                s is sym for s in sym.segment.seg_symbols.get(sym.vram_start, [])
+            )
+
+        return SymbolRecord(
+            key=key,
+            vram_start=sym.vram_start,
+            segment=sym_segment,
+            in_segment_symbols=in_segment_symbols,
+            given_name=sym.given_name,
+            rom=sym.rom,
+            type=sym.type,
+            given_size=sym.given_size,
+            linker_section=sym.linker_section,
+            defined=sym.defined,
+            referenced=sym.referenced,
+        )
+
+    def register_symbol(self, key: SymbolKey, sym: Symbol):
+        self.keys_by_symbol[id(sym)] = key
+        self.symbols_by_key[key] = sym
+
+    def index_forked_symbols(self):
+        """
+        Gives a key to every symbol which doesn't have one yet, before forking processes which share them
+        """
+        for i, sym in enumerate(symbols.all_symbols):
+            if id(sym) not in self.known_symbols and id(sym) not in self.keys_by_symbol:
+                self.register_symbol(("forked", i), sym)
+
+    def get_segment(self, segment_id: Optional[str]) -> "Optional[Segment]":
+        if segment_id is None:
+            return None
+        return self.segments_by_id.get(segment_id)
+
+    def get_position(self, segment_id: str, phase: str) -> Tuple[int, int]:
+        """
+        Where the scan or split of a segment happens in a serial run, which scans every segment before splitting any
+        """
+        segment = self.segments_by_id.get(segment_id)
+        index = -1 if segment is None else self.segment_indexes[id(segment)]
+        return (0 if phase == "scan" else 1, index)
+
+    def existed_at(self, sym: Symbol, position: Tuple[int, int]) -> bool:
+        """
+        Whether a serial run would already have had the symbol at the given position. Other processes apply products
+        out of order, after running their own scans, so they may have created symbols a serial run only creates later
+        """
+        key = self.keys_by_symbol.get(id(sym))
+        if key is None or key[0] != "new":
+            return True
+        return self.get_position(key[1], key[2]) <= position
+
+    def find_symbol(self, record: SymbolRecord, products: ScanProducts) -> Symbol:
+        """
+        Returns the symbol a record of the given products refers to, creating it if this process doesn't have it yet
+        """
+        sym: Optional[Symbol] = None
+        if record.key[0] == "known":
+            if record.key[1] < len(symbols.all_symbols):
+                sym = symbols.all_symbols[record.key[1]]
+        else:
+            sym = self.symbols_by_key.get(record.key)
+
+        # Products replayed from the cache may come from a run where the key meant a different symbol
+        if sym is not None and sym.vram_start != record.vram_start:
+            sym = None
+
+        # Symbols which existed before anything was processed or before forking, and the ones created by these
+        # products are the same in every process
+        if sym is not None and (
+            record.key[0] in ("known", "forked")
+            or record.key[1:3] == (products.segment, products.phase)
+        ):
+            return sym
+
+        segment = self.get_segment(record.segment)
+        processed = self.get_segment(products.segment)
+
+        # Other symbols may have been found independently by another process, which didn't know about the symbols
+        # found by the segments processed before, or which knew about symbols a serial run only finds later. Look
+        # them up the way Segment.get_symbol would have in a serial run, among the symbols which existed at that
+        # point: in the processed segment's own symbols if the symbol is one of them, or else in every symbol
+        # visible from it
+        if segment is not None and segment is processed and record.in_segment_symbols:
+            existing = segment.seg_symbols.get(record.vram_start, [])
+        else:
+            existing = symbols.all_symbols_dict.get(record.vram_start, [])
+        position = self.get_position(products.segment, products.phase)
+        existing = [c for c in existing if self.existed_at(c, position)]
+
+        candidate: Optional[Symbol] = None
+        if processed is None:
+            candidate = existing[0] if existing else None
+        else:
+            candidate = processed.retrieve_symbol(
+                {record.vram_start: existing}, record.vram_start
+            )
+        if candidate is None:
+            candidate = sym
+        if candidate is not None:
+            if record.key not in self.symbols_by_key:
+                self.register_symbol(record.key, candidate)
+            return candidate
+
+        sym = Symbol(
+            record.vram_start,
+            given_name=record.given_name,
+            rom=record.rom,
+            type=record.type,
+            given_size=record.given_size,
+            segment=segment,
+        )
+        symbols.add_symbol(sym)
+        if segment is not None and record.in_segment_symbols:
+            if sym.vram_start not in segment.seg_symbols:
+                segment.seg_symbols[sym.vram_start] = []
+            segment.seg_symbols[sym.vram_start].append(sym)
+        self.register_symbol(record.key, sym)
+        return sym
+
+    def apply_context_symbol(
+        self, record: ContextSymbolRecord
+    ) -> "spimdisasm.common.ContextSymbol":
+        spim_segment = self.get_spim_segment(record.segment)
+        context_sym = spim_segment.symbols.get(record.address)
+
+        if context_sym is None:
+            context_sym = spim_segment.addSymbol(record.address)
+            for name, value in record.values.items():
+                setattr(context_sym, name, value)
+            return context_sym
+
+        for name, value in record.values.items():
+            if name == "referenceCounter":
+                context_sym.referenceCounter = max(context_sym.referenceCounter, value)
+            elif name == "isAutogenerated":
+                continue
+            elif _is_default(
+                getattr(context_sym, name), _get_context_sym_defaults()[name]
+            ):
+                setattr(context_sym, name, value)
+        return context_sym
+
+    def apply(self, products: ScanProducts):
+        for record in products.symbols:
+            sym = self.find_symbol(record, products)
+
+            if sym.segment is None:
+                sym.segment = self.get_segment(record.segment)
+            if sym.given_name is None:
+                sym.given_name = record.given_name
+            if record.rom is not None:
+                sym.rom = record.rom
+            if sym.type is None:
+                sym.type = record.type
+            if record.given_size is not None:
+                sym.given_size = record.given_size
+            if record.linker_section is not None:
+                sym.linker_section = record.linker_section
+            sym.defined = sym.defined or record.defined
+            sym.referenced = sym.referenced or record.referenced
+
+            if record.context_sym is not None:
+                context_sym = self.apply_context_symbol(record.context_sym)
+                # The context symbol may know more than the process which recorded the symbol did, like it being
+                # defined by a segment that process didn't scan
+                symbols.update_symbol_from_spim_symbol(sym, context_sym)
+
+        for context_record in products.context_symbols:
+            self.apply_context_symbol(context_record)
+
+        for spim_segment_key, pointer in products.added_pointers_in_data:
+            self.get_spim_segment(spim_segment_key).addPointerInDataReference(pointer)
+        for spim_segment_key, pointer in products.popped_pointers_in_data:
+            self.get_spim_segment(spim_segment_key).popPointerInDataReference(pointer)
+
+        symbols.to_mark_as_defined.update(products.to_mark_as_defined)
+        segment = self.get_segment(products.segment)
+        if segment is not None:
+            segment.warnings += products.warnings
@@ -0,0 +1,83 @@
+from typing import Dict, List, Optional, Set
+
+from ..segtypes.segment import Segment
+from ..segtypes.n64.ci import N64SegCi
+
+
+def is_symbol_source(segment: Segment) -> bool:
+    # Segments using the default no-op scan (and rasters, which only grab their data) can't discover symbols
+    return type(segment).scan is not Segment.scan and not isinstance(segment, N64SegCi)
+
+
+class SplitScheduler:
+    """
+    Decides when a top-level segment can be split while other segments are still being scanned.
+
+    A segment may see the symbols of every segment it could be loaded alongside. A segment with an
+    `exclusive_ram_id` is never loaded together with the other segments sharing that id, so it only has to wait for
+    its own scan and the scans of every segment with a different (or no) `exclusive_ram_id`. Segments without one
+    can be referenced by anybody, so they wait for every scan.
+
+    Segments whose scan can't discover symbols only wait for their own scan. Cached segments count as scanned once
+    the products of their scan have been replayed, so they follow the same rules.
+    """
+
+    def __init__(self, all_segments: List[Segment], to_scan: List[Segment]):
+        self.order: Dict[int, int] = {id(seg): i for i, seg in enumerate(all_segments)}
+        self.to_scan: Set[int] = {id(seg) for seg in to_scan}
+        self.scanned: Set[int] = set()
+
+        self.sources: Set[int] = {id(seg) for seg in to_scan if is_symbol_source(seg)}
+        self.pending_sources_by_ram_id: Dict[Optional[str], int] = {}
+        for seg in to_scan:
+            if id(seg) in self.sources:
+                ram_id = seg.get_exclusive_ram_id()
+                self.pending_sources_by_ram_id[ram_id] = (
+                    self.pending_sources_by_ram_id.get(ram_id, 0) + 1
+                )
+
+        # Symbol sources waiting to be split, grouped by their exclusive_ram_id
+        self.waiting: Dict[Optional[str], List[Segment]] = {}
+        self.ready: List[Segment] = []
+        for seg in all_segments:
+            if id(seg) in self.sources:
+                self.waiting.setdefault(seg.get_exclusive_ram_id(), []).append(seg)
+            elif id(seg) not in self.to_scan:
+                self.ready.append(seg)
+
+    def others_scanned(self, ram_id: Optional[str]) -> bool:
+        pending = sum(self.pending_sources_by_ram_id.values())
+        if ram_id is None:
+            return pending == 0
+        return pending - self.pending_sources_by_ram_id.get(ram_id, 0) == 0
+
+    def all_scanned(self) -> bool:
+        return len(self.scanned) == len(self.to_scan)
+
+    def mark_scanned(self, segment: Segment):
+        if id(segment) not in self.to_scan or id(segment) in self.scanned:
+            return
+
+        self.scanned.add(id(segment))
+        if id(segment) not in self.sources:
+            self.ready.append(segment)
+            return
+
+        self.pending_sources_by_ram_id[segment.get_exclusive_ram_id()] -= 1
+
+        for ram_id, waiting in self.waiting.items():
+            if not waiting or not self.others_scanned(ram_id):
+                continue
+
+            self.ready += [seg for seg in waiting if id(seg) in self.scanned]
+            self.waiting[ram_id] = [
+                seg for seg in waiting if id(seg) not in self.scanned
+            ]
+
+    def pop_ready(self) -> List[Segment]:
+        """
+        Returns the segments that can be split now, in the order they appear in the config
+        """
+        ret = sorted(self.ready, key=lambda seg: self.order[id(seg)])
+        self.ready = []
+        return ret
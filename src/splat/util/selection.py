@@ -0,0 +1,86 @@
+from fnmatch import fnmatchcase
+from typing import Dict, List, Optional, Set
+
+from .scheduler import is_symbol_source
+from ..segtypes.segment import Segment
+from ..segtypes.common.group import CommonSegGroup
+
+
+def can_see(ram_id: Optional[str], other_ram_id: Optional[str]) -> bool:
+    # Segments sharing an exclusive_ram_id are never loaded at the same time
+    return ram_id is None or other_ram_id is None or ram_id != other_ram_id
+
+
+class Selection:
+    """
+    The segments picked by name or glob pattern, i.e. with `--segments`.
+
+    A pattern matching a top-level segment selects the whole segment. Otherwise, a pattern matching the name of a
+    subsegment selects every subsegment of the same top-level segment sharing that name, which usually are the
+    .text, .data, .rodata and .bss of a single file.
+
+    Only the selected segments are split, but every segment which could see their symbols (or whose symbols they
+    could see) is scanned first, so their output is the same as in a full split.
+    """
+
+    def __init__(self, all_segments: List[Segment], patterns: Set[str]):
+        self.patterns = patterns
+        # Subsegment names to split, or None for the whole segment, by id() of the top-level segment
+        self.selected: Dict[int, Optional[Set[str]]] = {}
+        self.unmatched: List[str] = []
+
+        for pattern in sorted(patterns):
+            matched = False
+            for segment in all_segments:
+                if fnmatchcase(segment.name, pattern):
+                    self.selected[id(segment)] = None
+                    matched = True
+                elif isinstance(segment, CommonSegGroup):
+                    names = {
+                        sub.name
+                        for sub in segment.subsegments
+                        if fnmatchcase(sub.name, pattern)
+                    }
+                    if not names:
+                        continue
+                    matched = True
+                    if id(segment) not in self.selected:
+                        self.selected[id(segment)] = set()
+                    subsegment_names = self.selected[id(segment)]
+                    if subsegment_names is not None:
+                        subsegment_names |= names
+            if not matched:
+                self.unmatched.append(pattern)
+
+    def is_selected(self, segment: Segment) -> bool:
+        return id(segment) in self.selected
+
+    def get_subsegment_names(self, segment: Segment) -> Optional[Set[str]]:
+        """
+        Returns the names of the subsegments of a selected top-level segment to split, or None to split all of them
+        """
+        return self.selected[id(segment)]
+
+    def get_closure(self, all_segments: List[Segment]) -> List[Segment]:
+        """
+        Returns the selected top-level segments along with the ones which have to be scanned for them to be split,
+        in config order
+        """
+        ram_ids = {
+            segment.get_exclusive_ram_id()
+            for segment in all_segments
+            if self.is_selected(segment)
+        }
+
+        return [
+            segment
+            for segment in all_segments
+            if self.is_selected(segment)
+            or (
+                is_symbol_source(segment)
+                and any(
+                    can_see(ram_id, segment.get_exclusive_ram_id())
+                    for ram_id in ram_ids
+                )
+            )
+        ]
@@ -0,0 +1,186 @@
+import multiprocessing
+import traceback
+from multiprocessing.connection import Connection
+from typing import Callable, Dict, List, Optional, TYPE_CHECKING
+
+from . import file_writer, log, trace
+from .rom import RomBytes
+from .scan_products import ProductRecorder, ScanProducts
+
+# circular import
+if TYPE_CHECKING:
+    from ..segtypes.segment import Segment
+
+
+SplitFunction = Callable[["Segment", RomBytes], None]
+
+
+def _split_into_chunks(segments: "List[Segment]", count: int) -> "List[List[Segment]]":
+    # Contiguous chunks of roughly the same total size, so each worker keeps the split order of its own segments
+    total_size = sum(max(seg.size or 0, 1) for seg in segments)
+    chunks: "List[List[Segment]]" = [[]]
+    accumulated = 0
+    for seg in segments:
+        if (
+            len(chunks) < count
+            and chunks[-1]
+            and accumulated >= total_size * len(chunks) / count
+        ):
+            chunks.append([])
+        chunks[-1].append(seg)
+        accumulated += max(seg.size or 0, 1)
+    return chunks
+
+
+def _worker_main(
+    conn: Connection,
+    recorder: ProductRecorder,
+    rom_bytes: RomBytes,
+    split_function: SplitFunction,
+):
+    trace.process_name = "split worker"
+
+    try:
+        while True:
+            message = conn.recv()
+            if message[0] != "split":
+                break
+
+            segment = recorder.all_segments[message[1]]
+
+            def split():
+                split_function(segment, rom_bytes)
+                file_writer.flush()
+
+            with trace.span(f"split {segment.name}", type=segment.type):
+                products = recorder.record(segment, "split", split)
+            conn.send(("split", products, trace.take_events()))
+    except SystemExit:
+        # log.error already reported the problem
+        conn.send(("error", None))
+    except BaseException:
+        conn.send(("error", traceback.format_exc()))
+    finally:
+        conn.close()
+
+
+class SplitPool:
+    """
+    Splits top-level code segments in forked worker processes.
+
+    The workers are forked once every segment has been scanned, so they start from exactly the symbols a serial run
+    splits with. Scanning itself stays serial since the analysis of a segment depends on what the segments before it
+    found. Each worker owns a contiguous chunk of segments and sends back what their splits did to the symbols, which
+    the parent applies in segment order.
+    """
+
+    def __init__(
+        self,
+        recorder: ProductRecorder,
+        candidates: "List[Segment]",
+        jobs: int,
+        rom_bytes: RomBytes,
+        split_function: SplitFunction,
+    ):
+        self.recorder = recorder
+        self.connections: List[Connection] = []
+        self.processes: List[multiprocessing.process.BaseProcess] = []
+
+        # Worker owning each segment, by segment index
+        self.owners: Dict[int, int] = {}
+        self.pending_splits: List[int] = []
+
+        # Symbols created since the recorder was made are the same in the workers too
+        self.recorder.index_forked_symbols()
+        # Nothing should be half written while forking
+        file_writer.flush()
+
+        context = multiprocessing.get_context("fork")
+
+        for worker, chunk in enumerate(_split_into_chunks(candidates, jobs)):
+            for seg in chunk:
+                self.owners[self.recorder.segment_indexes[id(seg)]] = worker
+
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_worker_main,
+                args=(child_conn, self.recorder, rom_bytes, split_function),
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+
+            self.connections.append(parent_conn)
+            self.processes.append(process)
+
+    @staticmethod
+    def is_supported() -> bool:
+        return "fork" in multiprocessing.get_all_start_methods()
+
+    def owns(self, segment: "Segment") -> bool:
+        return self.recorder.segment_indexes.get(id(segment)) in self.owners
+
+    def receive(self, worker: int) -> ScanProducts:
+        try:
+            message = self.connections[worker].recv()
+        except EOFError:
+            message = ("error", "worker exited unexpectedly")
+
+        if message[0] == "error":
+            self.terminate()
+            details = f":\n{message[1]}" if message[1] else ""
+            log.error(f"Error in split worker {worker}{details}")
+
+        assert message[0] == "split", message
+        # The spans the worker recorded while producing the message
+        trace.add_events(message[2])
+        return message[1]
+
+    def split(self, segment: "Segment"):
+        index = self.recorder.segment_indexes[id(segment)]
+        self.connections[self.owners[index]].send(("split", index))
+        self.pending_splits.append(index)
+
+    def finish_split(self) -> List[ScanProducts]:
+        # Workers answer in the order their splits were requested
+        ret = []
+        for index in self.pending_splits:
+            products = self.receive(self.owners[index])
+            self.recorder.apply(products)
+            ret.append(products)
+        self.pending_splits = []
+        return ret
+
+    def close(self):
+        for conn in self.connections:
+            try:
+                conn.send(("stop",))
+            except OSError:
+                pass
+            conn.close()
+        for process in self.processes:
+            process.join()
+
+    def terminate(self):
+        for process in self.processes:
+            process.terminate()
+
+
+def create_split_pool(
+    recorder: ProductRecorder,
+    candidates: "List[Segment]",
+    jobs: int,
+    rom_bytes: RomBytes,
+    split_function: SplitFunction,
+) -> Optional[SplitPool]:
+    if jobs <= 1 or len(candidates) < 2:
+        return None
+
+    if not SplitPool.is_supported():
+        log.write(
+            "Warning: parallel splitting requires the 'fork' start method, which isn't available on this platform. Splitting serially",
+            status="warn",
+        )
+        return None
+
+    return SplitPool(recorder, candidates, jobs, rom_bytes, split_function)
@@ -0,0 +1,191 @@
+import json
+import mmap
+import struct
+import sys
+from array import array
+from dataclasses import dataclass, field
+from itertools import count
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from . import log, options, rom
+from .. import __version__
+
+MAGIC = b"SPLATDB\0"
+
+# Bump whenever the layout of the database files changes
+SYMBOL_DB_FORMAT_VERSION = 1
+
+# Typecode of the columns holding strings
+STRING_TYPECODE = "I"
+
+# Every section of the file starts at a multiple of this, so the columns are aligned to their items
+ALIGNMENT = 8
+
+
+@dataclass
+class Table:
+    """
+    Rows stored column by column. Every column holds integers of a single array typecode, except for the ones with
+    the "s" typecode, which hold strings stored as indices into `strings`, with 0 meaning None
+    """
+
+    typecodes: Dict[str, str]
+    rows: int = 0
+    columns: Dict[str, "array[int]"] = field(default_factory=dict)
+    strings: List[Optional[str]] = field(default_factory=lambda: [None])
+    string_indices: Dict[Optional[str], int] = field(default_factory=lambda: {None: 0})
+
+    def __post_init__(self):
+        for name, typecode in self.typecodes.items():
+            self.columns.setdefault(
+                name, array(STRING_TYPECODE if typecode == "s" else typecode)
+            )
+
+    def intern(self, strings: List[Optional[str]]) -> Iterable[int]:
+        """
+        Returns the indices of the strings, adding the ones which aren't in the table yet
+        """
+        new = [
+            s
+            for s in dict.fromkeys(strings)
+            if s is not None and s not in self.string_indices
+        ]
+        if "\0" in "".join(new):
+            raise ValueError("Strings of the symbol database can't contain NUL")
+        self.string_indices.update(zip(new, count(len(self.strings))))
+        self.strings.extend(new)
+        return map(self.string_indices.__getitem__, strings)
+
+    def extend(self, columns: Dict[str, List[Any]]):
+        """
+        Adds the values of every column, which must have the same amount of them. Raises OverflowError when a value
+        doesn't fit in its column
+        """
+        rows = {len(values) for values in columns.values()}
+        if len(rows) > 1:
+            raise ValueError("Columns of different lengths")
+
+        for name, typecode in self.typecodes.items():
+            values = columns[name]
+            column = self.columns[name]
+            column.extend(self.intern(values) if typecode == "s" else values)
+        self.rows += rows.pop() if rows else 0
+
+
+def get_path(name: str) -> Path:
+    return options.opts.get_splat_hidden_path() / f"{name}.db"
+
+
+def get_inputs(paths: List[Path]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "path": str(path.resolve()),
+            **(rom.get_file_identity(path) if path.exists() else {"missing": True}),
+        }
+        for path in paths
+    ]
+
+
+def get_key(paths: List[Path], **extra: Any) -> Dict[str, Any]:
+    """
+    Returns what a database compiled from the given files depends on. Anything else the parsing depends on goes in
+    `extra`
+    """
+    return {
+        "format_version": SYMBOL_DB_FORMAT_VERSION,
+        "splat_version": __version__,
+        "byteorder": sys.byteorder,
+        "inputs": get_inputs(paths),
+        **extra,
+    }
+
+
+def align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def load(name: str, key: Dict[str, Any], typecodes: Dict[str, str]) -> Optional[Table]:
+    """
+    Returns the table stored by a previous run, if it was compiled from the same files with the same key
+    """
+    path = get_path(name)
+    if not path.exists():
+        return None
+
+    try:
+        with path.open("rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mapped:
+            return read(mapped, key, typecodes)
+    except Exception:
+        log.write(f"Not able to load {path}. Discarding it", status="warn")
+        return None
+
+
+def read(
+    mapped: mmap.mmap, key: Dict[str, Any], typecodes: Dict[str, str]
+) -> Optional[Table]:
+    if mapped[: len(MAGIC)] != MAGIC:
+        raise ValueError("Not a symbol database")
+
+    (header_size,) = struct.unpack_from("<I", mapped, len(MAGIC))
+    header_start = len(MAGIC) + 4
+    header = json.loads(mapped[header_start : header_start + header_size])
+    if header["key"] != key or header["typecodes"] != typecodes:
+        return None
+
+    table = Table(typecodes, header["rows"])
+
+    view = memoryview(mapped)
+    try:
+        offset = align(header_start + header_size)
+        for column_name, typecode in typecodes.items():
+            column = table.columns[column_name]
+            size = table.rows * column.itemsize
+            # The whole column is copied in one go instead of creating an object per value
+            column.frombytes(view[offset : offset + size])
+            if len(column) != table.rows:
+                raise ValueError(f"Truncated {column_name} column")
+            offset = align(offset + size)
+
+        strings = bytes(view[offset : offset + header["strings_size"]]).decode()
+    finally:
+        view.release()
+
+    if header["string_count"] > 0:
+        table.strings.extend(strings.split("\0"))
+    if len(table.strings) != header["string_count"] + 1:
+        raise ValueError("Mismatched string count")
+    return table
+
+
+def save(name: str, key: Dict[str, Any], table: Table):
+    path = get_path(name)
+    strings = "\0".join(s for s in table.strings[1:] if s is not None).encode()
+    header = json.dumps(
+        {
+            "key": key,
+            "typecodes": table.typecodes,
+            "rows": table.rows,
+            "string_count": len(table.strings) - 1,
+            "strings_size": len(strings),
+        }
+    ).encode()
+
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(".tmp")
+        with temp_path.open("wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            for column in table.columns.values():
+                f.write(b"\0" * (align(f.tell()) - f.tell()))
+                f.write(column.tobytes())
+            f.write(b"\0" * (align(f.tell()) - f.tell()))
+            f.write(strings)
+        temp_path.replace(path)
+    except OSError:
+        # The database only saves time, so a read-only checkout just parses the files every time
+        pass
@@ -1,27 +1,51 @@
-from dataclasses import dataclass
+from bisect import bisect_right
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from operator import attrgetter
 import re
-from typing import Dict, List, Optional, Set, TYPE_CHECKING
+import traceback
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+    TYPE_CHECKING,
+)
 
-import spimdisasm
-
-from intervaltree import IntervalTree
 from ..disassembler import disassembler_instance
 from pathlib import Path
 
 # circular import
 if TYPE_CHECKING:
+    import spimdisasm
+
     from ..segtypes.segment import Segment
 
-from . import log, options, progress_bar
+from . import log, options, progress_bar, symbol_db, trace
+from .range_index import RangeIndex
+
+T = TypeVar("T")
 
 all_symbols: List["Symbol"] = []
 all_symbols_dict: Dict[int, List["Symbol"]] = {}
-all_symbols_ranges = IntervalTree()
+all_symbols_ranges: RangeIndex["Symbol"] = RangeIndex()
 ignored_addresses: Set[int] = set()
 to_mark_as_defined: Set[str] = set()
 
-# Initialize a spimdisasm context, used to store symbols and functions
-spim_context = spimdisasm.common.Context()
+# Symbols created or modified while recording the products of a segment, keyed by id() since a symbol's hash may change
+recorded_symbols: Optional[Dict[int, "RecordedSymbol"]] = None
+
+# The spimdisasm context, used to store symbols and functions. It's only created once something uses it, so
+# importing splat doesn't import spimdisasm
+spim_context: "spimdisasm.common.Context"
+
+# Set by the platform to add its own symbols to the spimdisasm context when it's created
+spim_context_initializer: "Optional[Callable[[spimdisasm.common.Context], None]]" = None
 
 TRUEY_VALS = ["true", "on", "yes", "y"]
 FALSEY_VALS = ["false", "off", "no", "n"]
@@ -29,6 +53,53 @@ FALSEY_VALS = ["false", "off", "no", "n"]
 splat_sym_types = {"func", "jtbl", "jtbl_label", "label"}
 
 ILLEGAL_FILENAME_CHARS = ["<", ">", ":", '"', "/", "\\", "|", "?", "*"]
+ILLEGAL_FILENAME_PATTERN = re.compile(
+    "[" + re.escape("".join(ILLEGAL_FILENAME_CHARS)) + "]"
+)
+
+# Columns of the symbol_addrs database. The segment is an index into the top-level segments plus one, 0 meaning None
+SYMBOL_DB_TYPECODES = {
+    "vram": "Q",
+    "rom": "q",
+    "size": "q",
+    "flags": "H",
+    "segment": "I",
+    "name": "s",
+    "type": "s",
+    "name_end": "s",
+    "filename": "s",
+}
+
+# Bits of the flags column of the symbol_addrs database, the ones after `ignore` being Symbol attributes
+SYMBOL_DB_FLAGS = [
+    "has_rom",
+    "has_size",
+    "ignore",
+    "defined",
+    "extract",
+    "force_migration",
+    "force_not_migration",
+    "allow_addend",
+    "dont_allow_addend",
+    "allow_duplicated",
+]
+get_symbol_db_flags = attrgetter(*SYMBOL_DB_FLAGS[3:])
+
+
+@lru_cache(maxsize=None)
+def pack_flags(flags: Tuple[bool, ...]) -> int:
+    return sum(1 << i for i, flag in enumerate(flags) if flag)
+
+
+# Boolean attributes of the symbol_addrs files which are stored in the Symbol as is
+BOOLEAN_ATTRIBUTES = {
+    "defined",
+    "extract",
+    "force_migration",
+    "force_not_migration",
+    "allow_addend",
+    "dont_allow_addend",
+}
 
 
 def check_valid_type(typename: str) -> bool:
@@ -52,16 +123,50 @@ def is_falsey(str: str) -> bool:
     return str.lower() in FALSEY_VALS
 
 
+def start_recording():
+    global recorded_symbols
+    recorded_symbols = {}
+
+
+def stop_recording() -> List["RecordedSymbol"]:
+    global recorded_symbols
+    assert recorded_symbols is not None
+    ret = list(recorded_symbols.values())
+    recorded_symbols = None
+    return ret
+
+
+def mark_touched(
+    sym: "Symbol", context_sym: "Optional[spimdisasm.common.ContextSymbol]" = None
+):
+    if recorded_symbols is None:
+        return
+
+    recorded = recorded_symbols.get(id(sym))
+    if recorded is None:
+        recorded_symbols[id(sym)] = RecordedSymbol(sym, context_sym)
+    elif context_sym is not None:
+        recorded.context_sym = context_sym
+
+
 def add_symbol(sym: "Symbol"):
+    mark_touched(sym)
     all_symbols.append(sym)
     if sym.vram_start is not None:
         if sym.vram_start not in all_symbols_dict:
             all_symbols_dict[sym.vram_start] = []
         all_symbols_dict[sym.vram_start].append(sym)
 
-    # For larger symbols, add their ranges to interval trees for faster lookup
+    # For larger symbols, add their ranges to a range index for faster lookup
     if sym.size > 4:
-        all_symbols_ranges.addi(sym.vram_start, sym.vram_end, sym)
+        all_symbols_ranges.add(sym.vram_start, sym.vram_end, sym)
+
+
+def ignore_symbol(sym: "Symbol"):
+    if sym.given_size is None or sym.given_size == 0:
+        ignored_addresses.add(sym.vram_start)
+    else:
+        get_spim_context().addBannedSymbolRangeBySize(sym.vram_start, sym.given_size)
 
 
 def to_cname(symbol_name: str) -> str:
@@ -73,28 +178,322 @@ def to_cname(symbol_name: str) -> str:
     return symbol_name
 
 
-def handle_sym_addrs(
-    path: Path, sym_addrs_lines: List[str], all_segments: "List[Segment]"
-):
-    def get_seg_for_name(name: str) -> Optional["Segment"]:
-        for segment in all_segments:
-            if segment.name == name:
-                return segment
-        return None
+class SegmentLookup:
+    """
+    Finds the segment a symbol from the symbol_addrs files belongs to, by name or by rom address. When several
+    segments match, the first one in config order is returned
+    """
 
-    def get_seg_for_rom(rom: int) -> Optional["Segment"]:
+    def __init__(self, all_segments: "List[Segment]"):
+        self.by_name: Dict[str, "Segment"] = {}
         for segment in all_segments:
-            if segment.contains_rom(rom):
-                return segment
-        return None
+            self.by_name.setdefault(segment.name, segment)
+
+        ranges = sorted(
+            (segment.rom_start, segment.rom_end, i, segment)
+            for i, segment in enumerate(all_segments)
+            if segment.rom_start is not None
+            and segment.rom_end is not None
+            and segment.rom_start < segment.rom_end
+        )
+        self.starts: List[int] = [r[0] for r in ranges]
+        self.ranges = ranges
+        # Highest rom_end among the segments starting at or before each one, to know when to stop looking back
+        self.max_ends: List[int] = []
+        for _, rom_end, _, _ in ranges:
+            self.max_ends.append(
+                max(rom_end, self.max_ends[-1] if self.max_ends else 0)
+            )
+
+    def get_by_name(self, name: str) -> Optional["Segment"]:
+        return self.by_name.get(name)
+
+    def get_by_rom(self, rom: int) -> Optional["Segment"]:
+        found: Optional[Tuple[int, "Segment"]] = None
+        i = bisect_right(self.starts, rom) - 1
+        while i >= 0 and self.max_ends[i] > rom:
+            _, rom_end, order, segment = self.ranges[i]
+            if rom < rom_end and (found is None or order < found[0]):
+                found = (order, segment)
+            i -= 1
+        return None if found is None else found[1]
+
 
-    seen_symbols: Dict[str, "Symbol"] = dict()
-    prog_bar = progress_bar.get_progress_bar(sym_addrs_lines)
-    prog_bar.set_description(f"Loading symbols ({path.stem})")
+@dataclass
+class SymAddrsError:
+    path: Path
+    # Zero-indexed
+    line_num: int
     line: str
-    for line_num, line in enumerate(prog_bar):
-        line = line.strip()
-        if not line == "" and not line.startswith("//"):
+    # Written after the line, before the error itself
+    details: List[Any]
+    message: str
+    # Raised while reading the line, in which case it's reported instead of the message
+    exception: Optional[Exception] = None
+
+
+def report_sym_addrs_errors(errors: List[SymAddrsError]):
+    """
+    Writes every error found in the symbol_addrs files and exits on the last one, writing each of them like splat
+    did when it stopped at the first error
+    """
+    for i, error in enumerate(errors):
+        last = i == len(errors) - 1
+        log.parsing_error_preamble(error.path, error.line_num, error.line)
+        for detail in error.details:
+            log.write(detail)
+        if error.exception is not None:
+            if last:
+                raise error.exception
+            e = error.exception
+            traceback.print_exception(type(e), e, e.__traceback__)
+        elif last:
+            log.error(error.message)
+        else:
+            log.write(error.message, status="error")
+
+
+def parse_sym_addrs_attribute(
+    sym: "Symbol", info: str, segment_lookup: SegmentLookup, flags: Dict[str, bool]
+) -> Optional[Tuple[List[Any], str, Optional[Exception]]]:
+    """
+    Applies a single `attr:val` attribute to the symbol, or to `flags` for the ones which aren't stored in it.
+    Returns the details, message and exception of the error if it's not valid
+    """
+    if info.count(":") > 1:
+        return [f"Too many ':'s in '{info}'"], "", None
+
+    attr_name, attr_val = info.split(":")
+    if attr_name == "":
+        return (
+            [f"Missing attribute name in '{info}', is there extra whitespace?"],
+            "",
+            None,
+        )
+    if attr_val == "":
+        return (
+            [f"Missing attribute value in '{info}', is there extra whitespace?"],
+            "",
+            None,
+        )
+
+    # Non-Boolean attributes
+    try:
+        if attr_name == "type":
+            if not check_valid_type(attr_val):
+                return (
+                    [
+                        f"Unrecognized symbol type in '{info}', it should be one of",
+                        [
+                            *splat_sym_types,
+                            *disassembler_instance.get_instance().known_types(),
+                        ],
+                        "You may use a custom type that starts with a capital letter",
+                    ],
+                    "",
+                    None,
+                )
+            sym.type = attr_val
+            return None
+        if attr_name == "size":
+            sym.given_size = int(attr_val, 0)
+            return None
+        if attr_name == "rom":
+            sym.rom = int(attr_val, 0)
+            return None
+        if attr_name == "segment":
+            seg = segment_lookup.get_by_name(attr_val)
+            if seg is None:
+                return [f"Cannot find segment '{attr_val}'"], "", None
+            # Add segment to symbol
+            sym.segment = seg
+            return None
+        if attr_name == "name_end":
+            sym.given_name_end = attr_val
+            return None
+        if attr_name == "filename":
+            sym.given_filename = attr_val
+            return None
+    except Exception as e:
+        return [f"value of attribute '{attr_name}' could not be read:", ""], "", e
+
+    # Boolean attributes
+    if is_truey(attr_val):
+        tf_val = True
+    elif is_falsey(attr_val):
+        tf_val = False
+    else:
+        return (
+            [
+                f"Invalid Boolean value '{attr_val}' for attribute '{attr_name}', should be one of",
+                [*TRUEY_VALS, *FALSEY_VALS],
+            ],
+            "",
+            None,
+        )
+
+    if attr_name in BOOLEAN_ATTRIBUTES:
+        setattr(sym, attr_name, tf_val)
+    elif attr_name == "ignore":
+        flags["ignore"] = tf_val
+    elif attr_name == "allow_duplicated":
+        sym.allow_duplicated = True
+    return None
+
+
+def get_segment_layout(all_segments: "List[Segment]") -> List[List[Any]]:
+    return [
+        [
+            segment.name,
+            segment.rom_start,
+            segment.rom_end,
+            segment.symbol_name_format,
+            segment.symbol_name_format_no_rom,
+        ]
+        for segment in all_segments
+    ]
+
+
+class SymAddrsLoader:
+    """
+    Loads the symbols of one or more symbol_addrs files. Lines with errors are skipped, and every error is reported
+    by finish() so all of them can be fixed at once
+    """
+
+    def __init__(self, all_segments: "List[Segment]"):
+        self.all_segments = all_segments
+        self.segment_lookup = SegmentLookup(all_segments)
+        self.errors: List[SymAddrsError] = []
+        # The loaded and ignored symbols, when compiling the symbol database
+        self.symbols: Optional[List[Symbol]] = None
+        self.ignored: Set[int] = set()
+        self.segment_indices = {
+            id(segment): i for i, segment in enumerate(all_segments)
+        }
+
+    def add_error(
+        self,
+        path: Path,
+        line_num: int,
+        line: str,
+        details: List[Any],
+        message: str,
+        exception: Optional[Exception] = None,
+    ):
+        self.errors.append(
+            SymAddrsError(path, line_num, line, details, message, exception)
+        )
+
+    def record(self, sym: "Symbol", ignore: bool):
+        assert self.symbols is not None
+        self.symbols.append(sym)
+        if ignore:
+            self.ignored.add(id(sym))
+
+    def get_table(self) -> Optional[symbol_db.Table]:
+        if self.symbols is None:
+            return None
+
+        syms = self.symbols
+        indices = self.segment_indices
+        table = symbol_db.Table(SYMBOL_DB_TYPECODES)
+        try:
+            table.extend(
+                {
+                    "vram": [sym.vram_start for sym in syms],
+                    "rom": [sym.rom or 0 for sym in syms],
+                    "size": [sym.given_size or 0 for sym in syms],
+                    "flags": [
+                        pack_flags(
+                            (
+                                sym.rom is not None,
+                                sym.given_size is not None,
+                                id(sym) in self.ignored,
+                            )
+                            + get_symbol_db_flags(sym)
+                        )
+                        for sym in syms
+                    ],
+                    "segment": [
+                        0 if sym.segment is None else indices[id(sym.segment)] + 1
+                        for sym in syms
+                    ],
+                    "name": [sym.given_name for sym in syms],
+                    "type": [sym.type for sym in syms],
+                    "name_end": [sym.given_name_end for sym in syms],
+                    "filename": [sym.given_filename for sym in syms],
+                }
+            )
+        except (OverflowError, ValueError):
+            # Values which don't fit in the database, so the files will be parsed every time
+            return None
+        return table
+
+    def load_table(self, table: symbol_db.Table):
+        """
+        Loads the symbols compiled into the database by a previous run. They were checked when it was compiled and
+        already have their segment, so they're added as they are
+        """
+        strings = table.strings
+        segments: List[Optional["Segment"]] = [None, *self.all_segments]
+        # There are only a few different combinations of flags
+        flag_attrs: Dict[int, Dict[str, Any]] = {}
+
+        new_symbols: List[Symbol] = []
+        for vram, rom, size, flags, segment, name, type, name_end, filename in zip(
+            *table.columns.values()
+        ):
+            attrs = flag_attrs.get(flags)
+            if attrs is None:
+                attrs = flag_attrs[flags] = {
+                    attr: bool(flags & (1 << i))
+                    for i, attr in enumerate(SYMBOL_DB_FLAGS)
+                    if i >= 3
+                }
+            sym = Symbol(
+                vram,
+                given_name=strings[name],
+                given_name_end=strings[name_end],
+                rom=rom if flags & 1 else None,
+                type=strings[type],
+                given_size=size if flags & 2 else None,
+                segment=segments[segment],
+                given_filename=strings[filename],
+                user_declared=True,
+                **attrs,
+            )
+            if flags & 4:
+                ignore_symbol(sym)
+                continue
+
+            if sym.segment:
+                sym.segment.add_symbol(sym)
+
+            # What add_symbol does, using the values from the table
+            new_symbols.append(sym)
+            symbols_at_vram = all_symbols_dict.get(vram)
+            if symbols_at_vram is None:
+                all_symbols_dict[vram] = [sym]
+            else:
+                symbols_at_vram.append(sym)
+            if flags & 2 and size > 4:
+                all_symbols_ranges.add(vram, vram + size, sym)
+
+        all_symbols.extend(new_symbols)
+        if recorded_symbols is not None:
+            for sym in new_symbols:
+                mark_touched(sym)
+
+    def load(self, path: Path, sym_addrs_lines: List[str]):
+        seen_symbols: Dict[str, "Symbol"] = dict()
+        prog_bar = progress_bar.get_progress_bar(sym_addrs_lines)
+        prog_bar.set_description(f"Loading symbols ({path.stem})")
+        line: str
+        for line_num, line in enumerate(prog_bar):
+            line = line.strip()
+            if line == "" or line.startswith("//"):
+                continue
+
             comment_loc = line.find("//")
             line_main = line
             line_ext = ""
@@ -108,190 +507,136 @@ def handle_sym_addrs(
                 line_split = line_main.split("=")
                 name = line_split[0].strip()
                 addr = int(line_split[1].strip()[:-1], 0)
-            except:
-                log.parsing_error_preamble(path, line_num, line)
-                log.write("Line must be of the form")
-                log.write("<function_name> = <address>; // attr0:val0 attr1:val1 [...]")
-                log.write("with <address> in hex preceded by 0x, or dec")
-                log.write("")
-                raise
+            except Exception as e:
+                self.add_error(
+                    path,
+                    line_num,
+                    line,
+                    [
+                        "Line must be of the form",
+                        "<function_name> = <address>; // attr0:val0 attr1:val1 [...]",
+                        "with <address> in hex preceded by 0x, or dec",
+                        "",
+                    ],
+                    "",
+                    e,
+                )
+                continue
 
             sym = Symbol(addr, given_name=name)
 
-            ignore_sym = False
+            flags: Dict[str, bool] = {}
             if line_ext:
+                error = None
                 for info in line_ext.split(" "):
                     if ":" in info:
-                        if info.count(":") > 1:
-                            log.parsing_error_preamble(path, line_num, line)
-                            log.write(f"Too many ':'s in '{info}'")
-                            log.error("")
-
-                        attr_name, attr_val = info.split(":")
-                        if attr_name == "":
-                            log.parsing_error_preamble(path, line_num, line)
-                            log.write(
-                                f"Missing attribute name in '{info}', is there extra whitespace?"
-                            )
-                            log.error("")
-                        if attr_val == "":
-                            log.parsing_error_preamble(path, line_num, line)
-                            log.write(
-                                f"Missing attribute value in '{info}', is there extra whitespace?"
-                            )
-                            log.error("")
-
-                        # Non-Boolean attributes
-                        try:
-                            if attr_name == "type":
-                                if not check_valid_type(attr_val):
-                                    log.parsing_error_preamble(path, line_num, line)
-                                    log.write(
-                                        f"Unrecognized symbol type in '{info}', it should be one of"
-                                    )
-                                    log.write(
-                                        [
-                                            *splat_sym_types,
-                                            *spimdisasm.common.gKnownTypes,
-                                        ]
-                                    )
-                                    log.write(
-                                        "You may use a custom type that starts with a capital letter"
-                                    )
-                                    log.error("")
-                                type = attr_val
-                                sym.type = type
-                                continue
-                            if attr_name == "size":
-                                size = int(attr_val, 0)
-                                sym.given_size = size
-                                continue
-                            if attr_name == "rom":
-                                rom_addr = int(attr_val, 0)
-                                sym.rom = rom_addr
-                                continue
-                            if attr_name == "segment":
-                                seg = get_seg_for_name(attr_val)
-                                if seg is None:
-                                    log.parsing_error_preamble(path, line_num, line)
-                                    log.write(f"Cannot find segment '{attr_val}'")
-                                    log.error("")
-                                else:
-                                    # Add segment to symbol
-                                    sym.segment = seg
-                                continue
-                            if attr_name == "name_end":
-                                sym.given_name_end = attr_val
-                                continue
-                            if attr_name == "filename":
-                                sym.given_filename = attr_val
-                                continue
-                        except:
-                            log.parsing_error_preamble(path, line_num, line)
-                            log.write(
-                                f"value of attribute '{attr_name}' could not be read:"
-                            )
-                            log.write("")
-                            raise
-
-                        # Boolean attributes
-                        tf_val = (
-                            True
-                            if is_truey(attr_val)
-                            else False if is_falsey(attr_val) else None
+                        error = parse_sym_addrs_attribute(
+                            sym, info, self.segment_lookup, flags
                         )
-                        if tf_val is None:
-                            log.parsing_error_preamble(path, line_num, line)
-                            log.write(
-                                f"Invalid Boolean value '{attr_val}' for attribute '{attr_name}', should be one of"
-                            )
-                            log.write([*TRUEY_VALS, *FALSEY_VALS])
-                            log.error("")
-                        else:
-                            if attr_name == "defined":
-                                sym.defined = tf_val
-                                continue
-                            if attr_name == "extract":
-                                sym.extract = tf_val
-                                continue
-                            if attr_name == "ignore":
-                                ignore_sym = tf_val
-                                continue
-                            if attr_name == "force_migration":
-                                sym.force_migration = tf_val
-                                continue
-                            if attr_name == "force_not_migration":
-                                sym.force_not_migration = tf_val
-                                continue
-                            if attr_name == "allow_addend":
-                                sym.allow_addend = tf_val
-                                continue
-                            if attr_name == "dont_allow_addend":
-                                sym.dont_allow_addend = tf_val
-                                continue
-                            if attr_name == "allow_duplicated":
-                                sym.allow_duplicated = True
-                                continue
-
-            if ignore_sym:
-                if sym.given_size is None or sym.given_size == 0:
-                    ignored_addresses.add(sym.vram_start)
-                else:
-                    spim_context.addBannedSymbolRangeBySize(
-                        sym.vram_start, sym.given_size
-                    )
+                        if error is not None:
+                            break
+                if error is not None:
+                    self.add_error(path, line_num, line, *error)
+                    continue
+
+            ignore = flags.get("ignore", False)
+            self.add(path, line_num, line, sym, ignore, seen_symbols)
+
+    def add(
+        self,
+        path: Path,
+        line_num: int,
+        line: str,
+        sym: "Symbol",
+        ignore: bool,
+        seen_symbols: Dict[str, "Symbol"],
+    ):
+        """
+        Checks a parsed symbol against the ones loaded before it and adds it
+        """
+        if ignore:
+            ignore_symbol(sym)
+            if self.symbols is not None:
+                self.record(sym, ignore)
+            return
 
-                continue
+        if sym.segment is None and sym.rom is not None:
+            sym.segment = self.segment_lookup.get_by_rom(sym.rom)
+
+        if sym.name in seen_symbols:
+            item = seen_symbols[sym.name]
+            if not sym.allow_duplicated or not item.allow_duplicated:
+                self.add_error(
+                    path,
+                    line_num,
+                    line,
+                    [],
+                    f"Duplicate symbol detected! {sym.name} has already been defined at vram 0x{item.vram_start:08X}",
+                )
+                return
+
+        addr = sym.vram_start
+        if addr in all_symbols_dict:
+            clash = None
+            for item in all_symbols_dict[addr]:
+                have_same_rom_addresses = sym.rom == item.rom
+                same_segment = sym.segment == item.segment
+
+                if have_same_rom_addresses and same_segment:
+                    if not sym.allow_duplicated or not item.allow_duplicated:
+                        clash = item
+                        break
+            if clash is not None:
+                self.add_error(
+                    path,
+                    line_num,
+                    line,
+                    [],
+                    f"Duplicate symbol detected! {sym.name} clashes with {clash.name} defined at vram 0x{addr:08X}.\n  If this is intended, specify either a segment or a rom address for this symbol",
+                )
+                return
+
+        if len(sym.filename) > 253 or ILLEGAL_FILENAME_PATTERN.search(sym.filename):
+            self.add_error(
+                path,
+                line_num,
+                line,
+                [],
+                # sym.name is written on its own line so reading the error message is nicer because the sym name will be very long.
+                # Other lines have two spaces to make identation nicer and consistent
+                f"Ilegal symbol filename detected!\n"
+                f"  The symbol\n"
+                f"    {sym.name}\n"
+                f"  exceeds the 255 bytes filename limit that most OS imposes or uses illegal characters,\n"
+                f"  which will be a problem when writing the symbol to its own file.\n"
+                f"  To fix this specify a `filename` for this symbol, like `filename:func_{sym.vram_start:08X}`.\n"
+                f"  Make sure the filename does not exceed 253 bytes nor it contains any of the following characters:\n"
+                f"    {ILLEGAL_FILENAME_CHARS}",
+            )
+            return
 
-            if sym.segment is None and sym.rom is not None:
-                sym.segment = get_seg_for_rom(sym.rom)
+        if sym.segment:
+            sym.segment.add_symbol(sym)
 
-            if sym.segment:
-                sym.segment.add_symbol(sym)
+        sym.user_declared = True
 
-            sym.user_declared = True
-
-            if sym.name in seen_symbols:
-                item = seen_symbols[sym.name]
-                if not sym.allow_duplicated or not item.allow_duplicated:
-                    log.parsing_error_preamble(path, line_num, line)
-                    log.error(
-                        f"Duplicate symbol detected! {sym.name} has already been defined at vram 0x{item.vram_start:08X}"
-                    )
-
-            if addr in all_symbols_dict:
-                items = all_symbols_dict[addr]
-                for item in items:
-                    have_same_rom_addresses = sym.rom == item.rom
-                    same_segment = sym.segment == item.segment
-
-                    if have_same_rom_addresses and same_segment:
-                        if not sym.allow_duplicated or not item.allow_duplicated:
-                            log.parsing_error_preamble(path, line_num, line)
-                            log.error(
-                                f"Duplicate symbol detected! {sym.name} clashes with {item.name} defined at vram 0x{addr:08X}.\n  If this is intended, specify either a segment or a rom address for this symbol"
-                            )
+        seen_symbols[sym.name] = sym
 
-            if len(sym.filename) > 253 or any(
-                c in ILLEGAL_FILENAME_CHARS for c in sym.filename
-            ):
-                log.parsing_error_preamble(path, line_num, line)
-                log.error(
-                    # sym.name is written on its own line so reading the error message is nicer because the sym name will be very long.
-                    # Other lines have two spaces to make identation nicer and consistent
-                    f"Ilegal symbol filename detected!\n"
-                    f"  The symbol\n"
-                    f"    {sym.name}\n"
-                    f"  exceeds the 255 bytes filename limit that most OS imposes or uses illegal characters,\n"
-                    f"  which will be a problem when writing the symbol to its own file.\n"
-                    f"  To fix this specify a `filename` for this symbol, like `filename:func_{sym.vram_start:08X}`.\n"
-                    f"  Make sure the filename does not exceed 253 bytes nor it contains any of the following characters:\n"
-                    f"    {ILLEGAL_FILENAME_CHARS}"
-                )
+        add_symbol(sym)
+        if self.symbols is not None:
+            self.record(sym, ignore)
 
-            seen_symbols[sym.name] = sym
+    def finish(self):
+        if self.errors:
+            report_sym_addrs_errors(self.errors)
 
-            add_symbol(sym)
+
+def handle_sym_addrs(
+    path: Path, sym_addrs_lines: List[str], all_segments: "List[Segment]"
+):
+    loader = SymAddrsLoader(all_segments)
+    loader.load(path, sym_addrs_lines)
+    loader.finish()
 
 
 def initialize(all_segments: "List[Segment]"):
@@ -301,14 +646,43 @@ def initialize(all_segments: "List[Segment]"):
 
     all_symbols = []
     all_symbols_dict = {}
-    all_symbols_ranges = IntervalTree()
+    all_symbols_ranges = RangeIndex()
+
+    loader = SymAddrsLoader(all_segments)
+    paths = options.opts.symbol_addrs_paths
+    # The symbols are stored with their segment and already checked for duplicates and bad filenames, which depends
+    # on the segments and the names they give to symbols. Which types are valid depends on the disassembler
+    key = symbol_db.get_key(
+        paths,
+        segments=get_segment_layout(all_segments),
+        symbol_name_format=options.opts.symbol_name_format,
+        symbol_name_format_no_rom=options.opts.symbol_name_format_no_rom,
+        platform=options.opts.platform,
+        disassembler=disassembler_instance.get_instance().get_version(),
+    )
+
+    with trace.span("load_symbol_db"):
+        table = symbol_db.load("symbol_addrs", key, SYMBOL_DB_TYPECODES)
+        if table is not None:
+            loader.load_table(table)
 
-    # Manual list of func name / addrs
-    for path in options.opts.symbol_addrs_paths:
-        if path.exists():
-            with open(path) as f:
-                sym_addrs_lines = f.readlines()
-                handle_sym_addrs(path, sym_addrs_lines, all_segments)
+    if table is None:
+        loader.symbols = []
+
+        # Manual list of func name / addrs
+        for path in paths:
+            if path.exists():
+                with open(path) as f:
+                    sym_addrs_lines = f.readlines()
+                    with trace.span("handle_sym_addrs", path=str(path)):
+                        loader.load(path, sym_addrs_lines)
+
+        # Files with errors are parsed again until they're fixed
+        table = loader.get_table()
+        if table is not None and not loader.errors:
+            symbol_db.save("symbol_addrs", key, table)
+
+    loader.finish()
 
 
 def initialize_spim_context(all_segments: "List[Segment]") -> None:
@@ -316,9 +690,10 @@ def initialize_spim_context(all_segments: "List[Segment]") -> None:
     global_vrom_end = None
     global_vram_start = None
     global_vram_end = None
-    overlay_segments: Set[spimdisasm.common.SymbolsSegment] = set()
+    overlay_segments: "Set[spimdisasm.common.SymbolsSegment]" = set()
 
-    spim_context.bannedSymbols |= ignored_addresses
+    context = get_spim_context()
+    context.bannedSymbols |= ignored_addresses
 
     from ..segtypes.common.code import CommonSegCode
 
@@ -363,7 +738,7 @@ def initialize_spim_context(all_segments: "List[Segment]") -> None:
                 global_vrom_end = segment.rom_end
 
         else:
-            spim_segment = spim_context.addOverlaySegment(
+            spim_segment = context.addOverlaySegment(
                 ram_id,
                 segment.rom_start,
                 segment.rom_end,
@@ -383,7 +758,7 @@ def initialize_spim_context(all_segments: "List[Segment]") -> None:
         and global_vrom_start is not None
         and global_vrom_end is not None
     ):
-        spim_context.changeGlobalSegmentRanges(
+        context.changeGlobalSegmentRanges(
             global_vrom_start, global_vrom_end, global_vram_start, global_vram_end
         )
 
@@ -413,12 +788,12 @@ def initialize_spim_context(all_segments: "List[Segment]") -> None:
 
         for symbols_list in segment.seg_symbols.values():
             for sym in symbols_list:
-                add_symbol_to_spim_segment(spim_context.globalSegment, sym)
+                add_symbol_to_spim_segment(context.globalSegment, sym)
 
 
 def add_symbol_to_spim_segment(
-    segment: spimdisasm.common.SymbolsSegment, sym: "Symbol"
-) -> spimdisasm.common.ContextSymbol:
+    segment: "spimdisasm.common.SymbolsSegment", sym: "Symbol"
+) -> "spimdisasm.common.ContextSymbol":
     if sym.type == "func":
         context_sym = segment.addFunction(
             sym.vram_start, isAutogenerated=not sym.user_declared, vromAddress=sym.rom
@@ -458,7 +833,7 @@ def add_symbol_to_spim_segment(
         context_sym.allowedToReferenceAddends = True
     if sym.dont_allow_addend:
         context_sym.notAllowedToReferenceAddends = True
-    context_sym.setNameGetCallbackIfUnset(lambda _: sym.name)
+    context_sym.setNameGetCallbackIfUnset(sym)
     if sym.given_name_end:
         context_sym.nameEnd = sym.given_name_end
 
@@ -466,8 +841,8 @@ def add_symbol_to_spim_segment(
 
 
 def add_symbol_to_spim_section(
-    section: spimdisasm.mips.sections.SectionBase, sym: "Symbol"
-) -> spimdisasm.common.ContextSymbol:
+    section: "spimdisasm.mips.sections.SectionBase", sym: "Symbol"
+) -> "spimdisasm.common.ContextSymbol":
     if sym.type == "func":
         context_sym = section.addFunction(
             sym.vram_start, isAutogenerated=not sym.user_declared, symbolVrom=sym.rom
@@ -503,7 +878,7 @@ def add_symbol_to_spim_section(
         context_sym.forceMigration = True
     if sym.force_not_migration:
         context_sym.forceNotMigration = True
-    context_sym.setNameGetCallbackIfUnset(lambda _: sym.name)
+    context_sym.setNameGetCallbackIfUnset(sym)
     if sym.given_name_end:
         context_sym.nameEnd = sym.given_name_end
 
@@ -511,8 +886,10 @@ def add_symbol_to_spim_section(
 
 
 def create_symbol_from_spim_symbol(
-    segment: "Segment", context_sym: spimdisasm.common.ContextSymbol
+    segment: "Segment", context_sym: "spimdisasm.common.ContextSymbol"
 ) -> "Symbol":
+    import spimdisasm
+
     in_segment = False
 
     sym_type = None
@@ -543,12 +920,23 @@ def create_symbol_from_spim_symbol(
     sym = segment.create_symbol(
         context_sym.vram, in_segment, type=sym_type, reference=True
     )
+    update_symbol_from_spim_symbol(sym, context_sym)
+    mark_touched(sym, context_sym)
+
+    return sym
 
+
+def update_symbol_from_spim_symbol(
+    sym: "Symbol", context_sym: "spimdisasm.common.ContextSymbol"
+):
+    """
+    Brings the symbol up to date with what spimdisasm found out about it
+    """
     if sym.given_name is None and context_sym.name is not None:
         sym.given_name = context_sym.name
 
     # To keep the symbol name in sync between splat and spimdisasm
-    context_sym.setNameGetCallback(lambda _: sym.name)
+    context_sym.setNameGetCallback(sym)
 
     if context_sym.size is not None:
         sym.given_size = context_sym.getSize()
@@ -559,8 +947,6 @@ def create_symbol_from_spim_symbol(
     if context_sym.referenceCounter > 0:
         sym.referenced = True
 
-    return sym
-
 
 def mark_c_funcs_as_defined():
     for symbol in all_symbols:
@@ -572,6 +958,23 @@ def mark_c_funcs_as_defined():
             to_mark_as_defined.remove(sym_name)
 
 
+def add_slots(cls: Type[T]) -> Type[T]:
+    """
+    Recreates a dataclass with a slot for every field instead of an instance dict, like `dataclass(slots=True)` does
+    on Python 3.10 and later. The defaults are kept by the generated __init__
+    """
+    field_names = tuple(f.name for f in fields(cls))  # type: ignore[arg-type]
+    cls_dict = dict(cls.__dict__)
+    cls_dict["__slots__"] = field_names
+    for name in field_names:
+        cls_dict.pop(name, None)
+    cls_dict.pop("__dict__", None)
+    cls_dict.pop("__weakref__", None)
+    return type(cls.__name__, cls.__bases__, cls_dict)  # type: ignore[return-value]
+
+
+# Projects can have millions of symbols, so they're kept as small as possible
+@add_slots
 @dataclass
 class Symbol:
     vram_start: int
@@ -606,6 +1009,11 @@ class Symbol:
     def __str__(self):
         return self.name
 
+    # The symbol is given to spimdisasm as the callback which names its context symbol, so the names stay in sync
+    # without creating a closure for every symbol
+    def __call__(self, context_sym: "spimdisasm.common.ContextSymbol") -> str:
+        return self.name
+
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, Symbol):
             return False
@@ -697,6 +1105,12 @@ class Symbol:
         return offset >= self.rom and offset < self.rom_end
 
 
+@dataclass
+class RecordedSymbol:
+    symbol: Symbol
+    context_sym: "Optional[spimdisasm.common.ContextSymbol]" = None
+
+
 def get_all_symbols():
     global all_symbols
     return all_symbols
@@ -710,6 +1124,31 @@ def reset_symbols():
     global to_mark_as_defined
     all_symbols = []
     all_symbols_dict = {}
-    all_symbols_ranges = IntervalTree()
+    all_symbols_ranges = RangeIndex()
     ignored_addresses = set()
     to_mark_as_defined = set()
+
+
+def get_spim_context() -> "spimdisasm.common.Context":
+    global spim_context
+    if "spim_context" not in globals():
+        import spimdisasm
+
+        # Nothing is disassembled without the context, so it's also when the disassembler gets configured
+        disassembler_instance.configure_instance()
+        spim_context = spimdisasm.common.Context()
+        if spim_context_initializer is not None:
+            spim_context_initializer(spim_context)
+    return spim_context
+
+
+def __getattr__(name: str) -> Any:
+    # Creates the spimdisasm context the first time `symbols.spim_context` is used
+    if name == "spim_context":
+        return get_spim_context()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def reset_spim_context():
+    # A new context is created the next time it's used
+    globals().pop("spim_context", None)
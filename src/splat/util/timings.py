@@ -0,0 +1,170 @@
+import json
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List
+
+from . import log, memory, trace
+
+# circular import
+if TYPE_CHECKING:
+    from ..segtypes.segment import Segment
+
+TIMINGS_FILENAME = "timings.json"
+
+
+@dataclass
+class PhaseTiming:
+    name: str
+    wall: float = 0.0
+    cpu: float = 0.0
+
+
+@dataclass
+class SegmentTiming:
+    segment: str
+    name: str
+    type: str
+    action: str
+    wall: float = 0.0
+    cpu: float = 0.0
+    # Time spent in the segment itself, without its timed subsegments
+    self_wall: float = 0.0
+    self_cpu: float = 0.0
+
+
+@dataclass
+class _Frame:
+    wall: float
+    cpu: float
+    children_wall: float = 0.0
+    children_cpu: float = 0.0
+
+
+@dataclass
+class _State:
+    phases: List[PhaseTiming] = field(default_factory=list)
+    segments: List[SegmentTiming] = field(default_factory=list)
+    stack: List[_Frame] = field(default_factory=list)
+
+
+enabled = False
+_state = _State()
+
+
+def initialize(enable: bool):
+    global enabled
+    global _state
+
+    enabled = enable
+    _state = _State()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Times a step of the whole run. The cpu time includes every thread of the process, like the file writers.
+    The memory usage is sampled once it's done.
+    Phases are timed even when disabled, since they are few and the run's history keeps them
+    """
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    try:
+        with trace.span(name):
+            yield
+    finally:
+        _state.phases.append(
+            PhaseTiming(name, time.perf_counter() - wall, time.process_time() - cpu)
+        )
+    memory.sample(name)
+
+
+@contextmanager
+def segment(seg: "Segment", action: str) -> Iterator[None]:
+    """
+    Times the scan or split of a segment. The cpu time only counts the calling thread, so files written in the
+    background aren't charged to whichever segment happens to be running
+    """
+    span = trace.span(f"{action} {seg.name}", type=seg.type, segment=seg.unique_id())
+    if not enabled:
+        with span:
+            yield
+        return
+
+    frame = _Frame(time.perf_counter(), time.thread_time())
+    _state.stack.append(frame)
+    try:
+        with span:
+            yield
+    finally:
+        _state.stack.pop()
+        wall = time.perf_counter() - frame.wall
+        cpu = time.thread_time() - frame.cpu
+
+        if _state.stack:
+            _state.stack[-1].children_wall += wall
+            _state.stack[-1].children_cpu += cpu
+
+        _state.segments.append(
+            SegmentTiming(
+                seg.unique_id(),
+                seg.name,
+                seg.type,
+                action,
+                wall,
+                cpu,
+                wall - frame.children_wall,
+                cpu - frame.children_cpu,
+            )
+        )
+
+
+def get_phase_walls() -> Dict[str, float]:
+    ret: Dict[str, float] = {}
+    for timing in _state.phases:
+        ret[timing.name] = ret.get(timing.name, 0.0) + timing.wall
+    return ret
+
+
+def get_type_totals() -> Dict[str, PhaseTiming]:
+    # Self times, so groups and their subsegments aren't counted twice
+    ret: Dict[str, PhaseTiming] = {}
+    for timing in _state.segments:
+        if timing.type not in ret:
+            ret[timing.type] = PhaseTiming(timing.type)
+        ret[timing.type].wall += timing.self_wall
+        ret[timing.type].cpu += timing.self_cpu
+    return ret
+
+
+def print_report(top: int):
+    log.write("Timings (wall / cpu):")
+    for timing in _state.phases:
+        log.write(f"{timing.name:>30}: {timing.wall:9.3f}s / {timing.cpu:9.3f}s")
+
+    log.write("By segment type:")
+    for timing in sorted(get_type_totals().values(), key=lambda t: -t.wall):
+        log.write(f"{timing.name:>30}: {timing.wall:9.3f}s / {timing.cpu:9.3f}s")
+
+    log.write(f"Slowest {top} segments:")
+    slowest = sorted(_state.segments, key=lambda t: -t.wall)[:top]
+    for seg_timing in slowest:
+        description = f"{seg_timing.action} {seg_timing.type} {seg_timing.name}"
+        log.write(
+            f"{description:>30}: {seg_timing.wall:9.3f}s / {seg_timing.cpu:9.3f}s"
+        )
+
+
+def write_report(path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w") as f:
+        json.dump(
+            {
+                "phases": [asdict(t) for t in _state.phases],
+                "types": [asdict(t) for t in get_type_totals().values()],
+                "segments": [asdict(t) for t in _state.segments],
+            },
+            f,
+            indent=2,
+        )
@@ -0,0 +1,140 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Tuple, TypeVar
+
+# Chrome trace event format, readable by chrome://tracing and https://ui.perfetto.dev
+
+Event = Dict[str, Any]
+# Process and thread names, by (pid, tid)
+ThreadNames = Dict[Tuple[int, int], Tuple[str, str]]
+
+enabled = False
+process_name = "splat"
+_events: List[Event] = []
+_thread_names: ThreadNames = {}
+# The file writer threads record events too
+_lock = threading.Lock()
+
+
+def initialize(enable: bool):
+    global enabled
+
+    enabled = enable
+    _events.clear()
+    _thread_names.clear()
+
+
+def _reset_after_fork():
+    # Worker processes only send back the events they record themselves
+    _events.clear()
+    _thread_names.clear()
+
+
+# Windows has no fork, so there is nothing to reset there
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+@contextmanager
+def span(name: str, **args: Any) -> Iterator[None]:
+    """
+    Records the time taken by the block, nested inside the spans that are open in the same thread
+    """
+    if not enabled:
+        yield
+        return
+
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        end = time.perf_counter_ns()
+
+        pid = os.getpid()
+        tid = threading.get_native_id()
+
+        event: Event = {
+            "name": name,
+            "ph": "X",
+            "ts": start / 1000,
+            "dur": (end - start) / 1000,
+            "pid": pid,
+            "tid": tid,
+        }
+        if args:
+            event["args"] = args
+
+        with _lock:
+            _events.append(event)
+            if (pid, tid) not in _thread_names:
+                _thread_names[(pid, tid)] = (
+                    process_name,
+                    threading.current_thread().name,
+                )
+
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """
+    Records every call of the decorated function as a span
+    """
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def take_events() -> Tuple[List[Event], ThreadNames]:
+    """
+    Returns and forgets the events recorded so far, to send them to another process
+    """
+    with _lock:
+        ret = (list(_events), dict(_thread_names))
+        _events.clear()
+        _thread_names.clear()
+    return ret
+
+
+def add_events(events: Tuple[List[Event], ThreadNames]):
+    _events.extend(events[0])
+    _thread_names.update(events[1])
+
+
+def write(path: Path):
+    metadata: List[Event] = []
+    for (pid, tid), (process, thread) in sorted(_thread_names.items()):
+        metadata.append(
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": process},
+            }
+        )
+        metadata.append(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": thread},
+            }
+        )
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w") as f:
+        json.dump({"traceEvents": metadata + _events}, f)
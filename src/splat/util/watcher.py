@@ -0,0 +1,43 @@
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .rom import get_file_identity
+
+# How often the watched files are checked, in seconds
+POLL_INTERVAL = 0.25
+
+FileStates = Dict[Path, Optional[Dict[str, int]]]
+
+
+def get_file_states(paths: Iterable[Path]) -> FileStates:
+    ret: FileStates = {}
+    for path in paths:
+        try:
+            ret[path] = get_file_identity(path)
+        except OSError:
+            ret[path] = None
+    return ret
+
+
+def wait_for_changes(paths: Iterable[Path]) -> List[Path]:
+    """
+    Blocks until any of the given files is modified, created or deleted, and returns the ones that changed
+    """
+    initial = get_file_states(paths)
+
+    while True:
+        time.sleep(POLL_INTERVAL)
+        current = get_file_states(initial.keys())
+        if current != initial:
+            break
+
+    # Editors and build tools often write a file in several steps, wait until they are done
+    while True:
+        time.sleep(POLL_INTERVAL)
+        settled = get_file_states(initial.keys())
+        if settled == current:
+            break
+        current = settled
+
+    return [path for path in initial if current[path] != initial[path]]
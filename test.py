@@ -12,6 +12,11 @@ from src.splat.segtypes.common.rodata import CommonSegRodata
 from src.splat.segtypes.common.code import CommonSegCode
 from src.splat.segtypes.common.c import CommonSegC
 from src.splat.segtypes.common.bss import CommonSegBss
+from src.splat.segtypes.common.bin import CommonSegBin
+from src.splat.util.scan_products import ProductRecorder
+from src.splat.util import file_writer
+from src.splat.util.scheduler import SplitScheduler, is_symbol_source
+from src.splat.util import rom
 from src.splat import __version__
 import difflib
 
@@ -53,7 +58,10 @@ class Testing(unittest.TestCase):
         spimdisasm.common.GlobalConfig.ASM_GENERATED_BY = False
         main(["test/basic_app/splat.yaml"], None, False)
 
-        comparison = filecmp.dircmp("test/basic_app/split", "test/basic_app/expected")
+        # The cache is a database, which isn't written byte for byte the same every time
+        comparison = filecmp.dircmp(
+            "test/basic_app/split", "test/basic_app/expected", ignore=[".splache"]
+        )
 
         diff_files: List[Tuple[str, str, str]] = []
         self.get_diff_files(comparison, diff_files)
@@ -74,9 +82,6 @@ class Testing(unittest.TestCase):
 
         # if the files are different print out the difference
         for file in diff_files:
-            # can't diff binary
-            if file[0] == ".splache":
-                continue
             with open(f"{file[1]}/{file[0]}") as file1:
                 file1_lines = file1.readlines()
             with open(f"{file[2]}/{file[0]}") as file2:
@@ -124,6 +129,17 @@ def test_init():
     options.initialize(options_dict, ["./test/basic_app/splat.yaml"], [], False)
 
 
+def get_split_outputs(work_dir) -> Dict[str, bytes]:
+    # Every split file and symbol dump, but not the run's own bookkeeping like its cache and history
+    paths = list((work_dir / "split").rglob("*"))
+    paths += (work_dir / ".splat").glob("*.csv")
+    return {
+        str(path.relative_to(work_dir)): path.read_bytes()
+        for path in paths
+        if path.is_file() and path.name != ".splache"
+    }
+
+
 class Symbols(unittest.TestCase):
     def test_check_valid_type(self):
         options.opts.platform = "n64"
@@ -175,6 +191,18 @@ class Symbols(unittest.TestCase):
         assert sym.user_declared == result.isUserDeclared
         assert sym.defined == result.isDefined
 
+    def test_symbol_slots(self):
+        sym = symbols.Symbol(0x40000000, given_name="func_1", type="func")
+        assert not hasattr(sym, "__dict__")
+        with self.assertRaises(AttributeError):
+            sym.not_a_field = True  # type: ignore[attr-defined]
+
+        # The symbol itself names its context symbol
+        context = spimdisasm.common.Context()
+        context_sym = symbols.add_symbol_to_spim_segment(context.globalSegment, sym)
+        sym.given_name = "renamed"
+        assert context_sym.getName() == "renamed"
+
     def test_add_symbol_to_spim_section(self):
         section = spimdisasm.mips.sections.SectionBase(
             context=spimdisasm.common.Context(),
@@ -430,6 +458,173 @@ class SymbolsInitialize(unittest.TestCase):
         assert symbols.spim_context.bannedRangedSymbols[0].start == 0x100
         assert symbols.spim_context.bannedRangedSymbols[0].end == 0x100 + 4
 
+    def test_every_error_is_reported(self):
+        import contextlib
+        import pathlib
+
+        symbols.reset_symbols()
+        test_init()
+
+        sym_addrs_lines = [
+            "func_1 = 0x100;",
+            "func_2 = 0x104",
+            "func_1 = 0x108;",
+            "func_3 = 0x10C; // type:func",
+            "func_4 = 0x110; // size",
+            "func_5 = 0x114; // segment:missing",
+        ]
+
+        loader = symbols.SymAddrsLoader([])
+        loader.load(pathlib.Path("/tmp/thing"), sym_addrs_lines)
+        assert [error.line_num for error in loader.errors] == [1, 2, 5]
+        assert loader.errors[1].message.startswith("Duplicate symbol detected!")
+        assert loader.errors[2].details == ["Cannot find segment 'missing'"]
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            with self.assertRaises(SystemExit):
+                loader.finish()
+        assert output.getvalue().count("error reading /tmp/thing") == 3
+
+        # The valid lines are still loaded
+        assert [sym.name for sym in symbols.all_symbols] == [
+            "func_1",
+            "func_3",
+            "func_4",
+        ]
+        assert len(symbols.all_symbols_ranges) == 0
+
+    def test_error_messages(self):
+        import contextlib
+        import pathlib
+        import re
+
+        symbols.reset_symbols()
+        test_init()
+
+        loader = symbols.SymAddrsLoader([])
+        loader.load(
+            pathlib.Path("/tmp/thing"),
+            [
+                "func_1 = 0x100",
+                "func_2 = 0x104; // defined:maybe",
+                "func_3 = 0x108; // size:big",
+            ],
+        )
+
+        output = io.StringIO()
+        errors = io.StringIO()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(errors):
+            # Lines which can't be read raise their exception, like when splat stopped at the first error
+            with self.assertRaises(ValueError):
+                loader.finish()
+
+        # Each error is written the same way it was when it was the only one reported
+        assert re.sub(r"\x1b\[[0-9;]*m", "", output.getvalue()) == (
+            "\n"
+            "error reading /tmp/thing, line 1:\n"
+            "\tfunc_1 = 0x100\n"
+            "Line must be of the form\n"
+            "<function_name> = <address>; // attr0:val0 attr1:val1 [...]\n"
+            "with <address> in hex preceded by 0x, or dec\n"
+            "\n"
+            "\n"
+            "error reading /tmp/thing, line 2:\n"
+            "\tfunc_2 = 0x104; // defined:maybe\n"
+            "Invalid Boolean value 'maybe' for attribute 'defined', should be one of\n"
+            "['true', 'on', 'yes', 'y', 'false', 'off', 'no', 'n']\n"
+            "\n"
+            "\n"
+            "error reading /tmp/thing, line 3:\n"
+            "\tfunc_3 = 0x108; // size:big\n"
+            "value of attribute 'size' could not be read:\n"
+            "\n"
+        )
+        assert errors.getvalue().endswith(
+            "AssertionError: Line must contain a single semi-colon\n"
+        )
+
+    def test_segment_lookup(self):
+        all_segments = [
+            Segment(
+                rom_start=start,
+                rom_end=end,
+                type="bin",
+                name=name,
+                vram_start=0x300,
+                args=[],
+                yaml={},
+            )
+            for start, end, name in [
+                (0x100, 0x200, "first"),
+                (0x000, 0x400, "whole"),
+                (0x180, 0x280, "first"),
+                (0x300, 0x300, "empty"),
+            ]
+        ]
+
+        lookup = symbols.SegmentLookup(all_segments)
+        assert lookup.get_by_name("first") is all_segments[0]
+        assert lookup.get_by_name("missing") is None
+        assert lookup.get_by_rom(0x50) is all_segments[1]
+        # The first segment in the config wins, like when they were looked up one by one
+        assert lookup.get_by_rom(0x1A0) is all_segments[0]
+        assert lookup.get_by_rom(0x240) is all_segments[1]
+        assert lookup.get_by_rom(0x300) is all_segments[1]
+        assert lookup.get_by_rom(0x400) is None
+
+
+class SegmentVisibility(unittest.TestCase):
+    def make_segment(self, name: str, ram_id=None) -> Segment:
+        segment = Segment(
+            rom_start=0x100,
+            rom_end=0x200,
+            type="bin",
+            name=name,
+            vram_start=0x300,
+            args=[],
+            yaml={},
+        )
+        segment.exclusive_ram_id = ram_id
+        return segment
+
+    def test_most_parent(self):
+        child = self.make_segment("child")
+        group = self.make_segment("group")
+        child.parent = group
+        assert child.get_most_parent() is group
+
+        # Nested groups get their parent after their own subsegments are parsed
+        top = self.make_segment("top", "overlay")
+        group.parent = top
+        assert child.get_most_parent() is top
+        assert child.get_exclusive_ram_id() == "overlay"
+
+    def test_retrieve_symbol(self):
+        overlay_a = self.make_segment("overlay_a", "overlay")
+        overlay_b = self.make_segment("overlay_b", "overlay")
+        other = self.make_segment("other", "other_overlay")
+        main = self.make_segment("main")
+        sub_b = self.make_segment("sub_b")
+        sub_b.parent = overlay_b
+
+        sym_a = symbols.Symbol(0x300, type="Gfx", segment=overlay_a)
+        sym_b = symbols.Symbol(0x300, type="Vtx", segment=sub_b)
+        syms = {0x300: [sym_a, sym_b]}
+
+        assert main.retrieve_symbol(syms, 0x300) is sym_a
+        assert other.retrieve_symbol(syms, 0x300) is sym_a
+        assert overlay_a.retrieve_symbol(syms, 0x300) is sym_a
+        # Segments sharing an exclusive_ram_id can't see each other's symbols
+        assert overlay_b.retrieve_symbol(syms, 0x300) is sym_b
+        assert sub_b.retrieve_symbol({0x300: [sym_a]}, 0x300) is None
+        assert main.retrieve_symbol(syms, 0x304) is None
+
+        assert main.retrieve_sym_type(syms, 0x300, "Vtx") is sym_b
+        assert overlay_a.retrieve_sym_type(syms, 0x300, "Vtx") is None
+        assert overlay_b.retrieve_sym_type(syms, 0x300, "Gfx") is None
+        assert sub_b.retrieve_sym_type(syms, 0x300, "Vtx") is sym_b
+
 
 class InitializeSpimContext(unittest.TestCase):
     def test_overlay(self):
@@ -514,5 +709,1089 @@ class InitializeSpimContext(unittest.TestCase):
         assert symbols.spim_context.globalSegment.vramEnd == 0x380
 
 
+class ScanProducts(unittest.TestCase):
+    def test_record_and_apply(self):
+        symbols.reset_symbols()
+        test_init()
+
+        segment = Segment(
+            rom_start=0x100,
+            rom_end=0x200,
+            type="func",
+            name="test_segment",
+            vram_start=0x300,
+            args=[],
+            yaml={},
+        )
+
+        def scan():
+            sym = segment.create_symbol(0x310, True, type="func", define=True)
+            sym.given_size = 0x20
+            segment.create_symbol(0x800, False, reference=True)
+            symbols.to_mark_as_defined.add("func_00000310")
+            segment.warnings.append("a warning")
+
+        products = ProductRecorder([segment]).record(segment, "scan", scan)
+        assert len(products.symbols) == 2
+
+        # Apply the products on a fresh state, as another process would
+        symbols.reset_symbols()
+        segment.given_seg_symbols = {}
+        segment.warnings = []
+        ProductRecorder([segment]).apply(products)
+
+        assert len(symbols.all_symbols) == 2
+        func = symbols.all_symbols_dict[0x310][0]
+        assert func.type == "func"
+        assert func.defined
+        assert func.given_size == 0x20
+        assert func.segment == segment
+        assert segment.seg_symbols[0x310] == [func]
+
+        assert symbols.all_symbols_dict[0x800][0].referenced
+        assert 0x800 not in segment.seg_symbols
+        assert symbols.to_mark_as_defined == {"func_00000310"}
+        assert segment.warnings == ["a warning"]
+
+    def test_cache_replay(self):
+        import pathlib
+        import tempfile
+
+        symbols.reset_symbols()
+        test_init()
+
+        segment = Segment(
+            rom_start=0x100,
+            rom_end=0x200,
+            type="func",
+            name="test_segment",
+            vram_start=0x300,
+            args=[],
+            yaml={"name": "test_segment"},
+        )
+
+        def scan():
+            segment.create_symbol(0x310, True, type="func", define=True)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            options.opts.cache_path = pathlib.Path(tmp) / ".splache"
+
+            cache = cache_handler.Cache(True, False)
+            cache.set_recorder(ProductRecorder([segment]))
+            assert not cache.check_cache_hit(segment, False)
+            cache.record(segment, "scan", scan)
+            assert not cache.check_cache_hit(segment, True)
+            cache.save(False)
+
+            # The next run skips the scan but still gets its symbols
+            symbols.reset_symbols()
+            segment.given_seg_symbols = {}
+            cache = cache_handler.Cache(True, False)
+            cache.set_recorder(ProductRecorder([segment]))
+            assert cache.check_cache_hit(segment, False)
+            assert cache.replay(segment, "scan") is not None
+
+            func = symbols.all_symbols_dict[0x310][0]
+            assert func.type == "func"
+            assert func.defined
+            assert segment.seg_symbols[0x310] == [func]
+            cache.save(False)
+
+    def test_cache_new_symbol_at_auto_named_address(self):
+        import pathlib
+        import re
+        import shutil
+        import sys
+        import tempfile
+
+        sys.path.insert(0, "test/benchmark")
+        import benchmark
+        import generate_rom
+
+        self.addCleanup(symbols.reset_spim_context)
+        self.addCleanup(symbols.reset_symbols)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cached_dir = pathlib.Path(tmp) / "cached"
+            config_path = generate_rom.generate(
+                cached_dir, generate_rom.Scale(code=8, overlays=4)
+            )
+            benchmark.run_split(config_path, 1)
+
+            # An auto-named function which some other function calls
+            calls = set()
+            for path in (cached_dir / "split" / "asm").rglob("*.s"):
+                calls.update(re.findall(r"jal\s+func_([0-9A-F]{8})", path.read_text()))
+            address = min(calls)
+
+            # Both runs start from the same split files, since the C files written by the first one change what
+            # gets scanned. Without its cache, the copy scans and splits everything again
+            fresh_dir = pathlib.Path(tmp) / "fresh"
+            shutil.copytree(cached_dir, fresh_dir)
+            (fresh_dir / "split" / ".splache").unlink()
+
+            for work_dir in (cached_dir, fresh_dir):
+                with (work_dir / "symbol_addrs.txt").open("a") as f:
+                    f.write(f"named_new = 0x{address}; // type:func\n")
+                benchmark.run_split(work_dir / config_path.name, 1)
+
+            cached = get_split_outputs(cached_dir)
+            fresh = get_split_outputs(fresh_dir)
+
+        assert any(b"jal        named_new" in content for content in fresh.values())
+        assert sorted(cached) == sorted(fresh)
+        for name, content in fresh.items():
+            assert cached[name] == content, name
+
+    def test_cache_discards_old_format(self):
+        import pathlib
+        import pickle
+        import tempfile
+
+        test_init()
+
+        segment = Segment(
+            rom_start=0x100,
+            rom_end=0x200,
+            type="bin",
+            name="test_segment",
+            vram_start=0x300,
+            args=[],
+            yaml={"name": "test_segment"},
+        )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            options.opts.cache_path = pathlib.Path(tmp) / ".splache"
+            # Caches used to be a single pickled dict
+            options.opts.cache_path.write_bytes(
+                pickle.dumps({segment.unique_id(): segment.cache()})
+            )
+
+            cache = cache_handler.Cache(True, False)
+            cache.set_recorder(ProductRecorder([segment]))
+            cache.record(segment, "scan", lambda: segment.scan(b""))
+            assert not cache.check_cache_hit(segment, True)
+            cache.save(False)
+
+            cache = cache_handler.Cache(True, False)
+            assert cache.check_cache_hit(segment, False)
+            cache.save(False)
+
+    def test_cache_options(self):
+        import pathlib
+
+        test_init()
+
+        bin_segment = CommonSegBin(
+            rom_start=0x100,
+            rom_end=0x200,
+            type="bin",
+            name="test_bin",
+            vram_start=None,
+            args=[],
+            yaml={"name": "test_bin"},
+        )
+        code_segment = Segment(
+            rom_start=0x200,
+            rom_end=0x300,
+            type="asm",
+            name="test_asm",
+            vram_start=0x300,
+            args=[],
+            yaml={"name": "test_asm"},
+        )
+
+        cache = cache_handler.Cache(False, False)
+        bin_key = cache.get_key(bin_segment)
+        code_key = cache.get_key(code_segment)
+
+        # Linker script options don't affect any segment
+        options.opts.ld_legacy_generation = not options.opts.ld_legacy_generation
+        assert cache.get_key(bin_segment) == bin_key
+        assert cache.get_key(code_segment) == code_key
+
+        options.opts.mnemonic_ljust += 1
+        assert cache.get_key(bin_segment) == bin_key
+        assert cache.get_key(code_segment) != code_key
+
+        options.opts.asset_path = pathlib.Path("other")
+        assert cache.get_key(bin_segment) != bin_key
+
+    def test_symbol_digests(self):
+        test_init()
+
+        def make_segment(name: str, start: int, vram: int):
+            return Segment(
+                rom_start=start,
+                rom_end=start + 0x100,
+                type="asm",
+                name=name,
+                vram_start=vram,
+                args=[],
+                yaml={"name": name},
+            )
+
+        segment_a = make_segment("a", 0x100, 0x400)
+        segment_b = make_segment("b", 0x200, 0x500)
+        func = symbols.Symbol(0x410, given_name="func", rom=0x110, segment=segment_a)
+        reloc = relocs.Reloc(0x210, "MIPS_HI16", "func")
+
+        digests = cache_handler.SymbolDigests([func], {reloc.rom_address: reloc})
+        digest_a = digests.get_segment_digest(segment_a)
+        digest_b = digests.get_segment_digest(segment_b)
+        address_digest = digests.get_address_digest(0x410)
+
+        func.given_name = "renamed"
+        digests = cache_handler.SymbolDigests([func], {reloc.rom_address: reloc})
+
+        # Only the segment defining the symbol changes, the ones referencing it check the address digest
+        assert digests.get_segment_digest(segment_a) != digest_a
+        assert digests.get_segment_digest(segment_b) == digest_b
+        assert digests.get_address_digest(0x410) != address_digest
+
+        reloc.addend = 4
+        digests = cache_handler.SymbolDigests([func], {reloc.rom_address: reloc})
+        assert digests.get_segment_digest(segment_b) != digest_b
+
+
+class FileWriter(unittest.TestCase):
+    def test_write_in_order(self):
+        import pathlib
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as tmp:
+            file_writer.initialize(4)
+            for i in range(100):
+                file_writer.write_text(pathlib.Path(tmp) / "dir" / f"{i}.s", str(i))
+            # Later writes to the same path win
+            file_writer.write_bytes(pathlib.Path(tmp) / "file.bin", b"first")
+            file_writer.write_bytes(pathlib.Path(tmp) / "file.bin", b"second")
+            file_writer.shutdown()
+
+            for i in range(100):
+                assert (pathlib.Path(tmp) / "dir" / f"{i}.s").read_text() == str(i)
+            assert (pathlib.Path(tmp) / "file.bin").read_bytes() == b"second"
+
+            file_writer.initialize(1)
+
+
+class Scheduler(unittest.TestCase):
+    def test_overlays_split_early(self):
+        symbols.reset_symbols()
+        test_init()
+
+        def make_code(name: str, start: int, vram: int, ram_id: Optional[str]):
+            segment = CommonSegCode(
+                rom_start=start,
+                rom_end=start + 0x100,
+                type="code",
+                name=name,
+                vram_start=vram,
+                args=[],
+                yaml={
+                    "name": name,
+                    "type": "code",
+                    "start": start,
+                    "vram": vram,
+                    "subsegments": [[start, "asm", name]],
+                },
+            )
+            segment.exclusive_ram_id = ram_id
+            return segment
+
+        main = make_code("main", 0x0, 0x80000400, None)
+        ovl_a = make_code("ovl_a", 0x100, 0x80100000, "ovl")
+        ovl_b = make_code("ovl_b", 0x200, 0x80100000, "ovl")
+        all_segments: List[Segment] = [main, ovl_a, ovl_b]
+
+        scheduler = SplitScheduler(all_segments, all_segments)
+        assert scheduler.pop_ready() == []
+
+        scheduler.mark_scanned(main)
+        assert scheduler.pop_ready() == []
+
+        # Overlays sharing an exclusive_ram_id don't wait for each other
+        scheduler.mark_scanned(ovl_a)
+        assert scheduler.pop_ready() == [ovl_a]
+
+        # main may be referenced by any segment, so it waits for every scan
+        assert not scheduler.all_scanned()
+        scheduler.mark_scanned(ovl_b)
+        assert scheduler.all_scanned()
+        assert scheduler.pop_ready() == [main, ovl_b]
+
+    def test_pipeline_with_cache(self):
+        import pathlib
+        import shutil
+        import sys
+        import tempfile
+
+        sys.path.insert(0, "test/benchmark")
+        import benchmark
+        import generate_rom
+
+        self.addCleanup(symbols.reset_spim_context)
+        self.addCleanup(symbols.reset_symbols)
+
+        # The scans and splits of the pipelined runs taken from the cache, in order
+        replayed: List[Tuple[Segment, str]] = []
+        original_replay = cache_handler.Cache.replay
+
+        def replay(cache, segment, phase):
+            replayed.append((segment, phase))
+            return original_replay(cache, segment, phase)
+
+        self.addCleanup(setattr, cache_handler.Cache, "replay", original_replay)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            serial_dir = pathlib.Path(tmp) / "serial"
+            config_path = generate_rom.generate(
+                serial_dir, generate_rom.Scale(code=8, overlays=4)
+            )
+            benchmark.run_split(config_path, 1)
+
+            pipeline_dir = pathlib.Path(tmp) / "pipeline"
+            shutil.copytree(serial_dir, pipeline_dir)
+
+            # The C files the first run wrote change what the C segments scan, so only some segments are taken
+            # from the cache the first time, and all of them the second time
+            for _ in range(2):
+                benchmark.run_split(config_path, 1)
+
+                replayed.clear()
+                cache_handler.Cache.replay = replay  # type: ignore[method-assign]
+                benchmark.run_split(pipeline_dir / config_path.name, 1, pipeline=True)
+                cache_handler.Cache.replay = original_replay  # type: ignore[method-assign]
+
+                serial = get_split_outputs(serial_dir)
+                pipelined = get_split_outputs(pipeline_dir)
+                assert "split/undefined_funcs_auto.txt" in serial
+                assert sorted(pipelined) == sorted(serial)
+                for name, content in serial.items():
+                    assert pipelined[name] == content, name
+
+        # Cached segments are split after their scan is replayed, and the symbol sources any segment can reference
+        # only once every scan is
+        assert replayed
+        scans = [
+            i
+            for i, (segment, phase) in enumerate(replayed)
+            if phase == "scan" and is_symbol_source(segment)
+        ]
+        for i, (segment, phase) in enumerate(replayed):
+            if phase != "split" or not segment.should_scan():
+                continue
+            assert (segment, "scan") in replayed[:i], segment.name
+            if is_symbol_source(segment) and segment.get_exclusive_ram_id() is None:
+                assert i > scans[-1], segment.name
+
+
+class Selection(unittest.TestCase):
+    def test_closure(self):
+        from src.splat.util.selection import Selection
+
+        symbols.reset_symbols()
+        test_init()
+
+        def make_code(
+            name: str, start: int, vram: int, ram_id: Optional[str], subsegments=None
+        ):
+            segment = CommonSegCode(
+                rom_start=start,
+                rom_end=start + 0x100,
+                type="code",
+                name=name,
+                vram_start=vram,
+                args=[],
+                yaml={
+                    "name": name,
+                    "type": "code",
+                    "start": start,
+                    "vram": vram,
+                    "subsegments": subsegments or [[start, "asm", name]],
+                },
+            )
+            segment.exclusive_ram_id = ram_id
+            return segment
+
+        main = make_code(
+            "main",
+            0x0,
+            0x80000400,
+            None,
+            [[0x0, "asm", "foo"], [0x40, "asm", "bar"], [0x80, "data", "foo"]],
+        )
+        ovl_a = make_code("ovl_a", 0x100, 0x80100000, "ovl")
+        ovl_b = make_code("ovl_b", 0x200, 0x80100000, "ovl")
+        other = make_code("other", 0x300, 0x80200000, "other")
+        all_segments: List[Segment] = [main, ovl_a, ovl_b, other]
+
+        # Overlays sharing an exclusive_ram_id can't see each other
+        selection = Selection(all_segments, {"ovl_a"})
+        assert selection.get_closure(all_segments) == [main, ovl_a, other]
+        assert selection.get_subsegment_names(ovl_a) is None
+        assert not selection.is_selected(main)
+
+        selection = Selection(all_segments, {"ovl_*", "missing"})
+        assert selection.get_closure(all_segments) == all_segments
+        assert selection.unmatched == ["missing"]
+
+        # Subsegment names select every part of that file
+        selection = Selection(all_segments, {"foo"})
+        assert selection.is_selected(main)
+        assert selection.get_subsegment_names(main) == {"foo"}
+        assert selection.get_closure(all_segments) == all_segments
+
+        # Unless the whole top-level segment is selected as well
+        selection = Selection(all_segments, {"foo", "main"})
+        assert selection.get_subsegment_names(main) is None
+
+
+class TargetChecksum(unittest.TestCase):
+    def test_checksum_is_reused(self):
+        import json
+        import pathlib
+        import tempfile
+
+        test_init()
+        with tempfile.TemporaryDirectory() as tmp:
+            options.opts.base_path = pathlib.Path(tmp)
+            target = pathlib.Path(tmp) / "target.bin"
+            target.write_bytes(b"splat")
+
+            assert rom.get_checksum(target, b"splat", "crc32") == "792c1019"
+
+            # Tamper with the record to check it is used instead of hashing again
+            records_path = pathlib.Path(tmp) / ".splat" / rom.VERIFIED_TARGETS_FILENAME
+            records = json.loads(records_path.read_text())
+            records[str(target.resolve())]["checksums"]["crc32"] = "cached"
+            records_path.write_text(json.dumps(records))
+            assert rom.get_checksum(target, b"splat", "crc32") == "cached"
+
+            # Changing the file invalidates the record
+            target.write_bytes(b"splat!")
+            assert rom.get_checksum(target, b"splat!", "crc32") != "cached"
+
+
+class Watcher(unittest.TestCase):
+    def test_wait_for_changes(self):
+        import pathlib
+        import tempfile
+        import threading
+        from src.splat.util import watcher
+
+        with tempfile.TemporaryDirectory() as tmp:
+            edited = pathlib.Path(tmp) / "symbol_addrs.txt"
+            untouched = pathlib.Path(tmp) / "splat.yaml"
+            created = pathlib.Path(tmp) / "code.c"
+            edited.write_text("func_80000400 = 0x80000400;\n")
+            untouched.write_text("name: test\n")
+
+            states = watcher.get_file_states([edited, created])
+            assert states[edited] is not None
+            assert states[created] is None
+
+            def edit():
+                edited.write_text("named = 0x80000400;\n")
+                created.write_text("")
+
+            timer = threading.Timer(watcher.POLL_INTERVAL, edit)
+            timer.start()
+            changed = watcher.wait_for_changes([edited, untouched, created])
+            timer.join()
+
+            assert changed == [edited, created]
+
+
+class SplitServer(unittest.TestCase):
+    def test_handle(self):
+        from src.splat.scripts import serve
+
+        server = serve.SplitServer(["splat.yaml"], False, False, False, 1, 4, False)
+        # Pretend a split already ran, so the server answers from the symbols in memory
+        server.all_segments = []
+
+        symbols.reset_symbols()
+        symbols.add_symbol(symbols.Symbol(0x80000400, given_name="small"))
+        symbols.add_symbol(
+            symbols.Symbol(0x80000500, given_name="big", given_size=0x40, type="func")
+        )
+
+        response = server.handle({"command": "symbol", "vram": "0x80000402"})
+        assert response["ok"]
+        assert [sym["name"] for sym in response["symbols"]] == ["small"]
+
+        response = server.handle({"command": "symbol", "vram": 0x80000530})
+        assert response["symbols"] == [
+            {
+                "name": "big",
+                "vram": 0x80000500,
+                "size": 0x40,
+                "type": "func",
+                "segment": None,
+            }
+        ]
+
+        assert server.handle({"command": "symbol", "vram": 0x80000404})["symbols"] == []
+        assert not server.handle({"command": "symbol"})["ok"]
+        assert not server.handle({"command": "unknown"})["ok"]
+
+        assert not server.stopping
+        assert server.handle({"command": "shutdown"})["ok"]
+        assert server.stopping
+
+    def test_claim_socket(self):
+        import pathlib
+        import socket
+        import tempfile
+        from src.splat.scripts import serve
+
+        with tempfile.TemporaryDirectory() as tmp:
+            socket_path = pathlib.Path(tmp) / "splat.sock"
+
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listening:
+                listening.bind(str(socket_path))
+                listening.listen()
+                with self.assertRaises(SystemExit):
+                    serve.claim_socket(socket_path)
+                assert socket_path.is_socket()
+
+            # Closing the socket leaves the file behind, like a server which was killed
+            assert socket_path.is_socket()
+            serve.claim_socket(socket_path)
+            assert not socket_path.exists()
+
+
+class Timings(unittest.TestCase):
+    def test_self_time(self):
+        import time
+        from src.splat.util import timings
+
+        test_init()
+        group = CommonSegBin(
+            rom_start=0x100,
+            rom_end=0x200,
+            type="code",
+            name="group",
+            vram_start=None,
+            args=[],
+            yaml={"name": "group"},
+        )
+        sub = CommonSegBin(
+            rom_start=0x100,
+            rom_end=0x200,
+            type="bin",
+            name="sub",
+            vram_start=None,
+            args=[],
+            yaml={"name": "sub"},
+        )
+
+        timings.initialize(True)
+        with timings.phase("do_scan"):
+            with timings.segment(group, "scan"):
+                with timings.segment(sub, "scan"):
+                    time.sleep(0.02)
+
+        totals = timings.get_type_totals()
+        # The subsegment's time is only charged to its own type
+        assert totals["bin"].wall >= 0.02
+        assert totals["code"].wall < 0.02
+        assert [t.name for t in timings._state.phases] == ["do_scan"]
+        assert [t.name for t in timings._state.segments] == ["sub", "group"]
+        assert timings._state.segments[1].wall >= 0.02
+
+        # Nothing is recorded while disabled
+        timings.initialize(False)
+        with timings.segment(sub, "split"):
+            pass
+        assert timings._state.segments == []
+
+
+class Trace(unittest.TestCase):
+    def test_spans(self):
+        import json
+        import pathlib
+        import tempfile
+        from src.splat.util import trace
+
+        @trace.traced("inner")
+        def inner():
+            pass
+
+        trace.initialize(True)
+        with trace.span("outer", path="symbol_addrs.txt"):
+            inner()
+
+        # Events sent back by a worker process are kept
+        events = trace.take_events()
+        assert [e["name"] for e in events[0]] == ["inner", "outer"]
+        assert trace.take_events()[0] == []
+        trace.add_events(events)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / "trace.json"
+            trace.write(path)
+            written = json.loads(path.read_text())["traceEvents"]
+
+        spans = [e for e in written if e["ph"] == "X"]
+        inner_span, outer_span = spans
+        assert outer_span["args"] == {"path": "symbol_addrs.txt"}
+        assert outer_span["ts"] <= inner_span["ts"]
+        assert (
+            inner_span["ts"] + inner_span["dur"] <= outer_span["ts"] + outer_span["dur"]
+        )
+        assert {"name": "splat"} in [e["args"] for e in written if e["ph"] == "M"]
+
+        trace.initialize(False)
+        inner()
+        assert trace.take_events()[0] == []
+
+
+class MemoryReport(unittest.TestCase):
+    def test_segment_growth(self):
+        from src.splat.util import memory
+
+        test_init()
+        segment = CommonSegBin(
+            rom_start=0x100,
+            rom_end=0x200,
+            type="bin",
+            name="test_bin",
+            vram_start=None,
+            args=[],
+            yaml={"name": "test_bin"},
+        )
+
+        memory.initialize("tracemalloc")
+        try:
+            kept = []
+            with memory.segment(segment, "scan"):
+                kept.append(bytearray(0x100000))
+            memory.sample("do_scan")
+
+            assert memory.get_type_totals()["bin"] >= 0x100000
+            [sample] = memory._state.samples
+            assert sample.label == "do_scan"
+            assert sample.traced is not None and sample.traced >= 0x100000
+            assert len(sample.top_allocators) > 0
+        finally:
+            memory.initialize(None)
+
+        with memory.segment(segment, "split"):
+            pass
+        memory.sample("do_split")
+        assert memory._state.samples == [] and memory._state.segments == []
+
+
+class Benchmark(unittest.TestCase):
+    def test_synthetic_rom(self):
+        import pathlib
+        import sys
+        import tempfile
+
+        sys.path.insert(0, "test/benchmark")
+        import benchmark
+        import generate_rom
+
+        # Leave the global state as fresh as the other tests expect it
+        self.addCleanup(symbols.reset_spim_context)
+        self.addCleanup(symbols.reset_symbols)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            work_dir = pathlib.Path(tmp)
+            config_path = generate_rom.generate(work_dir, generate_rom.Scale())
+            results = benchmark.run_benchmarks(work_dir, config_path, 1, 1)
+
+            assert (work_dir / "split" / "synth.ld").exists()
+            assert (work_dir / "split" / "asm" / "code1.s").exists()
+
+        for kind in ("cold", "warm"):
+            for phase in ("initialize_config", "do_scan", "do_split", "cache.save"):
+                assert len(results[f"{kind}.{phase}"]["runs"]) == 1
+
+
+class ParallelSplit(unittest.TestCase):
+    def test_same_output_as_serial(self):
+        import pathlib
+        import sys
+        import tempfile
+
+        sys.path.insert(0, "test/benchmark")
+        import benchmark
+        import generate_rom
+
+        self.addCleanup(symbols.reset_spim_context)
+        self.addCleanup(symbols.reset_symbols)
+
+        # Make sure the workers really split something
+        pool_splits = []
+        original_split = split_pool.SplitPool.split
+
+        def split(pool, segment):
+            pool_splits.append(segment.name)
+            original_split(pool, segment)
+
+        split_pool.SplitPool.split = split  # type: ignore[method-assign]
+        self.addCleanup(setattr, split_pool.SplitPool, "split", original_split)
+
+        outputs = []
+        with tempfile.TemporaryDirectory() as tmp:
+            for jobs in (1, 2):
+                work_dir = pathlib.Path(tmp) / f"jobs{jobs}"
+                config_path = generate_rom.generate(
+                    work_dir, generate_rom.Scale(code=8, overlays=4)
+                )
+                benchmark.run_split(config_path, jobs)
+                outputs.append(get_split_outputs(work_dir))
+
+        serial, parallel = outputs
+        assert len(pool_splits) > 1
+        assert "split/undefined_funcs_auto.txt" in serial
+        assert ".splat/spim_context.csv" in serial
+        assert sorted(parallel) == sorted(serial)
+        for path, content in serial.items():
+            assert parallel[path] == content, path
+
+
+class History(unittest.TestCase):
+    def test_regressions(self):
+        import pathlib
+        import tempfile
+        from src.splat.util import history
+
+        def make_run(kind: str, scan: float) -> history.Run:
+            return history.Run(
+                key="key",
+                kind=kind,
+                splat_version="0.23.0",
+                disassembler_version="spimdisasm 1.0.0",
+                config_digest="digest",
+                rom_size=0x1000,
+                segments=10,
+                symbols=100,
+                total=scan + 1.0,
+                phases={"do_scan": scan, "do_split": 1.0},
+            )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / history.HISTORY_FILENAME
+
+            # Nothing to compare against until there are enough runs
+            for scan in [1.0, 1.1, 0.9]:
+                assert history.record(path, make_run("cold", scan), 25.0) == []
+
+            # Runs of other kinds aren't compared against cold ones
+            assert history.record(path, make_run("warm", 3.0), 25.0) == []
+
+            regressions = history.record(path, make_run("cold", 2.0), 25.0)
+            assert [r.phase for r in regressions] == ["do_scan", "total"]
+            assert regressions[0].median == 1.0
+            assert regressions[0].change == 100.0
+
+            # Below the threshold
+            assert history.record(path, make_run("cold", 1.2), 25.0) == []
+
+            runs = history.load(path)
+            assert [r.kind for r in runs] == ["cold"] * 3 + ["warm"] + ["cold"] * 2
+            assert runs[-1].phases == {"do_scan": 1.2, "do_split": 1.0}
+
+
+class Plan(unittest.TestCase):
+    def test_reasons(self):
+        import pathlib
+        import tempfile
+        from src.splat.util import history, plan
+
+        test_init()
+
+        segment = CommonSegBin(
+            rom_start=0x10,
+            rom_end=0x20,
+            type="bin",
+            name="test_bin",
+            vram_start=None,
+            args=[],
+            yaml={"name": "test_bin"},
+        )
+        rom_bytes = bytes(0x30)
+
+        def get_plan() -> List[plan.PlannedSegment]:
+            cache = cache_handler.Cache(True, False)
+            cache.set_rom_bytes(rom_bytes)
+            planned = plan.get_plan([segment], cache)
+            cache.close()
+            return planned
+
+        with tempfile.TemporaryDirectory() as tmp:
+            options.opts.cache_path = pathlib.Path(tmp) / ".splache"
+
+            assert [p.reason for p in get_plan()] == ["not cached"]
+
+            cache = cache_handler.Cache(True, False)
+            cache.set_rom_bytes(rom_bytes)
+            cache.set_recorder(ProductRecorder([segment]))
+            cache.record(segment, "scan", lambda: segment.scan(rom_bytes))
+            assert not cache.check_cache_hit(segment, True)
+            cache.save(False)
+            assert get_plan() == []
+
+            # Bytes outside of the segment don't matter
+            rom_bytes = bytes(0x10) + bytes(0x10) + b"\xff" * 0x10
+            assert get_plan() == []
+
+            rom_bytes = bytes(0x10) + b"\xff" * 0x20
+            planned = get_plan()
+            assert [p.reason for p in planned] == ["rom bytes changed"]
+            assert planned[0].actions == ["scan", "split"]
+            assert planned[0].size == 0x10
+
+            rom_bytes = bytes(0x30)
+            options.opts.asset_path = pathlib.Path("other")
+            assert [p.reason for p in get_plan()] == ["options changed (asset_path)"]
+
+        def make_run(key: str, kind: str, total: float) -> history.Run:
+            return history.Run(
+                key=key,
+                kind=kind,
+                splat_version="0.23.0",
+                disassembler_version=None,
+                config_digest="digest",
+                rom_size=0x100,
+                segments=10,
+                symbols=100,
+                total=total,
+                phases={"do_scan": total / 2, "do_split": total / 4},
+            )
+
+        runs = [make_run("key", "cold", 8.0), make_run("key", "warm", 1.0)]
+        planned = [plan.PlannedSegment("a", "code", 0x40, ["scan"], "not cached")]
+        estimated = plan.estimate(runs, "key", planned)
+        assert estimated is not None
+        # 2s outside of scanning and splitting, and a quarter of the 6s spent on them
+        assert estimated[0] == 3.5
+
+        # Other configs are only used when this one never split everything
+        runs.append(make_run("other", "cold", 4.0))
+        estimated = plan.estimate(runs, "key", planned)
+        assert estimated is not None and estimated[1].total == 8.0
+        estimated = plan.estimate(runs, "missing", planned)
+        assert estimated is not None and estimated[1].total == 4.0
+
+
+class ConfigCache(unittest.TestCase):
+    def test_invalidation(self):
+        import os
+        import pathlib
+        import tempfile
+        from src.splat.util import config_cache
+
+        with tempfile.TemporaryDirectory() as tmp:
+            main_path = pathlib.Path(tmp) / "splat.yaml"
+            extra_path = pathlib.Path(tmp) / "extra.yaml"
+            main_path.write_text("options:\n  basename: a\n")
+            extra_path.write_text("segments: []\n")
+            config_path = [str(main_path), str(extra_path)]
+            config = {"options": {"basename": "a"}, "segments": []}
+
+            assert config_cache.load(config_path) is None
+            config_cache.save(config_path, config)
+            assert config_cache.load(config_path) == config
+
+            # Giving the files in another order merges them differently
+            assert config_cache.load(config_path[::-1]) is None
+
+            extra_path.write_text("segments: [[0x0]]\n")
+            assert config_cache.load(config_path) is None
+
+            config_cache.save(config_path, config)
+            os.utime(main_path, ns=(0, 0))
+            assert config_cache.load(config_path) is None
+
+
+class SymbolDb(unittest.TestCase):
+    def get_loaded(self):
+        return [
+            (
+                sym.vram_start,
+                sym.given_name,
+                sym.rom,
+                sym.type,
+                sym.given_size,
+                sym.segment,
+                sym.extract,
+                sym.given_name_end,
+                sym.given_filename,
+                sym.user_declared,
+            )
+            for sym in symbols.all_symbols
+        ]
+
+    def test_symbols(self):
+        import pathlib
+        import tempfile
+
+        test_init()
+        disassembler_instance.create_disassembler_instance(False, __version__)
+
+        all_segments = [
+            Segment(
+                rom_start=0x100,
+                rom_end=0x200,
+                type="func",
+                name="test_segment",
+                vram_start=0x300,
+                args=[],
+                yaml={},
+            )
+        ]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            options.opts.base_path = pathlib.Path(tmp)
+            path = pathlib.Path(tmp) / "symbol_addrs.txt"
+            path.write_text(
+                "func_1 = 0x300; // type:func size:0x10 segment:test_segment\n"
+                "D_2 = 0x310; // rom:0x110 name_end:D_2_end filename:d2 extract:False\n"
+                "D_3 = 0x320; // ignore:True\n"
+            )
+            options.opts.symbol_addrs_paths = [path]
+
+            symbols.reset_symbols()
+            symbols.initialize(all_segments)
+            compiled = self.get_loaded()
+            assert (pathlib.Path(tmp) / ".splat" / "symbol_addrs.db").exists()
+            assert compiled[1][5] is all_segments[0]
+
+            symbols.reset_symbols()
+            symbols.initialize(all_segments)
+            assert self.get_loaded() == compiled
+            assert symbols.ignored_addresses == {0x320}
+            assert [r[2].name for r in symbols.all_symbols_ranges] == ["func_1"]
+
+            with path.open("a") as f:
+                f.write("D_4 = 0x330;\n")
+            symbols.reset_symbols()
+            symbols.initialize(all_segments)
+            assert [sym.name for sym in symbols.all_symbols] == ["func_1", "D_2", "D_4"]
+
+    def test_relocs(self):
+        import pathlib
+        import tempfile
+        from src.splat.util import relocs
+
+        test_init()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            options.opts.base_path = pathlib.Path(tmp)
+            path = pathlib.Path(tmp) / "reloc_addrs.txt"
+            path.write_text(
+                "rom:0x100 reloc:MIPS_HI16 symbol:func_1\n"
+                "rom:0x104 reloc:MIPS_LO16 symbol:func_1 addend:0x4\n"
+            )
+            options.opts.reloc_addrs_paths = [path]
+
+            relocs.initialize()
+            compiled = dict(relocs.all_relocs)
+            assert (pathlib.Path(tmp) / ".splat" / "reloc_addrs.db").exists()
+
+            relocs.initialize()
+            assert relocs.all_relocs == compiled
+            assert relocs.all_relocs[0x104].addend == 4
+
+
+class RangeIndexLookup(unittest.TestCase):
+    def test_lookup(self):
+        from src.splat.util.range_index import RangeIndex
+
+        index: RangeIndex[str] = RangeIndex(
+            [(0x100, 0x200, "outer"), (0x140, 0x150, "inner"), (0x180, 0x180, "empty")]
+        )
+        index.add(0x140, 0x150, "inner_again")
+
+        assert index.find(0x100) == "outer"
+        assert index.find(0x1FF) == "outer"
+        assert index.find(0x200) is None
+        assert index.find(0xFF) is None
+        # The smallest range wins, then the one added first
+        assert index.find(0x144) == "inner"
+        assert index.at(0x144) == ["inner", "inner_again", "outer"]
+        assert index.at(0x180) == ["outer"]
+        assert len(index) == 3
+
+    def test_added_after_lookup(self):
+        from src.splat.util.range_index import RangeIndex, PENDING_LIMIT
+
+        index: RangeIndex[int] = RangeIndex([(0, 0x1000, -1)])
+        assert index.find(0x10) == -1
+
+        # Enough ranges to be indexed in several batches, plus some left unindexed
+        for i in range(PENDING_LIMIT * 3 + 5):
+            index.add(i * 0x10, i * 0x10 + 8, i)
+            assert index.find(i * 0x10 + 4) == i
+            assert index.find(i * 0x10 + 8) == (-1 if i * 0x10 + 8 < 0x1000 else None)
+
+        assert index.at(0x24) == [2, -1]
+        assert [data for _, _, data in index][:3] == [-1, 0, 1]
+        assert len(index) == PENDING_LIMIT * 3 + 6
+
+    def test_nested_ranges(self):
+        from src.splat.util.range_index import RangeIndex
+
+        # A blob containing labels, one of which contains smaller ones, along with ranges partially overlapping them
+        ranges = [(0x100, 0x200, "blob")]
+        ranges += [
+            (0x100 + i * 0x10, 0x110 + i * 0x10, f"label_{i}") for i in range(16)
+        ]
+        ranges += [(0x104, 0x108, "inner"), (0x104, 0x108, "inner_again")]
+        ranges += [(0x1F8, 0x208, "straddling"), (0x80, 0x104, "before")]
+        index = RangeIndex(ranges)
+
+        assert index.at(0x105) == ["inner", "inner_again", "label_0", "blob"]
+        assert index.find(0x105) == "inner"
+        assert index.at(0x102) == ["label_0", "before", "blob"]
+        assert index.find(0x1FC) == "label_15"
+        assert index.at(0x1FC) == ["label_15", "straddling", "blob"]
+        assert index.find(0x204) == "straddling"
+        assert index.find(0x7F) is None
+
+    def test_benchmark(self):
+        import sys
+
+        sys.path.insert(0, "test/benchmark")
+        import range_index
+
+        assert set(range_index.run(500, 50)) == {"flat", "blobs", "nested"}
+
+
+class LazyImports(unittest.TestCase):
+    def test_no_heavy_imports(self):
+        import sys
+
+        sys.path.insert(0, "test/benchmark")
+        import import_time
+
+        for name in ("splat --help", "splat capy"):
+            _, imported = import_time.measure(import_time.SCENARIOS[name])
+            assert imported == set(), f"{name} imported {imported}"
+
+    def test_split_imports(self):
+        import sys
+        import tempfile
+        from pathlib import Path
+
+        sys.path.insert(0, "test/benchmark")
+        import import_time
+
+        with tempfile.TemporaryDirectory() as project:
+            config = import_time.make_asset_project(Path(project))
+            for name in import_time.SPLIT_SCENARIOS:
+                _, imported = import_time.measure(
+                    import_time.get_split_scenario(config, name)
+                )
+                assert (
+                    imported == import_time.ALLOWED_MODULES[name]
+                ), f"{name} imported {imported}"
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,214 @@
+#! /usr/bin/env python3
+
+"""
+Benchmarks splat on a synthetic ROM. Everything is generated locally, so it runs offline.
+
+Every repetition splits the ROM twice: once from scratch ("cold") and once again with the cache of the first run
+("warm"), and records the time taken by each phase (config load, symbol load, scan, split, linker script, cache
+save...). The medians can be compared against the results of another commit with --compare.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import generate_rom
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from src.splat import __version__  # noqa: E402
+from src.splat.scripts import split  # noqa: E402
+from src.splat.util import progress_bar, timings  # noqa: E402
+
+# Changes smaller than this percentage, or than MIN_DELTA seconds, are reported as noise by --compare
+DEFAULT_THRESHOLD = 5.0
+MIN_DELTA = 0.001
+
+
+def get_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_split(config_path: Path, jobs: int, pipeline: bool = False) -> Dict[str, float]:
+    # splat resolves the paths of the config relative to the working directory
+    cwd = os.getcwd()
+    os.chdir(config_path.parent)
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            progress_bar.out_file = devnull
+
+            start = time.perf_counter()
+            split.split(
+                [config_path.name],
+                None,
+                False,
+                True,
+                False,
+                False,
+                jobs,
+                4,
+                pipeline,
+                timings_top=0,
+            )
+            total = time.perf_counter() - start
+    finally:
+        progress_bar.out_file = sys.stderr
+        os.chdir(cwd)
+
+    ret = {phase.name: phase.wall for phase in timings._state.phases}
+    ret["total"] = total
+    return ret
+
+
+def run_benchmarks(work_dir: Path, config_path: Path, repeat: int, jobs: int):
+    runs: Dict[str, List[float]] = {}
+
+    for i in range(repeat):
+        # Start from scratch, without the output or the cache of the previous repetition
+        shutil.rmtree(work_dir / "split", ignore_errors=True)
+        shutil.rmtree(work_dir / ".splat", ignore_errors=True)
+
+        for kind in ("cold", "warm"):
+            for name, wall in run_split(config_path, jobs).items():
+                runs.setdefault(f"{kind}.{name}", []).append(wall)
+
+        print(
+            f"Repetition {i + 1}/{repeat}: {runs['cold.total'][-1]:.3f}s cold, {runs['warm.total'][-1]:.3f}s warm",
+            file=sys.stderr,
+        )
+
+    return {
+        name: {
+            "median": statistics.median(values),
+            "min": min(values),
+            "runs": values,
+        }
+        for name, values in runs.items()
+    }
+
+
+def compare(baseline_path: Path, results_path: Path, threshold: float) -> bool:
+    """
+    Prints how much every benchmark changed, and returns whether any of them got slower than the threshold
+    """
+    with baseline_path.open() as f:
+        baseline = json.load(f)
+    with results_path.open() as f:
+        results = json.load(f)
+
+    if baseline["scale"] != results["scale"]:
+        print("Warning: the results were measured at different scales")
+
+    regressed = False
+    for name, result in results["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            continue
+        old = baseline["benchmarks"][name]["median"]
+        new = result["median"]
+        change = (new - old) / old * 100 if old > 0 else 0.0
+
+        status = ""
+        if abs(new - old) < MIN_DELTA:
+            pass
+        elif change > threshold:
+            status = "slower"
+            regressed = True
+        elif change < -threshold:
+            status = "faster"
+        print(f"{name:>40}: {old:9.4f}s -> {new:9.4f}s ({change:+6.1f}%) {status}")
+
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    generate_rom.add_scale_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1, help="Passed to splat's --jobs"
+    )
+    parser.add_argument(
+        "--work-dir",
+        type=Path,
+        help="Where the ROM is generated and split. A temporary directory by default",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        default=Path("benchmark_results.json"),
+        help="Where the results are written",
+    )
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        metavar="BASELINE",
+        help="Results of an earlier run to compare these against",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Percentage above which a change is reported as a regression",
+    )
+    parser.add_argument(
+        "--compare-only",
+        action="store_true",
+        help="Only compare --output against --compare, without running anything",
+    )
+    args = parser.parse_args()
+
+    if not args.compare_only:
+        scale = generate_rom.get_scale(args)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            work_dir = args.work_dir or Path(tmp)
+            config_path = generate_rom.generate(work_dir, scale, args.seed)
+
+            benchmarks = run_benchmarks(
+                work_dir.resolve(), config_path.resolve(), args.repeat, args.jobs
+            )
+
+        results = {
+            "splat_version": __version__,
+            "commit": get_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scale": asdict(scale),
+            "seed": args.seed,
+            "jobs": args.jobs,
+            "repeat": args.repeat,
+            "benchmarks": benchmarks,
+        }
+        with args.output.open("w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare is not None:
+        if compare(args.compare, args.output, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+#! /usr/bin/env python3
+
+"""
+Generates a synthetic N64 ROM and a matching splat config, to benchmark splat on projects of any size without
+needing a real game.
+
+The ROM has code segments (alternating between c and asm) whose functions call each other and reference their
+data and rodata, overlays sharing the same vram, and rgba16, vtx and Yay0 assets.
+"""
+
+import argparse
+import random
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+import crunch64
+
+
+@dataclass
+class Scale:
+    code: int = 4
+    funcs: int = 8
+    overlays: int = 3
+    syms: int = 20
+    images: int = 2
+    vtx: int = 1
+    yay0: int = 1
+
+
+SCALES = {
+    "small": Scale(),
+    "medium": Scale(
+        code=40, funcs=50, overlays=20, syms=1000, images=20, vtx=10, yay0=10
+    ),
+    "large": Scale(
+        code=200, funcs=100, overlays=100, syms=10000, images=100, vtx=50, yay0=50
+    ),
+}
+
+# Size of every generated function, in bytes
+FUNC_SIZE = 0x30
+BSS_SIZE = 0x40
+
+CONFIG_OPTIONS = """\
+options:
+  platform: n64
+  compiler: GCC
+  basename: synth
+  base_path: .
+  target_path: rom.z64
+  asm_path: split/asm
+  src_path: split/src
+  asset_path: split/assets
+  ld_script_path: split/synth.ld
+  cache_path: split/.splache
+  symbol_addrs_path: symbol_addrs.txt
+  undefined_funcs_auto_path: split/undefined_funcs_auto.txt
+  undefined_syms_auto_path: split/undefined_syms_auto.txt
+  find_file_boundaries: False
+  dump_symbols: True
+segments:
+"""
+
+
+def hi_lo(addr: int):
+    lo = addr & 0xFFFF
+    hi = (addr >> 16) & 0xFFFF
+    if lo >= 0x8000:
+        hi = (hi + 1) & 0xFFFF
+    return hi, lo
+
+
+def func_words(data_addr: int, callee: int, rodata_addr: int) -> List[int]:
+    # Loads a word from data, calls another function and loads a float from rodata
+    data_hi, data_lo = hi_lo(data_addr)
+    rodata_hi, rodata_lo = hi_lo(rodata_addr)
+    return [
+        0x27BDFFE8,  # addiu $sp, $sp, -0x18
+        0xAFBF0014,  # sw    $ra, 0x14($sp)
+        0x3C040000 | data_hi,  # lui   $a0, %hi(data)
+        0x8C840000 | data_lo,  # lw    $a0, %lo(data)($a0)
+        0x0C000000 | ((callee >> 2) & 0x3FFFFFF),  # jal   callee
+        0x00000000,  # nop
+        0x3C010000 | rodata_hi,  # lui   $at, %hi(rodata)
+        0xC4200000 | rodata_lo,  # lwc1  $f0, %lo(rodata)($at)
+        0x8FBF0014,  # lw    $ra, 0x14($sp)
+        0x27BD0018,  # addiu $sp, $sp, 0x18
+        0x03E00008,  # jr    $ra
+        0x00000000,  # nop
+    ]
+
+
+class RomGenerator:
+    def __init__(self, scale: Scale, seed: int):
+        self.scale = scale
+        self.rng = random.Random(seed)
+        self.rom = bytearray()
+        self.segments_yaml: List[str] = []
+        self.sym_lines: List[str] = []
+
+        self.text_size = scale.funcs * FUNC_SIZE
+        self.data_size = ((scale.funcs * 4 + 15) // 16) * 16
+        self.rodata_size = self.data_size
+        self.segment_size = self.text_size + self.data_size + self.rodata_size
+
+    def add_header(self):
+        header = bytearray(0x40)
+        struct.pack_into(">IIII", header, 0, 0x80371240, 0xF, 0x80000400, 0x1444)
+        header[0x20:0x34] = b"SYNTHETIC ROM       "
+        header[0x3B:0x40] = b"NSYE\x00"
+        self.rom += header
+        self.rom += bytes(0x1000 - 0x40)
+
+        self.segments_yaml.append(
+            "  - name: header\n    type: header\n    start: 0x0\n"
+        )
+        self.segments_yaml.append("  - name: ipl3\n    type: bin\n    start: 0x40\n")
+
+    def add_code(
+        self,
+        name: str,
+        vram: int,
+        funcs: List[int],
+        callees: List[int],
+        text_type: str,
+        exclusive_ram_id: str = "",
+    ):
+        rom_start = len(self.rom)
+        data_addr = vram + self.text_size
+        rodata_addr = data_addr + self.data_size
+
+        for i in range(len(funcs)):
+            words = func_words(
+                data_addr + i * 4, self.rng.choice(callees), rodata_addr + i * 4
+            )
+            self.rom += struct.pack(f">{len(words)}I", *words)
+
+        # Data has function pointers and numbers
+        for i in range(self.data_size // 4):
+            if i % 3 == 0:
+                self.rom += struct.pack(">I", self.rng.choice(funcs))
+            else:
+                self.rom += struct.pack(">I", self.rng.randrange(0, 1000))
+
+        for i in range(self.rodata_size // 4):
+            self.rom += struct.pack(">f", float(self.rng.randrange(1, 100)) / 4)
+
+        rodata_type = ".rodata" if text_type == "c" else "rodata"
+        bss_vram = rodata_addr + self.rodata_size
+
+        yaml = f"  - name: {name}\n    type: code\n    start: 0x{rom_start:X}\n    vram: 0x{vram:X}\n    bss_size: 0x{BSS_SIZE:X}\n"
+        if exclusive_ram_id:
+            yaml += f"    exclusive_ram_id: {exclusive_ram_id}\n"
+        yaml += "    subsegments:\n"
+        yaml += f"      - [0x{rom_start:X}, {text_type}, {name}]\n"
+        yaml += f"      - [0x{rom_start + self.text_size:X}, data, {name}]\n"
+        yaml += f"      - [0x{rom_start + self.text_size + self.data_size:X}, {rodata_type}, {name}]\n"
+        yaml += f"      - {{ start: 0x{rom_start + self.segment_size:X}, type: bss, vram: 0x{bss_vram:X}, name: {name} }}\n"
+        self.segments_yaml.append(yaml)
+
+    def add_code_segments(self):
+        scale = self.scale
+
+        vram = 0x80000400
+        layout = []
+        global_funcs: List[int] = []
+        for i in range(scale.code):
+            funcs = [vram + j * FUNC_SIZE for j in range(scale.funcs)]
+            global_funcs.extend(funcs)
+            layout.append((vram, funcs))
+            vram = (vram + self.segment_size + BSS_SIZE + 0xF) & ~0xF
+
+        for i, (seg_vram, funcs) in enumerate(layout):
+            text_type = "c" if i % 2 == 0 else "asm"
+            self.add_code(f"code{i}", seg_vram, funcs, global_funcs, text_type)
+
+        # Every overlay is loaded at the same address
+        overlay_vram = (vram + 0x10000) & ~0xFFFF
+        for i in range(scale.overlays):
+            funcs = [overlay_vram + j * FUNC_SIZE for j in range(scale.funcs)]
+            text_type = "c" if i % 2 else "asm"
+            self.add_code(
+                f"ovl{i}", overlay_vram, funcs, funcs + global_funcs, text_type, "ovl"
+            )
+            if i == 0:
+                self.sym_lines.append(
+                    f"ovl0_entry = 0x{funcs[0]:X}; // type:func segment:ovl0"
+                )
+
+        seen = {overlay_vram}
+        for i in range(scale.syms):
+            func = self.rng.choice(global_funcs)
+            if func in seen:
+                continue
+            seen.add(func)
+            self.sym_lines.append(f"named_{i} = 0x{func:X}; // type:func")
+
+    def add_assets(self):
+        scale = self.scale
+
+        for i in range(scale.images):
+            rom_start = len(self.rom)
+            self.rom += bytes(self.rng.randrange(256) for _ in range(16 * 16 * 2))
+            self.segments_yaml.append(
+                f"  - [0x{rom_start:X}, rgba16, img{i}, 16, 16]\n"
+            )
+
+        for i in range(scale.vtx):
+            rom_start = len(self.rom)
+            self.rom += bytes(self.rng.randrange(256) for _ in range(16 * 8))
+            self.segments_yaml.append(
+                f"  - {{ start: 0x{rom_start:X}, type: vtx, name: vtx{i}, vram: 0x{0x06000000 + i * 0x100:X} }}\n"
+            )
+
+        for i in range(scale.yay0):
+            rom_start = len(self.rom)
+            compressed = crunch64.yay0.compress(
+                bytes(self.rng.randrange(4) for _ in range(0x400))
+            )
+            self.rom += compressed + bytes(-len(compressed) % 16)
+            self.segments_yaml.append(f"  - [0x{rom_start:X}, yay0, blob{i}]\n")
+
+        rom_start = len(self.rom)
+        self.rom += bytes(0x40)
+        self.segments_yaml.append(f"  - [0x{rom_start:X}, bin, tail]\n")
+        self.segments_yaml.append(f"  - [0x{len(self.rom):X}]\n")
+
+    def write(self, out_dir: Path):
+        out_dir.mkdir(parents=True, exist_ok=True)
+        (out_dir / "rom.z64").write_bytes(self.rom)
+        (out_dir / "symbol_addrs.txt").write_text("\n".join(self.sym_lines) + "\n")
+        (out_dir / "splat.yaml").write_text(
+            CONFIG_OPTIONS + "".join(self.segments_yaml)
+        )
+
+
+def generate(out_dir: Path, scale: Scale, seed: int = 1) -> Path:
+    """
+    Writes rom.z64, symbol_addrs.txt and splat.yaml to `out_dir`, and returns the path of the config
+    """
+    generator = RomGenerator(scale, seed)
+    generator.add_header()
+    generator.add_code_segments()
+    generator.add_assets()
+    generator.write(out_dir)
+    return out_dir / "splat.yaml"
+
+
+def add_scale_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--scale",
+        choices=SCALES.keys(),
+        default="small",
+        help="Preset the other options override",
+    )
+    parser.add_argument("--code", type=int, help="Number of code segments")
+    parser.add_argument("--funcs", type=int, help="Functions per code segment")
+    parser.add_argument(
+        "--overlays", type=int, help="Number of code segments sharing the same vram"
+    )
+    parser.add_argument("--syms", type=int, help="Lines in symbol_addrs.txt")
+    parser.add_argument("--images", type=int, help="Number of rgba16 images")
+    parser.add_argument("--vtx", type=int, help="Number of vtx segments")
+    parser.add_argument("--yay0", type=int, help="Number of Yay0 compressed segments")
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def get_scale(args: argparse.Namespace) -> Scale:
+    scale = Scale(**vars(SCALES[args.scale]))
+    for name in vars(scale):
+        value = getattr(args, name)
+        if value is not None:
+            setattr(scale, name, value)
+    return scale
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("out_dir", type=Path)
+    add_scale_arguments(parser)
+    args = parser.parse_args()
+    print(generate(args.out_dir, get_scale(args), args.seed))
@@ -0,0 +1,149 @@
+#! /usr/bin/env python3
+
+"""
+Measures how long splat takes to import in a fresh interpreter for commands which don't disassemble anything, and
+which of the heavy dependencies (spimdisasm, rabbitizer, pygfxd, n64img, crunch64, tqdm) they import anyway.
+
+Splits of a project made only of a binary blob and an image, which has nothing to disassemble, are measured too.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+HEAVY_MODULES = ["spimdisasm", "rabbitizer", "pygfxd", "n64img", "crunch64", "tqdm"]
+
+# Arguments given to the interpreter for every scenario
+SCENARIOS: Dict[str, List[str]] = {
+    "import splat": ["-c", "import splat"],
+    "splat --help": ["-m", "splat", "--help"],
+    "splat capy": ["-m", "splat", "capy"],
+    "splat split --help": ["-m", "splat", "split", "--help"],
+}
+
+# Arguments given to `splat split` after the config of the project made by make_asset_project
+SPLIT_SCENARIOS: Dict[str, List[str]] = {
+    "split --modes ld": ["--modes", "ld"],
+    "split --modes img": ["--modes", "img"],
+}
+
+# The heavy modules each scenario needs. Every split shows progress bars with tqdm, and images are written with n64img
+ALLOWED_MODULES: Dict[str, Set[str]] = {
+    "split --modes ld": {"tqdm"},
+    "split --modes img": {"tqdm", "n64img"},
+}
+
+ASSET_PROJECT_CONFIG = """\
+options:
+  platform: n64
+  basename: assets
+  base_path: .
+  target_path: assets.z64
+  asset_path: assets
+  ld_script_path: assets.ld
+segments:
+  - [0x0, bin, header]
+  - [0x40, rgba16, image, 8, 8]
+  - [0xC0]
+"""
+
+
+def make_asset_project(path: Path) -> Path:
+    """
+    Writes a project without any code to `path` and returns the path of its config
+    """
+    (path / "assets.z64").write_bytes(bytes(range(0xC0)))
+    config = path / "splat.yaml"
+    config.write_text(ASSET_PROJECT_CONFIG)
+    return config
+
+
+def get_split_scenario(config: Path, name: str) -> List[str]:
+    return ["-m", "splat", "split", str(config), *SPLIT_SCENARIOS[name]]
+
+
+def measure(args: List[str]) -> Tuple[float, Set[str]]:
+    """
+    Runs the interpreter with `args` and returns the time spent importing modules, and which of the heavy modules
+    were imported
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [str(REPO_ROOT / "src"), env.get("PYTHONPATH", "")]
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{args} failed:\n{result.stdout}{result.stderr}")
+
+    total = 0
+    imported: Set[str] = set()
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+
+        package = name.strip().split(".")[0]
+        if package in HEAVY_MODULES:
+            imported.add(package)
+        # Nested imports are indented, and already counted in the cumulative time of the top-level one
+        if not name.startswith("   "):
+            total += int(cumulative)
+
+    return total / 1000000, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Exit with an error if any scenario imports a heavy module it doesn't need",
+    )
+    args = parser.parse_args()
+
+    project = tempfile.TemporaryDirectory()
+    config = make_asset_project(Path(project.name))
+    scenarios = dict(SCENARIOS)
+    for name in SPLIT_SCENARIOS:
+        scenarios[name] = get_split_scenario(config, name)
+
+    failed = False
+    for name, scenario in scenarios.items():
+        times: List[float] = []
+        imported: Set[str] = set()
+        for _ in range(args.repeat):
+            seconds, modules = measure(scenario)
+            times.append(seconds)
+            imported |= modules
+
+        heavy = ", ".join(sorted(imported)) if imported else "none"
+        print(
+            f"{name:>20}: {statistics.median(times) * 1000:7.1f}ms median, {min(times) * 1000:7.1f}ms min. Heavy modules: {heavy}"
+        )
+        failed = failed or bool(imported - ALLOWED_MODULES.get(name, set()))
+
+    project.cleanup()
+
+    if args.check and failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#! /usr/bin/env python3
+
+"""
+Measures how long splat's RangeIndex takes to build and to answer lookups for a few shapes of symbol ranges: flat
+symbols next to each other, big data blobs containing many labels, and ranges nested inside each other.
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from src.splat.util.range_index import RangeIndex  # noqa: E402
+
+Ranges = List[Tuple[int, int, int]]
+
+BASE = 0x80000000
+
+
+def flat(count: int, rng: random.Random) -> Ranges:
+    ret: Ranges = []
+    address = BASE
+    for i in range(count):
+        size = rng.choice([8, 0x10, 0x40, 0x200])
+        ret.append((address, address + size, i))
+        address += size + rng.choice([0, 4])
+    return ret
+
+
+def blobs(count: int, rng: random.Random) -> Ranges:
+    """
+    Ten segment-sized symbols, each containing a tenth of the labels
+    """
+    ret: Ranges = []
+    address = BASE
+    while len(ret) < count:
+        labels = min(count // 10, count - len(ret) - 1)
+        ret.append((address, address + (labels + 1) * 0x10, len(ret)))
+        for _ in range(labels):
+            address += 0x10
+            ret.append((address, address + 8, len(ret)))
+        address += 0x10
+    return ret
+
+
+def nested(count: int, rng: random.Random) -> Ranges:
+    """
+    Chains of 32 ranges, each containing the next one
+    """
+    ret: Ranges = []
+    address = BASE
+    while len(ret) < count:
+        depth = min(32, count - len(ret))
+        for i in range(depth):
+            ret.append((address + i * 4, address + (2 * depth - i) * 4, len(ret)))
+        address += 2 * depth * 4
+    return ret
+
+
+SHAPES: Dict[str, Callable[[int, random.Random], Ranges]] = {
+    "flat": flat,
+    "blobs": blobs,
+    "nested": nested,
+}
+
+
+def measure(ranges: Ranges, lookups: int, rng: random.Random) -> Tuple[float, float]:
+    """
+    Returns the time taken to build the index and to look up `lookups` random addresses
+    """
+    low = min(r[0] for r in ranges)
+    high = max(r[1] for r in ranges)
+    points = [rng.randrange(low, high) for _ in range(lookups)]
+
+    start = time.perf_counter()
+    index = RangeIndex(ranges)
+    index.find(low)
+    built = time.perf_counter()
+    for point in points:
+        index.find(point)
+    return built - start, time.perf_counter() - built
+
+
+def run(count: int, lookups: int, seed: int = 0) -> Dict[str, Tuple[float, float]]:
+    rng = random.Random(seed)
+    return {
+        name: measure(shape(count, rng), lookups, rng) for name, shape in SHAPES.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=100000, help="Ranges per shape")
+    parser.add_argument("--lookups", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for name, (build, lookup) in run(args.count, args.lookups, args.seed).items():
+        print(f"{name:>8}: {build:.3f}s to build, {lookup:.3f}s for the lookups")
+
+
+if __name__ == "__main__":
+    main()